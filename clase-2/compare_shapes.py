@@ -0,0 +1,215 @@
+# Compara las formas de documento de las matrículas de MongoDB (referencias, embebido parcial y completo)
+# Construye una colección por forma a partir de los datos ya cargados por faker_mongodb.py y mide
+# tamaño en disco, working set y latencia de las consultas habituales sobre matrículas
+import argparse
+import json
+import statistics
+import time
+
+import bson
+from pymongo import MongoClient
+
+from faker_mongodb import ENROLLMENT_SHAPES, INDEXES, MONGO_CONFIG
+from seed_bench import add_connection_arguments, connection_config
+
+# Ejecuciones cronometradas de cada consulta por estudiante o curso de la muestra
+RUNS = 5
+# Estudiantes y cursos elegidos al azar para las consultas
+SAMPLES = 20
+
+# Colección y campo de referencia de donde sale cada copia embebida
+SHAPE_SOURCES = {
+    'student_info': ('students', 'student_id'),
+    'course_info': ('courses', 'course_id'),
+}
+
+# Campos propios de la matrícula, comunes a todas las formas
+ENROLLMENT_FIELDS = ('student_id', 'course_id', 'enrollment_date', 'status', 'grade', 'semester', 'created_at')
+
+# consulta -> (descripción, parámetro de la muestra, etapas iniciales, campos embebidos que necesita el resultado)
+QUERIES = {
+    'student_enrollments': (
+        'Matrículas de un estudiante con nombre y créditos del curso',
+        'student_id',
+        lambda value: [{'$match': {'student_id': value}}],
+        {'course_info': ('name', 'credits')},
+    ),
+    'student_course_details': (
+        'Cursos de un estudiante con su descripción',
+        'student_id',
+        lambda value: [{'$match': {'student_id': value}}],
+        {'course_info': ('name', 'description', 'credits')},
+    ),
+    'course_roster': (
+        'Estudiantes de un curso con nombre y email',
+        'course_id',
+        lambda value: [{'$match': {'course_id': value}}],
+        {'student_info': ('first_name', 'last_name', 'email')},
+    ),
+    'recent_enrollments': (
+        'Últimas 100 matrículas con el nombre del estudiante y del curso',
+        None,
+        lambda value: [{'$sort': {'enrollment_date': -1}}, {'$limit': 100}],
+        {'student_info': ('first_name', 'last_name'), 'course_info': ('name',)},
+    ),
+}
+
+
+def parse_args():
+    """Lee las opciones de la comparación"""
+    parser = argparse.ArgumentParser(description='Compara las formas de documento de las matrículas')
+    parser.add_argument('--shape', choices=list(ENROLLMENT_SHAPES), action='append', default=None,
+                        help='forma a medir, se puede repetir (por defecto todas)')
+    parser.add_argument('--runs', type=int, default=RUNS,
+                        help='ejecuciones cronometradas por consulta y valor de la muestra')
+    parser.add_argument('--samples', type=int, default=SAMPLES,
+                        help='estudiantes y cursos de la muestra')
+    parser.add_argument('--keep', action='store_true',
+                        help='conservar las colecciones enrollments_<forma> al terminar')
+    parser.add_argument('--report', default=None,
+                        help='archivo JSON donde se escribe la comparación')
+    add_connection_arguments(parser, MONGO_CONFIG)
+    return parser.parse_args()
+
+
+def lookup(field, names):
+    """Etapas que traen de su colección los campos de una copia embebida"""
+    collection, key = SHAPE_SOURCES[field]
+    return [
+        {'$lookup': {'from': collection, 'localField': key, 'foreignField': '_id', 'as': field,
+                     'pipeline': [{'$project': {name: 1 for name in names}}]}},
+        {'$set': {field: {'$first': f'${field}'}}},
+    ]
+
+
+def build_shape(db, shape):
+    """Crea enrollments_<forma> desde enrollments, students y courses, con los índices de las matrículas"""
+    name = f'enrollments_{shape}'
+    pipeline = [{'$project': {field: 1 for field in ENROLLMENT_FIELDS}}]
+    for field, names in ENROLLMENT_SHAPES[shape].items():
+        pipeline += lookup(field, names)
+        pipeline.append({'$set': {field: {name: f'${field}.{name}' for name in names}}})
+    pipeline.append({'$out': name})
+    db[name].drop()
+    started = time.perf_counter()
+    db.enrollments.aggregate(pipeline, allowDiskUse=True)
+    for keys, options in INDEXES['enrollments'] + [('course_id', {})]:
+        db[name].create_index(keys, **options)
+    return db[name], time.perf_counter() - started
+
+
+def query_pipeline(shape, query, value):
+    """Pipeline de una consulta: lee lo embebido y trae con $lookup los campos que la forma no copia"""
+    _, _, stages, needed = QUERIES[query]
+    pipeline = stages(value)
+    projection = {field: 1 for field in ENROLLMENT_FIELDS}
+    for field, names in needed.items():
+        embedded = ENROLLMENT_SHAPES[shape].get(field, ())
+        if not set(names) <= set(embedded):
+            pipeline += lookup(field, names)
+        projection.update({f'{field}.{name}': 1 for name in names})
+    pipeline.append({'$project': projection})
+    return pipeline
+
+
+def storage(collection):
+    """Tamaños de la colección y bytes suyos y de sus índices que están en la caché de WiredTiger"""
+    stats = next(collection.aggregate([{'$collStats': {'storageStats': {}}}]))['storageStats']
+    cached = stats.get('wiredTiger', {}).get('cache', {}).get('bytes currently in the cache', 0)
+    cached += sum(index.get('cache', {}).get('bytes currently in the cache', 0)
+                  for index in stats.get('indexDetails', {}).values())
+    return {
+        'documents': stats['count'],
+        'avg_document_bytes': stats.get('avgObjSize', 0),
+        'data_bytes': stats['size'],
+        'storage_bytes': stats['storageSize'],
+        'index_bytes': stats['totalIndexSize'],
+        # Lo que tiene que caber en memoria para que todas las lecturas de matrículas eviten el disco
+        'working_set_bytes': stats['size'] + stats['totalIndexSize'],
+        'cached_bytes': cached,
+    }
+
+
+def time_query(collection, shape, query, values, runs):
+    """Latencias en ms de una consulta sobre los valores de la muestra, tras una ejecución de calentamiento"""
+    latencies = []
+    result_bytes = []
+    for value in values:
+        pipeline = query_pipeline(shape, query, value)
+        list(collection.aggregate(pipeline))
+        for _ in range(runs):
+            started = time.perf_counter()
+            documents = list(collection.aggregate(pipeline))
+            latencies.append((time.perf_counter() - started) * 1000)
+        result_bytes.append(sum(len(bson.encode(document)) for document in documents))
+    latencies.sort()
+    return {
+        'median_ms': round(statistics.median(latencies), 3),
+        'p90_ms': round(latencies[min(len(latencies) - 1, int(0.9 * len(latencies)))], 3),
+        'avg_result_bytes': round(statistics.mean(result_bytes)),
+    }
+
+
+def print_comparison(results):
+    """Muestra una tabla con una columna por forma"""
+    shapes = list(results)
+    rows = [('documentos', 'documents', 1), ('bytes por documento', 'avg_document_bytes', 1),
+            ('datos (MB)', 'data_bytes', 2**20), ('en disco (MB)', 'storage_bytes', 2**20),
+            ('índices (MB)', 'index_bytes', 2**20), ('working set (MB)', 'working_set_bytes', 2**20),
+            ('en caché (MB)', 'cached_bytes', 2**20)]
+    print(f"\n{'':<28}" + ''.join(f"{shape:>14}" for shape in shapes))
+    for label, key, unit in rows:
+        print(f"{label:<28}" + ''.join(f"{results[shape]['storage'][key] / unit:>14.2f}" for shape in shapes))
+    for query in QUERIES:
+        print(f"{query + ' (ms)':<28}"
+              + ''.join(f"{results[shape]['queries'][query]['median_ms']:>14.3f}" for shape in shapes))
+
+
+def main(args):
+    client = None
+    try:
+        config = connection_config(args, MONGO_CONFIG)
+        client = MongoClient(
+            host=config['host'],
+            port=config['port'],
+            username=config['username'],
+            password=config['password'],
+            authSource=config['authSource']
+        )
+        db = client[config['database']]
+
+        # La misma muestra de estudiantes y cursos para todas las formas
+        samples = {
+            key: [document['_id'] for document in db[collection].aggregate([{'$sample': {'size': args.samples}}])]
+            for collection, key in SHAPE_SOURCES.values()
+        }
+        samples[None] = [None]
+
+        results = {}
+        for shape in args.shape or ENROLLMENT_SHAPES:
+            print(f"Construyendo enrollments_{shape}...")
+            collection, build_seconds = build_shape(db, shape)
+            queries = {}
+            for query, (description, parameter, _, _) in QUERIES.items():
+                queries[query] = time_query(collection, shape, query, samples[parameter], args.runs)
+                print(f"  {query}: {queries[query]['median_ms']} ms ({description})")
+            results[shape] = {'build_seconds': round(build_seconds, 3), 'storage': storage(collection),
+                              'queries': queries}
+            if not args.keep:
+                collection.drop()
+
+        print_comparison(results)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as report_file:
+                json.dump({'runs': args.runs, 'samples': args.samples, 'shapes': results}, report_file, indent=2)
+            print(f"\nInforme escrito en {args.report}")
+
+    except Exception as e:
+        print(f"Error inesperado: {e}")
+    finally:
+        if client is not None:
+            client.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
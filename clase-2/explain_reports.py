@@ -0,0 +1,204 @@
+# Verifies the analytical index pack against a seeded sales_system database
+# Runs EXPLAIN and times every query of ventas_reports.py without the indexes of ventas_indexes.sql and with them
+import argparse
+import json
+import re
+import statistics
+import time
+
+import mysql.connector
+from mysql.connector import errorcode
+
+from faker_ventas import DB_CONFIG
+from seed_bench import add_connection_arguments, connection_config
+from ventas_reports import REPORT_QUERIES, report_parameters
+
+INDEX_PACK = 'ventas_indexes.sql'
+
+# Timed executions per query, after one untimed run that warms the buffer pool
+RUNS = 5
+
+
+def parse_args():
+    """Reads the command line options of the verification script"""
+    parser = argparse.ArgumentParser(description='Times the reporting queries with and without the index pack')
+    parser.add_argument('--indexes', default=INDEX_PACK,
+                        help='SQL file with the CREATE INDEX statements of the pack')
+    parser.add_argument('--runs', type=int, default=RUNS,
+                        help='timed executions per query; the median is reported')
+    parser.add_argument('--report', default=None,
+                        help='JSON file where the plans and latencies are written')
+    add_connection_arguments(parser, DB_CONFIG)
+    return parser.parse_args()
+
+
+def read_index_pack(path):
+    """Returns (index, table, statement) for each CREATE INDEX of the pack file"""
+    with open(path, encoding='utf-8') as sql_file:
+        sql = re.sub(r'--[^\n]*', '', sql_file.read())
+    pack = []
+    for statement in sql.split(';'):
+        match = re.match(r'\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+(\w+)\s+ON\s+(\w+)', statement, re.IGNORECASE)
+        if match:
+            pack.append((match.group(1), match.group(2), statement.strip()))
+    return pack
+
+
+def existing_indexes(conn):
+    """(table, index) pairs of the current database"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE()")
+    indexes = set(cursor.fetchall())
+    cursor.close()
+    return indexes
+
+
+def drop_pack(conn, pack):
+    """Drops the indexes of the pack that exist
+
+    ventas.sql gives every foreign key its own index; on a database created
+    without them, MySQL keeps a pack index for the constraint and refuses to drop it.
+    """
+    existing = existing_indexes(conn)
+    cursor = conn.cursor()
+    try:
+        for index, table, _ in pack:
+            if (table, index) in existing:
+                try:
+                    cursor.execute(f"DROP INDEX {index} ON {table}")
+                except mysql.connector.Error as err:
+                    if err.errno != errorcode.ER_DROP_INDEX_FK:
+                        raise
+                    raise ValueError(f"{index} is the only index of a foreign key of {table}; add the plain "
+                                     f"foreign key index of ventas.sql to {table} before measuring") from err
+    finally:
+        cursor.close()
+
+
+def create_pack(conn, pack):
+    """Creates the indexes of the pack that are missing and returns the seconds spent per index"""
+    existing = existing_indexes(conn)
+    cursor = conn.cursor()
+    timings = {}
+    for index, table, statement in pack:
+        if (table, index) not in existing:
+            start = time.perf_counter()
+            cursor.execute(statement)
+            timings[index] = round(time.perf_counter() - start, 3)
+    cursor.close()
+    return timings
+
+
+def analyze(conn, tables):
+    """Refreshes the index statistics the optimizer uses to pick a plan"""
+    cursor = conn.cursor()
+    for table in sorted(tables):
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+    cursor.close()
+
+
+def explain(conn, sql, params):
+    """Plan of a query: one entry per table access with the index used, estimated rows and Extra"""
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute('EXPLAIN ' + sql, params)
+    plan = [
+        {'table': row['table'], 'type': row['type'], 'key': row['key'], 'rows': row['rows'], 'extra': row['Extra']}
+        for row in cursor.fetchall()
+    ]
+    cursor.close()
+    return plan
+
+
+def time_query(conn, sql, params, runs):
+    """Median latency of a query in milliseconds, fetching every row"""
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    cursor.fetchall()
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    cursor.close()
+    return round(statistics.median(latencies), 2)
+
+
+def measure(conn, params, runs):
+    """Plan and latency of every catalog query"""
+    results = {}
+    for name, (_, sql) in REPORT_QUERIES.items():
+        results[name] = {'plan': explain(conn, sql, params), 'ms': time_query(conn, sql, params, runs)}
+    return results
+
+
+def plan_keys(plan):
+    """Short description of a plan: the index used on each table, marking covering reads"""
+    return ', '.join(
+        f"{step['table']}:{step['key'] or 'full scan'}"
+        f"{' (covering)' if re.search(r'Using index(?! condition)', step['extra'] or '') else ''}"
+        for step in plan
+    )
+
+
+def print_comparison(before, after):
+    """Prints before/after latency and the plan chosen with the pack"""
+    print(f"{'query':<20} {'before ms':>10} {'after ms':>10} {'speedup':>8}  plan with the pack")
+    for name in REPORT_QUERIES:
+        old, new = before[name]['ms'], after[name]['ms']
+        speedup = f"{old / new:.1f}x" if new > 0 else '-'
+        print(f"{name:<20} {old:>10.2f} {new:>10.2f} {speedup:>8}  {plan_keys(after[name]['plan'])}")
+
+
+def main(args):
+    conn = None
+    try:
+        conn = mysql.connector.connect(**connection_config(args, DB_CONFIG))
+        pack = read_index_pack(args.indexes)
+        tables = {table for _, table, _ in pack}
+        params = report_parameters(conn)
+        print(f"Index pack: {len(pack)} indexes on {', '.join(sorted(tables))}")
+        print(f"Parameters: {params}\n")
+
+        print("Measuring without the index pack...")
+        drop_pack(conn, pack)
+        analyze(conn, tables)
+        before = measure(conn, params, args.runs)
+
+        print("Creating the index pack...")
+        build_seconds = create_pack(conn, pack)
+        analyze(conn, tables)
+        print(f"Indexes created in {sum(build_seconds.values()):.1f}s\n")
+
+        print("Measuring with the index pack...")
+        after = measure(conn, params, args.runs)
+        print()
+        print_comparison(before, after)
+
+        if args.report:
+            report = {
+                'parameters': params,
+                'runs': args.runs,
+                'index_build_seconds': build_seconds,
+                'queries': {
+                    name: {'description': description, 'before': before[name], 'after': after[name]}
+                    for name, (description, _) in REPORT_QUERIES.items()
+                },
+            }
+            with open(args.report, 'w', encoding='utf-8') as report_file:
+                json.dump(report, report_file, indent=2, default=str)
+            print(f"\nReport written to {args.report}")
+
+    except mysql.connector.Error as err:
+        print(f"MySQL Error: {err}")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
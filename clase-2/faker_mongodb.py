@@ -1,10 +1,25 @@
 # Script para poblar la base de datos MongoDB de escuela con datos ficticios
+import argparse
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
 from pymongo import MongoClient
+from pymongo.write_concern import WriteConcern
 from faker import Faker
 from datetime import datetime, timedelta
 import random
+import time
+import numpy as np
+from seed_bench import Benchmark, add_connection_arguments, add_scale_arguments, connection_config, scale_counts
+from seed_pools import VALUE_POOL_SIZE, EntityColumns, FakerValues, UniqueEmails, distinct_pairs
+import bson
 from bson import ObjectId
 
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:  # motor solo hace falta con --async
+    AsyncIOMotorClient = None
+
 # Inicializar Faker
 fake = Faker('es_ES')  # Configurado para español
 
@@ -22,218 +37,500 @@ NUM_TEACHERS = 1000
 NUM_COURSES = 30
 NUM_ENROLLMENTS = 6000
 
+# Semilla para reproducir la misma carga (None = aleatoria)
+SEED = None
+# Directorio donde se guardan los valores generados por Faker para reutilizarlos (None = sin caché)
+VALUE_CACHE_DIR = None
+
+# Documentos por insert_many
+BATCH_SIZE = 1000
+# Hilos que envían lotes a la vez (1 = en serie)
+INSERT_THREADS = 1
+# Con --async: insert_many en vuelo y lotes generados por adelantado en la cola de cada colección
+ASYNC_CONCURRENCY = 2
+ASYNC_QUEUE_SIZE = 4
+
+COURSE_SUBJECTS = [
+    'Matemáticas Avanzadas', 'Historia Mundial', 'Química Orgánica', 'Literatura Española',
+    'Física Cuántica', 'Biología Molecular', 'Programación Python', 'Arte Contemporáneo',
+    'Geografía Humana', 'Filosofía Moderna', 'Inglés Básico', 'Francés Intermedio',
+    'Estadística', 'Economía', 'Sociología', 'Psicología', 'Arquitectura',
+    'Ingeniería Civil', 'Medicina General', 'Derecho Constitucional', 'Administración',
+    'Marketing Digital', 'Diseño Gráfico', 'Música Clásica', 'Educación Física',
+    'Nutrición', 'Veterinaria', 'Agricultura', 'Astronomía', 'Geología'
+]
+
+# Índices de cada colección: (claves, opciones de create_index)
+INDEXES = {
+    'teachers': [('email', {'unique': True})],
+    'students': [('email', {'unique': True}), ('student_id', {'unique': True})],
+    'courses': [('teacher_id', {})],
+    'enrollments': [([('student_id', 1), ('course_id', 1)], {'unique': True}), ('enrollment_date', {})],
+}
 
-def generate_unique_email(used_emails):
-    """Genera un email único que no esté en el conjunto de emails usados"""
-    max_attempts = 1000
-    attempts = 0
+# Forma de las matrículas: campos del estudiante y del curso copiados en cada documento
+# reference solo guarda student_id y course_id; full es la forma original con la descripción del curso
+ENROLLMENT_SHAPES = {
+    'reference': {},
+    'partial': {
+        'student_info': ('first_name', 'last_name'),
+        'course_info': ('name', 'credits'),
+    },
+    'full': {
+        'student_info': ('first_name', 'last_name', 'email', 'student_id'),
+        'course_info': ('name', 'description', 'credits'),
+    },
+}
 
-    while attempts < max_attempts:
-        email = fake.email()
-        if email not in used_emails:
-            used_emails.add(email)
-            return email
-        attempts += 1
 
-    # Si después de muchos intentos no encuentra uno único, crear uno con timestamp
-    unique_email = f"{fake.user_name()}{int(datetime.now().timestamp())}@{fake.domain_name()}"
-    used_emails.add(unique_email)
-    return unique_email
+def object_id_column(ids):
+    """Guarda los ObjectId como 12 bytes por fila en un arreglo de NumPy"""
+    return np.frombuffer(b''.join(object_id.binary for object_id in ids), dtype='V12')
+
+
+def parse_args():
+    """Lee las opciones de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Puebla la base de datos MongoDB de escuela con datos ficticios')
+    parser.add_argument('--seed', type=int, default=SEED,
+                        help='semilla para reproducir la misma carga')
+    parser.add_argument('--value-cache', default=VALUE_CACHE_DIR,
+                        help='directorio donde se guardan los valores de Faker para reutilizarlos')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='documentos por insert_many')
+    parser.add_argument('--unordered', action='store_true',
+                        help='insert_many con ordered=False: el servidor no se detiene en el primer error')
+    parser.add_argument('--w', type=write_concern_w, default=1,
+                        help='write concern: 0 (sin confirmación), 1, 2... o majority')
+    parser.add_argument('--journal', action='store_true',
+                        help='esperar a que cada lote se escriba en el journal (j=True)')
+    parser.add_argument('--threads', type=int, default=INSERT_THREADS,
+                        help='hilos que envían lotes a la vez sobre el mismo cliente')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='cargar con Motor: la generación de cada lote se solapa con la inserción del '
+                             'anterior y las cuatro colecciones se cargan a la vez')
+    parser.add_argument('--concurrency', type=int, default=ASYNC_CONCURRENCY,
+                        help='con --async, insert_many en vuelo por colección')
+    parser.add_argument('--queue-size', type=int, default=ASYNC_QUEUE_SIZE,
+                        help='con --async, lotes generados que pueden esperar en la cola de cada colección')
+    parser.add_argument('--shape', choices=list(ENROLLMENT_SHAPES), default='full',
+                        help='datos del estudiante y del curso embebidos en cada matrícula (compare_shapes.py las compara)')
+    parser.add_argument('--index-strategy', choices=['before', 'after'], default='after',
+                        help='crear los índices en las colecciones vacías antes de la carga o al terminarla')
+    add_scale_arguments(parser)
+    add_connection_arguments(parser, MONGO_CONFIG)
+    return parser.parse_args()
+
+
+def write_concern_w(value):
+    """Valor de w: un número de nodos o el nombre de un modo como majority"""
+    return int(value) if value.isdigit() else value
+
+
+def insert_batch(collection, documents, ordered):
+    """Inserta un lote y devuelve sus documentos, sus bytes en BSON y la latencia del insert_many"""
+    nbytes = sum(len(bson.encode(document)) for document in documents)
+    started = time.perf_counter()
+    collection.insert_many(documents, ordered=ordered)
+    return len(documents), nbytes, time.perf_counter() - started
+
+
+class BatchWriter:
+    """Agrupa documentos en lotes de insert_many y los envía en serie o repartidos en un pool de hilos
+
+    Los _id se asignan en el cliente, así que se conocen sin esperar a que
+    el lote termine. Con executor hay como máximo
+    dos lotes por hilo en vuelo, para que la memoria no crezca con la carga.
+    Los contadores y la latencia de cada lote se suman al benchmark en el
+    hilo principal; como tiempo en la base de datos cuenta lo que el hilo
+    principal espera a los lotes, no la suma de latencias de los hilos.
+    """
+
+    def __init__(self, collection, benchmark, batch_size, ordered, executor=None, threads=1):
+        self.collection = collection
+        self.benchmark = benchmark
+        self.batch_size = batch_size
+        self.ordered = ordered
+        self.executor = executor
+        self.max_pending = 2 * threads
+        self.documents = []
+        self.pending = set()
+        self.total = 0
+
+    def add(self, document):
+        """Agrega un documento, le asigna su _id si no lo trae y envía el lote cuando está lleno"""
+        document.setdefault('_id', ObjectId())
+        self.documents.append(document)
+        if len(self.documents) >= self.batch_size:
+            self.flush()
+        return document['_id']
+
+    def flush(self):
+        """Envía el lote en curso"""
+        if not self.documents:
+            return
+        documents, self.documents = self.documents, []
+        if self.executor is None:
+            batch = insert_batch(self.collection, documents, self.ordered)
+            self.record(batch)
+            self.benchmark.record(self.collection.name, db_seconds=batch[2])
+            return
+        while len(self.pending) >= self.max_pending:
+            with self.benchmark.db(self.collection.name):
+                done = wait(self.pending, return_when=FIRST_COMPLETED).done
+            self.collect(done)
+        self.pending.add(self.executor.submit(insert_batch, self.collection, documents, self.ordered))
+
+    def collect(self, done):
+        """Suma al benchmark los lotes terminados; un error en un lote se relanza aquí"""
+        for future in done:
+            self.pending.discard(future)
+            self.record(future.result())
+
+    def record(self, batch):
+        count, nbytes, seconds = batch
+        name = self.collection.name
+        self.benchmark.record(name, rows=count, nbytes=nbytes)
+        self.benchmark.batch(name, seconds)
+        self.total += count
+
+    def close(self):
+        """Envía el último lote, espera a todos los pendientes y devuelve el total de documentos insertados"""
+        self.flush()
+        if self.pending:
+            with self.benchmark.db(self.collection.name):
+                done = wait(self.pending).done
+            self.collect(done)
+        return self.total
+
+
+def write_all(writer, documents):
+    """Envía todos los documentos con un BatchWriter y devuelve cuántos se insertaron"""
+    for document in documents:
+        writer.add(document)
+    return writer.close()
+
+
+def batched(documents, size):
+    """Agrupa un iterable de documentos en listas de hasta size"""
+    iterator = iter(documents)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+async def insert_async(collection, benchmark, documents, args):
+    """Carga una colección con Motor a través de una cola acotada
+
+    El productor genera un lote y lo deja en la cola mientras hasta
+    --concurrency consumidores esperan sus insert_many, así la generación del
+    lote siguiente se solapa con la inserción del anterior. Con la cola llena
+    el productor espera: ese tiempo es el que se cuenta en la base de datos.
+    """
+    name = collection.name
+    queue = asyncio.Queue(maxsize=args.queue_size)
+    started = time.perf_counter()
+    waited = 0.0
+
+    async def produce():
+        nonlocal waited
+        for batch in batched(documents, args.batch_size):
+            nbytes = sum(len(bson.encode(document)) for document in batch)
+            start = time.perf_counter()
+            await queue.put((batch, nbytes))
+            waited += time.perf_counter() - start
+            # Cede el bucle para que avancen los consumidores y las otras colecciones
+            await asyncio.sleep(0)
+        for _ in range(args.concurrency):
+            await queue.put(None)
+
+    async def consume():
+        while (item := await queue.get()) is not None:
+            batch, nbytes = item
+            start = time.perf_counter()
+            await collection.insert_many(batch, ordered=not args.unordered)
+            benchmark.record(name, rows=len(batch), nbytes=nbytes)
+            benchmark.batch(name, time.perf_counter() - start)
+
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(consume()) for _ in range(args.concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    benchmark.record(name, seconds=time.perf_counter() - started, db_seconds=waited)
+    print(f"Insertados {benchmark.stats(name)['rows']} documentos en {name}")
+
+
+async def load_async(config, write_concern, benchmark, loads, args):
+    """Carga a la vez las colecciones de loads (nombre -> documentos) con un cliente de Motor"""
+    if AsyncIOMotorClient is None:
+        raise RuntimeError("--async necesita el paquete motor (pip install motor)")
+    client = AsyncIOMotorClient(
+        host=config['host'],
+        port=config['port'],
+        username=config['username'],
+        password=config['password'],
+        authSource=config['authSource']
+    )
+    try:
+        db = client[config['database']]
+        await asyncio.gather(*(
+            insert_async(db.get_collection(name, write_concern=write_concern), benchmark, documents, args)
+            for name, documents in loads.items()
+        ))
+    finally:
+        client.close()
 
 
-def main():
+def teacher_columns(values, emails, count):
+    """Campos de los profesores muestreados de una vez, con sus _id asignados en el cliente"""
+    return {
+        '_id': [ObjectId() for _ in range(count)],
+        'first_name': values.sample('first_name', count),
+        'last_name': values.sample('last_name', count),
+        'department': values.sample('job', count),
+        'phone': values.sample('phone_number', count),
+        'email': emails.take(count),
+    }
+
+
+def teacher_documents(columns):
+    """Genera los documentos de los profesores"""
+    for i in range(len(columns['_id'])):
+        yield {
+            '_id': columns['_id'][i],
+            'first_name': columns['first_name'][i],
+            'last_name': columns['last_name'][i],
+            'email': columns['email'][i],
+            'department': columns['department'][i],
+            'phone': columns['phone'][i],
+            'created_at': datetime.now()
+        }
+
+
+def course_documents(values, teachers, count, rng):
+    """Documentos de los cursos, con los datos de un profesor al azar embebidos"""
+    courses = []
+    for _ in range(count):
+        teacher = teachers.row(rng.randrange(len(teachers)))
+        courses.append({
+            '_id': ObjectId(),
+            'name': rng.choice(COURSE_SUBJECTS),
+            'description': values.choice('text', max_nb_chars=200),
+            'teacher_id': ObjectId(teacher['_id']),
+            'teacher_info': {
+                'first_name': teacher['first_name'],
+                'last_name': teacher['last_name'],
+                'email': teacher['email']
+            },
+            'credits': rng.choice([3, 4, 5, 6]),
+            'duration_weeks': rng.choice([12, 16, 20]),
+            'created_at': datetime.now()
+        })
+    return courses
+
+
+def student_columns(values, emails, count):
+    """Campos de los estudiantes muestreados de una vez, con sus _id asignados en el cliente"""
+    return {
+        '_id': [ObjectId() for _ in range(count)],
+        'first_name': values.sample('first_name', count),
+        'last_name': values.sample('last_name', count),
+        'street': values.sample('street_address', count),
+        'city': values.sample('city', count),
+        'state': values.sample('state', count),
+        'postal_code': values.sample('postcode', count),
+        'phone': values.sample('phone_number', count),
+        'email': emails.take(count),
+        'student_id': [f"STU{str(i+1).zfill(6)}" for i in range(count)],
+    }
+
+
+def student_documents(columns, rng):
+    """Genera los documentos de los estudiantes"""
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    for i in range(len(columns['_id'])):
+        yield {
+            '_id': columns['_id'][i],
+            'first_name': columns['first_name'][i],
+            'last_name': columns['last_name'][i],
+            # Entre 16 y 25 años, como datetime porque BSON no guarda fechas sin hora
+            'birth_date': today - timedelta(days=rng.randint(16 * 365, 26 * 365 - 1)),
+            'email': columns['email'][i],
+            'address': {
+                'street': columns['street'][i],
+                'city': columns['city'][i],
+                'state': columns['state'][i],
+                'postal_code': columns['postal_code'][i],
+                'country': 'España'
+            },
+            'phone': columns['phone'][i],
+            'student_id': columns['student_id'][i],
+            'enrollment_year': rng.choice([2020, 2021, 2022, 2023, 2024]),
+            'status': rng.choice(['active', 'inactive', 'graduated']),
+            'created_at': datetime.now()
+        }
+
+
+def enrollment_documents(students, courses, pairs, shape, rng):
+    """Genera las matrículas de los pares (estudiante, curso) con las copias de la forma elegida"""
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    for student_position, course_position in zip(*(positions.tolist() for positions in pairs)):
+        student = students.row(student_position)
+        course = courses[course_position]
+        document = {
+            'student_id': ObjectId(student['_id']),
+            'course_id': course['_id']
+        }
+        # Copias del estudiante y del curso según --shape
+        sources = {'student_info': student, 'course_info': course}
+        for field, names in ENROLLMENT_SHAPES[shape].items():
+            document[field] = {name: sources[field][name] for name in names}
+        document.update({
+            'enrollment_date': today - timedelta(days=rng.randint(0, 90)),
+            'status': rng.choice(['enrolled', 'completed', 'withdrawn', 'pending']),
+            'grade': rng.choice([None, rng.randint(60, 100)]),
+            'semester': rng.choice(['2024-1', '2024-2', '2025-1']),
+            'created_at': datetime.now()
+        })
+        yield document
+
+
+def create_indexes(collection):
+    """Crea los índices de INDEXES y devuelve los segundos que tardó cada colección"""
+    seconds = {}
+    for name, indexes in INDEXES.items():
+        started = time.perf_counter()
+        for keys, options in indexes:
+            collection[name].create_index(keys, **options)
+        seconds[name] = round(time.perf_counter() - started, 3)
+    return seconds
+
+
+def print_latencies(report):
+    """Muestra documentos por segundo y la latencia de los lotes de cada colección"""
+    print("\n--- Rendimiento de inserción ---")
+    for name, stats in report['tables'].items():
+        latency = stats.get('batch_latency_ms')
+        if not latency:
+            continue
+        histogram = ', '.join(f"{bucket} ms: {count}" for bucket, count in latency['histogram'].items())
+        print(f"{name}: {stats['rows_per_second']} docs/s, {latency['batches']} lotes, "
+              f"p50 {latency['p50']} ms, p90 {latency['p90']} ms, p99 {latency['p99']} ms, máx {latency['max']} ms")
+        print(f"  {histogram}")
+
+
+def main(args):
+    executor = None
     try:
+        # --scale-factor multiplica todos los NUM_*
+        scale_counts(globals(), args.scale_factor)
+        benchmark = Benchmark()
+        config = connection_config(args, MONGO_CONFIG)
+
         # Conectar a MongoDB
         client = MongoClient(
-            host=MONGO_CONFIG['host'],
-            port=MONGO_CONFIG['port'],
-            username=MONGO_CONFIG['username'],
-            password=MONGO_CONFIG['password'],
-            authSource=MONGO_CONFIG['authSource']
+            host=config['host'],
+            port=config['port'],
+            username=config['username'],
+            password=config['password'],
+            authSource=config['authSource']
         )
 
         # Seleccionar la base de datos
-        db = client[MONGO_CONFIG['database']]
-
-        # Conjunto para rastrear emails únicos
-        used_emails = set()
-
-        # Limpiar colecciones existentes
-        db.teachers.delete_many({})
-        db.courses.delete_many({})
-        db.students.delete_many({})
-        db.enrollments.delete_many({})
-        print("Colecciones limpiadas")
-
-        # Poblar teachers (profesores) - usando inserción por lotes para mejor rendimiento
-        print("Insertando profesores...")
-        teachers_data = []
-
-        for i in range(NUM_TEACHERS):
-            teacher_doc = {
-                'first_name': fake.first_name(),
-                'last_name': fake.last_name(),
-                'email': generate_unique_email(used_emails),
-                'department': fake.job(),
-                'phone': fake.phone_number(),
-                'created_at': datetime.now()
-            }
-            teachers_data.append(teacher_doc)
-
-            # Mostrar progreso cada 100 registros
-            if (i + 1) % 100 == 0:
-                print(f"Preparando profesores: {i + 1}/{NUM_TEACHERS}")
-
-        # Insertar teachers en lote
-        result = db.teachers.insert_many(teachers_data)
-        print(f"Insertados {NUM_TEACHERS} profesores")
-
-        # Poblar courses (cursos)
-        course_subjects = [
-            'Matemáticas Avanzadas', 'Historia Mundial', 'Química Orgánica', 'Literatura Española',
-            'Física Cuántica', 'Biología Molecular', 'Programación Python', 'Arte Contemporáneo',
-            'Geografía Humana', 'Filosofía Moderna', 'Inglés Básico', 'Francés Intermedio',
-            'Estadística', 'Economía', 'Sociología', 'Psicología', 'Arquitectura',
-            'Ingeniería Civil', 'Medicina General', 'Derecho Constitucional', 'Administración',
-            'Marketing Digital', 'Diseño Gráfico', 'Música Clásica', 'Educación Física',
-            'Nutrición', 'Veterinaria', 'Agricultura', 'Astronomía', 'Geología'
-        ]
-
-        print("Insertando cursos...")
-        courses_data = []
-
-        for i in range(NUM_COURSES):
-            teacher = random.choice(teachers_data)
-            course_doc = {
-                'name': random.choice(course_subjects),
-                'description': fake.text(max_nb_chars=200),
-                'teacher_id': teacher['_id'] if '_id' in teacher else None,
-                'teacher_info': {
-                    'first_name': teacher['first_name'],
-                    'last_name': teacher['last_name'],
-                    'email': teacher['email']
-                },
-                'credits': random.choice([3, 4, 5, 6]),
-                'duration_weeks': random.choice([12, 16, 20]),
-                'created_at': datetime.now()
-            }
-            courses_data.append(course_doc)
-
-        # Insertar courses en lote
-        result = db.courses.insert_many(courses_data)
-
-        # Actualizar courses_data con los IDs generados
-        for i, course_id in enumerate(result.inserted_ids):
-            courses_data[i]['_id'] = course_id
-
-        print(f"Insertados {NUM_COURSES} cursos")
-
-        # Poblar students (estudiantes) - usando inserción por lotes
-        print("Insertando estudiantes...")
-        students_data = []
-
-        for i in range(NUM_STUDENTS):
-            birth_date = fake.date_of_birth(minimum_age=16, maximum_age=25)
-            student_doc = {
-                'first_name': fake.first_name(),
-                'last_name': fake.last_name(),
-                'birth_date': datetime.combine(birth_date, datetime.min.time()),  # Convertir date a datetime
-                'email': generate_unique_email(used_emails),
-                'address': {
-                    'street': fake.street_address(),
-                    'city': fake.city(),
-                    'state': fake.state(),
-                    'postal_code': fake.postcode(),
-                    'country': 'España'
-                },
-                'phone': fake.phone_number(),
-                'student_id': f"STU{str(i+1).zfill(6)}",
-                'enrollment_year': random.choice([2020, 2021, 2022, 2023, 2024]),
-                'status': random.choice(['active', 'inactive', 'graduated']),
-                'created_at': datetime.now()
-            }
-            students_data.append(student_doc)
-
-            # Mostrar progreso cada 500 registros
-            if (i + 1) % 500 == 0:
-                print(f"Preparando estudiantes: {i + 1}/{NUM_STUDENTS}")
-
-        # Insertar students en lotes de 1000 para mejor rendimiento
-        batch_size = 1000
-        for i in range(0, len(students_data), batch_size):
-            batch = students_data[i:i + batch_size]
-            result = db.students.insert_many(batch)
-
-            # Actualizar con los IDs generados
-            for j, student_id in enumerate(result.inserted_ids):
-                students_data[i + j]['_id'] = student_id
-
-            print(f"Insertado lote de estudiantes: {min(i + batch_size, len(students_data))}/{NUM_STUDENTS}")
-
-        print(f"Insertados {NUM_STUDENTS} estudiantes")
-
-        # Poblar enrollments (matrículas)
-        print("Insertando matrículas...")
-        enrollments_data = []
-        enrollment_combinations = set()
-        enrollments_created = 0
-
-        for i in range(NUM_ENROLLMENTS):
-            student = random.choice(students_data)
-            course = random.choice(courses_data)
-            combination = (student['_id'], course['_id'])
-
-            # Evitar combinaciones duplicadas
-            if combination in enrollment_combinations:
-                continue
-
-            enrollment_combinations.add(combination)
-
-            enrollment_doc = {
-                'student_id': student['_id'],
-                'course_id': course['_id'],
-                'student_info': {
-                    'first_name': student['first_name'],
-                    'last_name': student['last_name'],
-                    'email': student['email'],
-                    'student_id': student['student_id']
-                },
-                'course_info': {
-                    'name': course['name'],
-                    'description': course['description'],
-                    'credits': course['credits']
-                },
-                'enrollment_date': datetime.combine(fake.date_between(start_date='-90d', end_date='today'), datetime.min.time()),  # Convertir date a datetime
-                'status': random.choice(['enrolled', 'completed', 'withdrawn', 'pending']),
-                'grade': random.choice([None, fake.random_int(min=60, max=100)]),
-                'semester': random.choice(['2024-1', '2024-2', '2025-1']),
-                'created_at': datetime.now()
-            }
-
-            enrollments_data.append(enrollment_doc)
-            enrollments_created += 1
-
-            # Insertar en lotes de 1000
-            if len(enrollments_data) >= 1000:
-                db.enrollments.insert_many(enrollments_data)
-                print(f"Matrículas insertadas: {enrollments_created}")
-                enrollments_data = []
-
-        # Insertar el lote restante
-        if enrollments_data:
-            db.enrollments.insert_many(enrollments_data)
-
-        print(f"Insertadas {enrollments_created} matrículas")
-
-        # Crear índices para mejorar el rendimiento
-        print("Creando índices...")
-        db.teachers.create_index("email", unique=True)
-        db.students.create_index("email", unique=True)
-        db.students.create_index("student_id", unique=True)
-        db.courses.create_index("teacher_id")
-        db.enrollments.create_index([("student_id", 1), ("course_id", 1)], unique=True)
-        db.enrollments.create_index("enrollment_date")
-        print("Índices creados")
+        db = client[config['database']]
+
+        # Las inserciones usan el write concern de --w/--journal; los lotes se reparten entre --threads hilos
+        write_concern = WriteConcern(w=args.w, j=True if args.journal else None)
+        collection = {name: db.get_collection(name, write_concern=write_concern)
+                      for name in ('teachers', 'courses', 'students', 'enrollments')}
+        if args.threads > 1:
+            executor = ThreadPoolExecutor(max_workers=args.threads)
+
+        def writer(name):
+            return BatchWriter(collection[name], benchmark, args.batch_size, not args.unordered,
+                               executor, args.threads)
+
+        # Nombres, direcciones y textos se toman de pools en lugar de llamar a Faker por fila
+        # Cada pool tiene a lo sumo tantos valores como documentos que lo usan
+        people = NUM_TEACHERS + NUM_STUDENTS
+        values = FakerValues(fake, VALUE_POOL_SIZE, args.value_cache, args.seed, {
+            'first_name': people, 'last_name': people, 'user_name': people, 'domain_name': people,
+            'phone_number': people, 'job': NUM_TEACHERS, 'text': NUM_COURSES, 'street_address': NUM_STUDENTS,
+            'city': NUM_STUDENTS, 'state': NUM_STUDENTS, 'postcode': NUM_STUDENTS,
+        })
+        if args.seed is not None:
+            random.seed(args.seed)
+
+        # Emails únicos con un contador como sufijo: sin conjunto de emails usados
+        emails = UniqueEmails(values)
+
+        # Eliminar las colecciones existentes: drop() libera el almacenamiento y los índices
+        # de una vez, en lugar de borrar documento por documento con delete_many
+        for name in collection:
+            collection[name].drop()
+        print("Colecciones eliminadas")
+
+        # Con --index-strategy before cada inserción mantiene los índices; con after se construyen
+        # al final en una sola pasada sobre los datos
+        if args.index_strategy == 'before':
+            print("Creando índices antes de la carga...")
+            index_seconds = create_indexes(collection)
+            print(f"Índices creados en {sum(index_seconds.values()):.2f}s")
+
+        # Los campos que leen otras colecciones se muestrean primero y los _id se asignan en el cliente,
+        # así los cursos y las matrículas se generan sin esperar a que se inserten los profesores y estudiantes.
+        # Cada colección usa su propio generador aleatorio para que --seed reproduzca los mismos documentos
+        # aunque con --async se generen intercalados
+        def rng(name):
+            return random.Random(f'{args.seed}:{name}' if args.seed is not None else None)
+
+        teacher_data = teacher_columns(values, emails, NUM_TEACHERS)
+        teachers = EntityColumns({
+            '_id': object_id_column(teacher_data['_id']),
+            'first_name': teacher_data['first_name'],
+            'last_name': teacher_data['last_name'],
+            'email': teacher_data['email']
+        })
+        courses_data = course_documents(values, teachers, NUM_COURSES, rng('courses'))
+        student_data = student_columns(values, emails, NUM_STUDENTS)
+        students = EntityColumns({
+            '_id': object_id_column(student_data['_id']),
+            **{name: student_data[name] for name in ('first_name', 'last_name', 'email', 'student_id')}
+        })
+
+        # Pares (estudiante, curso) distintos muestreados sin reemplazo: se llega a NUM_ENROLLMENTS
+        # en una sola pasada, sin descartar duplicados
+        pairs = distinct_pairs(np.random.default_rng(args.seed), len(students), len(courses_data), NUM_ENROLLMENTS)
+
+        loads = {
+            'teachers': teacher_documents(teacher_data),
+            'courses': courses_data,
+            'students': student_documents(student_data, rng('students')),
+            'enrollments': enrollment_documents(students, courses_data, pairs, args.shape, rng('enrollments')),
+        }
+        labels = {'teachers': 'profesores', 'courses': 'cursos', 'students': 'estudiantes',
+                  'enrollments': 'matrículas'}
+
+        load_started = time.perf_counter()
+        if args.use_async:
+            print("Insertando las colecciones a la vez con Motor...")
+            asyncio.run(load_async(config, write_concern, benchmark, loads, args))
+        else:
+            # En serie, una colección detrás de otra, con los lotes repartidos entre --threads hilos
+            for name, documents in loads.items():
+                print(f"Insertando {labels[name]}...")
+                with benchmark.table(name):
+                    inserted = write_all(writer(name), documents)
+                print(f"Insertados {inserted} {labels[name]}")
+        load_seconds = time.perf_counter() - load_started
+        del loads, teacher_data, student_data
+
+        if args.index_strategy == 'after':
+            print("Creando índices...")
+            index_seconds = create_indexes(collection)
+            print(f"Índices creados en {sum(index_seconds.values()):.2f}s")
+        print(f"Estrategia de índices '{args.index_strategy}': carga {load_seconds:.2f}s, "
+              f"índices {sum(index_seconds.values()):.2f}s, total {load_seconds + sum(index_seconds.values()):.2f}s")
 
         # Mostrar estadísticas finales
         print("\n--- Estadísticas Finales ---")
@@ -241,14 +538,23 @@ def main():
         print(f"Students: {db.students.count_documents({})}")
         print(f"Courses: {db.courses.count_documents({})}")
         print(f"Enrollments: {db.enrollments.count_documents({})}")
-        print(f"Emails únicos utilizados: {len(used_emails)}")
+        print(f"Emails únicos utilizados: {len(emails)}")
 
         client.close()
         print('\nDatos generados exitosamente en MongoDB.')
 
+        print_latencies(benchmark.report())
+        if args.report:
+            benchmark.write(args.report, script='faker_mongodb', scale_factor=args.scale_factor, seed=args.seed,
+                            index_strategy=args.index_strategy, index_seconds=index_seconds, shape=args.shape,
+                            mode='async' if args.use_async else 'sync', load_seconds=round(load_seconds, 3))
+
     except Exception as e:
         print(f"Error inesperado: {e}")
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
 
 
 if __name__ == "__main__":
-    main()
+    main(parse_args())
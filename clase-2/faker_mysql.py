@@ -1,8 +1,13 @@
 # Script para poblar la base de datos MySQL de escuela con datos ficticios
+import argparse
 import mysql.connector
 from faker import Faker
-from datetime import datetime, timedelta
 import random
+import numpy as np
+import seed_columns as columns
+from seed_bench import Benchmark, add_connection_arguments, add_scale_arguments, connection_config, scale_counts
+from seed_mysql import BATCH_SIZE, IdAllocator, open_loader
+from seed_pools import VALUE_POOL_SIZE, FakerValues, UniqueEmails, distinct_pairs
 
 # Inicializar Faker
 fake = Faker('es_ES')  # Configurado para español
@@ -20,63 +25,94 @@ NUM_TEACHERS = 1000
 NUM_COURSES = 30
 NUM_ENROLLMENTS = 6000
 
+# Semilla para reproducir la misma carga (None = aleatoria)
+SEED = None
+# insert: INSERT de varias filas por lote, infile: LOAD DATA LOCAL INFILE (con INSERT si el servidor lo rechaza)
+LOAD_MODE = 'insert'
+# Directorio donde se guardan los valores generados por Faker para reutilizarlos (None = sin caché)
+VALUE_CACHE_DIR = None
+
+
+def parse_args():
+    """Lee las opciones de línea de comandos"""
+    parser = argparse.ArgumentParser(description='Puebla la base de datos school con datos ficticios')
+    parser.add_argument('--seed', type=int, default=SEED,
+                        help='semilla para reproducir la misma carga')
+    parser.add_argument('--value-cache', default=VALUE_CACHE_DIR,
+                        help='directorio donde se guardan los valores de Faker para reutilizarlos')
+    parser.add_argument('--mode', choices=['insert', 'infile'], default=LOAD_MODE,
+                        help='insert: INSERT de varias filas, infile: LOAD DATA LOCAL INFILE para escalas grandes')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='filas enviadas en cada INSERT')
+    add_scale_arguments(parser)
+    add_connection_arguments(parser, DB_CONFIG)
+    return parser.parse_args()
+
+
+def finish_table(conn, benchmark, loader):
+    """Escribe las filas pendientes, confirma la transacción de la tabla y devuelve las filas insertadas"""
+    loader.flush()
+    with benchmark.db(loader.table):
+        conn.commit()
+    return loader.close()
 
-def generate_unique_email(used_emails):
-    """Genera un email único que no esté en el conjunto de emails usados"""
-    max_attempts = 1000
-    attempts = 0
-
-    while attempts < max_attempts:
-        email = fake.email()
-        if email not in used_emails:
-            used_emails.add(email)
-            return email
-        attempts += 1
 
-    # Si después de muchos intentos no encuentra uno único, crear uno con timestamp
-    unique_email = f"{fake.user_name()}{int(datetime.now().timestamp())}@{fake.domain_name()}"
-    used_emails.add(unique_email)
-    return unique_email
+def print_throughput(report):
+    """Muestra filas por segundo y MB/s de cada tabla y del total de la carga"""
+    print("\n--- Rendimiento de inserción ---")
+    for table, stats in report['tables'].items():
+        print(f"{table}: {stats['rows']} filas en {stats['seconds']}s, {stats['rows_per_second']} filas/s, "
+              f"{stats['mb_per_second']} MB/s, {stats['db_seconds']}s en MySQL")
+    print(f"Total: {report['rows']} filas en {report['elapsed_seconds']}s, {report['rows_per_second']} filas/s")
 
 
-def main():
+def main(args):
     try:
+        # --scale-factor multiplica todos los NUM_*
+        scale_counts(globals(), args.scale_factor)
+        benchmark = Benchmark()
+
         # Conectar a la base de datos
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = mysql.connector.connect(**connection_config(args, DB_CONFIG), allow_local_infile=args.mode == 'infile')
         cursor = conn.cursor()
 
-        # Conjunto para rastrear emails únicos
-        used_emails = set()
+        # Nombres, direcciones y textos se toman de pools en lugar de llamar a Faker por fila
+        # Cada pool tiene a lo sumo tantos valores como filas que lo usan
+        people = NUM_TEACHERS + NUM_STUDENTS
+        values = FakerValues(fake, VALUE_POOL_SIZE, args.value_cache, args.seed, {
+            'first_name': people, 'last_name': people, 'user_name': people, 'domain_name': people,
+            'text': NUM_COURSES,
+        })
+        if args.seed is not None:
+            random.seed(args.seed)
+        # Las fechas se generan por columnas con NumPy en lugar de llamar a Faker por fila
+        columns.seed(args.seed)
+
+        # Emails únicos con un contador como sufijo: sin conjunto de emails usados.
+        # El contador sigue a los ids existentes para no repetir emails de cargas anteriores
+        cursor.execute('SELECT (SELECT COALESCE(MAX(id), 0) FROM teachers) + (SELECT COALESCE(MAX(id), 0) FROM students)')
+        emails = UniqueEmails(values, start=cursor.fetchone()[0] + 1, max_length=100)  # VARCHAR(100)
+        cursor.close()
+
+        # Los ids se reservan en el cliente, así las filas llevan su id y se envían en lotes
+        # sin leer lastrowid; cada tabla se carga en una sola transacción
+        allocator = IdAllocator(conn)
+
+        def loader(table, columns):
+            return open_loader(conn, table, columns, args.mode, args.batch_size, benchmark)
 
         # Poblar teachers (profesores)
-        teachers = []
         print("Insertando profesores...")
-        for i in range(NUM_TEACHERS):
-            first_name = fake.first_name()
-            last_name = fake.last_name()
-            email = generate_unique_email(used_emails)
-
-            cursor.execute(
-                'INSERT INTO teachers (first_name, last_name, email) VALUES (%s, %s, %s)',
-                (first_name, last_name, email)
-            )
-            teacher_id = cursor.lastrowid
-            teachers.append({
-                'id': teacher_id,
-                'first_name': first_name,
-                'last_name': last_name,
-                'email': email
-            })
-
-            # Mostrar progreso cada 100 registros
-            if (i + 1) % 100 == 0:
-                print(f"Profesores insertados: {i + 1}/{NUM_TEACHERS}")
-
-        conn.commit()
-        print(f"Insertados {NUM_TEACHERS} profesores")
+        teacher_ids = allocator.reserve('teachers', NUM_TEACHERS)
+        teachers = loader('teachers', ('id', 'first_name', 'last_name', 'email'))
+        first_names = values.sample('first_name', NUM_TEACHERS)
+        last_names = values.sample('last_name', NUM_TEACHERS)
+        for i, teacher_id in enumerate(teacher_ids):
+            teachers.add((teacher_id, first_names[i], last_names[i], emails.next()))
+        finish_table(conn, benchmark, teachers)
+        print(f"Insertados {NUM_TEACHERS} profesores ({teachers.report()})")
 
         # Poblar courses (cursos)
-        courses = []
         course_subjects = [
             'Matemáticas Avanzadas',
             'Historia Mundial',
@@ -111,96 +147,53 @@ def main():
         ]
 
         print("Insertando cursos...")
-        for i in range(NUM_COURSES):
-            name = random.choice(course_subjects)
-            description = fake.text(max_nb_chars=200)
-            teacher_id = random.choice(teachers)['id']
-
-            cursor.execute(
-                'INSERT INTO courses (name, description, teacher_id) VALUES (%s, %s, %s)',
-                (name, description, teacher_id)
-            )
-            course_id = cursor.lastrowid
-            courses.append({
-                'id': course_id,
-                'name': name,
-                'description': description,
-                'teacher_id': teacher_id
-            })
-
-        conn.commit()
-        print(f"Insertados {NUM_COURSES} cursos")
+        course_ids = allocator.reserve('courses', NUM_COURSES)
+        courses = loader('courses', ('id', 'name', 'description', 'teacher_id'))
+        for course_id in course_ids:
+            courses.add((course_id, random.choice(course_subjects), values.choice('text', max_nb_chars=200),
+                         random.choice(teacher_ids)))
+        finish_table(conn, benchmark, courses)
+        print(f"Insertados {NUM_COURSES} cursos ({courses.report()})")
 
         # Poblar students (estudiantes)
-        students = []
         print("Insertando estudiantes...")
-        for i in range(NUM_STUDENTS):
-            first_name = fake.first_name()
-            last_name = fake.last_name()
-            # Generar fecha de nacimiento para estudiantes entre 16-25 años
-            birth_date = fake.date_of_birth(minimum_age=16, maximum_age=25)
-            email = generate_unique_email(used_emails)
-
-            cursor.execute(
-                'INSERT INTO students (first_name, last_name, birth_date, email) VALUES (%s, %s, %s, %s)',
-                (first_name, last_name, birth_date, email)
-            )
-            student_id = cursor.lastrowid
-            students.append({
-                'id': student_id,
-                'first_name': first_name,
-                'last_name': last_name,
-                'birth_date': birth_date,
-                'email': email
-            })
-
-            # Mostrar progreso cada 500 registros
-            if (i + 1) % 500 == 0:
-                print(f"Estudiantes insertados: {i + 1}/{NUM_STUDENTS}")
-
-        conn.commit()
-        print(f"Insertados {NUM_STUDENTS} estudiantes")
+        student_ids = allocator.reserve('students', NUM_STUDENTS)
+        students = loader('students', ('id', 'first_name', 'last_name', 'birth_date', 'email'))
+        first_names = values.sample('first_name', NUM_STUDENTS)
+        last_names = values.sample('last_name', NUM_STUDENTS)
+        # Fechas de nacimiento de estudiantes entre 16 y 25 años
+        birth_dates = columns.dates_between(NUM_STUDENTS, columns.days_ago(int(26 * 365.25) - 1),
+                                            columns.days_ago(int(16 * 365.25))).tolist()
+        for i, student_id in enumerate(student_ids):
+            students.add((student_id, first_names[i], last_names[i], birth_dates[i], emails.next()))
+        finish_table(conn, benchmark, students)
+        print(f"Insertados {NUM_STUDENTS} estudiantes ({students.report()})")
 
         # Poblar enrollments (matrículas)
         print("Insertando matrículas...")
-        enrollments_created = 0
-        enrollment_combinations = set()  # Para evitar duplicados
+        # Pares (estudiante, curso) distintos muestreados sin reemplazo: se llega a NUM_ENROLLMENTS
+        # en una sola pasada, sin descartar duplicados ni depender de errores de unicidad
+        student_positions, course_positions = distinct_pairs(
+            np.random.default_rng(args.seed), len(student_ids), len(course_ids), NUM_ENROLLMENTS)
+
+        enrollment_ids = allocator.reserve('enrollments', len(student_positions))
+        enrollments = loader('enrollments', ('id', 'student_id', 'course_id', 'enrollment_date'))
+        # Fechas de matrícula en los últimos 90 días
+        enrollment_dates = columns.dates_between(len(enrollment_ids), columns.days_ago(90), columns.today())
+        for row in columns.rows(enrollment_ids, student_ids.start + student_positions,
+                                course_ids.start + course_positions, enrollment_dates):
+            enrollments.add(row)
+        enrollments_created = finish_table(conn, benchmark, enrollments)
+        print(f"Insertadas {enrollments_created} matrículas ({enrollments.report()})")
 
-        for i in range(NUM_ENROLLMENTS):
-            student_id = random.choice(students)['id']
-            course_id = random.choice(courses)['id']
-            combination = (student_id, course_id)
-
-            # Evitar combinaciones duplicadas
-            if combination in enrollment_combinations:
-                continue
-
-            enrollment_combinations.add(combination)
-            # Fecha de matrícula en los últimos 90 días
-            enrollment_date = fake.date_between(start_date='-90d', end_date='today')
-
-            try:
-                cursor.execute(
-                    'INSERT INTO enrollments (student_id, course_id, enrollment_date) VALUES (%s, %s, %s)',
-                    (student_id, course_id, enrollment_date)
-                )
-                enrollments_created += 1
-
-                # Mostrar progreso cada 500 registros
-                if enrollments_created % 500 == 0:
-                    print(f"Matrículas insertadas: {enrollments_created}")
-
-            except mysql.connector.IntegrityError:
-                # Si hay un constraint de unicidad, continuar con la siguiente matrícula
-                continue
-
-        conn.commit()
-        print(f"Insertadas {enrollments_created} matrículas")
-
-        cursor.close()
         conn.close()
         print('Datos generados exitosamente en MySQL.')
 
+        print_throughput(benchmark.report())
+
+        if args.report:
+            benchmark.write(args.report, script='faker_mysql', scale_factor=args.scale_factor, seed=args.seed)
+
     except mysql.connector.Error as error:
         print(f"Error al conectar con MySQL: {error}")
     except Exception as e:
@@ -208,4 +201,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    main(parse_args())
@@ -1,10 +1,23 @@
 # Script to populate the sales database with fake data
 # Complete sales system with 20 related tables
+import argparse
 import mysql.connector
 from faker import Faker
 from datetime import datetime, timedelta
+from functools import partial
 import random
 import hashlib
+import tempfile
+import numpy as np
+import seed_columns as columns
+from seed_bench import Benchmark, add_connection_arguments, add_scale_arguments, connection_config, scale_counts
+from seed_checkpoint import Checkpoint, load_result
+from seed_ledger import balances, ledger, merge_ledgers, month_end, month_index
+from seed_mysql import BATCH_SIZE, IdAllocator, open_loader, bulk_update, defer_keys, restore_keys, session_checks
+from seed_pools import VALUE_POOL_SIZE, EntityColumns, FakerValues, UniqueCodes, UniqueEmails
+from seed_scheduler import Stage, merge_shards, run_stages, shard_ranges
+from ventas_partitions import PARTITIONED_TABLES, add_partitions
+from ventas_summaries import close_blocks, close_run_blocks, has_open_blocks, open_blocks, refresh_summaries
 
 # Initialize Faker
 fake = Faker('en_US')  # Configured for English
@@ -31,42 +44,39 @@ NUM_WAREHOUSES = 100
 NUM_PURCHASE_ORDERS = 10000
 NUM_SALES = 10000
 NUM_RETURNS = 1000
+# Stock adjustments and transfers, on top of the movements of sales and received purchase orders
+NUM_STOCK_OPERATIONS = 5000
 
+# Load mode: 'insert' uses multi-row INSERT, 'infile' uses LOAD DATA LOCAL INFILE
+LOAD_MODE = 'insert'
 
-def generate_unique_email(used_emails):
-    """Generates a unique email that is not in the set of used emails"""
-    max_attempts = 1000
-    attempts = 0
+# Rows per shard of the large fact tables; shards are the unit of parallel work and of seeding
+SHARD_SIZE = 2500
 
-    while attempts < max_attempts:
-        email = fake.email()
-        if email not in used_emails:
-            used_emails.add(email)
-            return email
-        attempts += 1
+# Days of history covered by sales, inventory movements and returns, up to the reference time
+HISTORY_DAYS = 182
 
-    # If no unique one is found, create one with timestamp
-    unique_email = f"{fake.user_name()}{int(datetime.now().timestamp())}@{fake.domain_name()}"
-    used_emails.add(unique_email)
-    return unique_email
+# Movement types that add stock to a warehouse; out and transfer take it out
+INBOUND_MOVEMENTS = ['in', 'adjustment']
 
+COUNTRIES = [
+    ('United States', 'USA'), ('Canada', 'CAN'), ('Mexico', 'MEX'), ('United Kingdom', 'GBR'),
+    ('Germany', 'DEU'), ('France', 'FRA'), ('Italy', 'ITA'), ('Spain', 'ESP'),
+    ('Brazil', 'BRA'), ('Argentina', 'ARG'), ('Chile', 'CHL'), ('Peru', 'PER'),
+    ('Colombia', 'COL'), ('China', 'CHN'), ('Japan', 'JPN'), ('South Korea', 'KOR'),
+    ('Australia', 'AUS'), ('India', 'IND'), ('Russia', 'RUS'), ('Netherlands', 'NLD')
+]
 
-def generate_unique_code(prefix, used_codes, length=8):
-    """Generates a unique code with prefix"""
-    max_attempts = 1000
-    attempts = 0
+# Top-level product categories, always inserted; NUM_CATEGORIES below their number adds no subcategories
+MAIN_CATEGORIES = [
+    'Electronics', 'Clothing & Footwear', 'Home & Garden', 'Sports', 'Books',
+    'Health & Beauty', 'Automotive', 'Toys', 'Music', 'Movies',
+    'Food', 'Beverages', 'Pet Supplies', 'Office Supplies', 'Tools'
+]
 
-    while attempts < max_attempts:
-        code = f"{prefix}{random.randint(10 ** (length - 1), (10 ** length) - 1)}"
-        if code not in used_codes:
-            used_codes.add(code)
-            return code
-        attempts += 1
-
-    # If no unique one is found, add timestamp
-    code = f"{prefix}{int(datetime.now().timestamp())}"
-    used_codes.add(code)
-    return code
+# Connection and value pools of the current process, opened by init_worker
+connection = None
+values = None
 
 
 def hash_password(password):
@@ -74,831 +84,1299 @@ def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 
-def main():
+def parse_args():
+    """Reads the command line options of the seeder"""
+    parser = argparse.ArgumentParser(description='Populates the sales_system database with fake data')
+    parser.add_argument('--mode', choices=['insert', 'infile'], default=LOAD_MODE,
+                        help='insert: multi-row INSERT, infile: LOAD DATA LOCAL INFILE with INSERT fallback')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='rows sent in each INSERT statement')
+    parser.add_argument('--id-source', choices=['auto_increment', 'max'], default='auto_increment',
+                        help='where the client-side id blocks start: AUTO_INCREMENT or SELECT MAX(id)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for Faker, the value pools and the NumPy columns to make runs reproducible')
+    parser.add_argument('--reference-time', type=datetime.fromisoformat, default=None,
+                        help='moment the date ranges are measured from (default now), e.g. 2024-06-30T12:00:00')
+    parser.add_argument('--value-pool-size', type=int, default=VALUE_POOL_SIZE,
+                        help='values generated per Faker provider before sampling')
+    parser.add_argument('--value-cache', default=None,
+                        help='directory where the Faker value pools are saved and reused between runs')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes running independent stages at the same time, each with its own connection')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE,
+                        help='rows per shard of purchase_orders, sales and inventory_movements; changes the generated data')
+    parser.add_argument('--checkpoint', default=None,
+                        help='directory where every finished stage and shard is recorded with its ids and seed')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue the run recorded in --checkpoint, skipping the finished stages and shards')
+    parser.add_argument('--defer-keys', metavar='FILE', default=None,
+                        help='drop secondary indexes and foreign keys before loading and add them back at the end; '
+                             'FILE keeps their definitions in between')
+    parser.add_argument('--partitions', action='store_true',
+                        help='add the monthly partitions of sales and inventory_movements covering the generated '
+                             'dates (schema from ventas_partitioned.sql)')
+    parser.add_argument('--summaries', action='store_true',
+                        help='refresh the daily summary tables of ventas_summaries.sql after loading')
+    add_scale_arguments(parser)
+    add_connection_arguments(parser, DB_CONFIG)
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint:
+        parser.error('--resume needs --checkpoint')
+    return args
+
+
+def connect(args):
+    """Opens a connection to the sales database, without key checks while the keys are deferred"""
+    conn = mysql.connector.connect(**connection_config(args, DB_CONFIG), allow_local_infile=args.mode == 'infile')
+    if args.defer_keys:
+        session_checks(conn, False)
+    return conn
+
+
+def entity_columns(name, key_columns):
+    """Columnar store of the keys of a stage, partitioned the way later stages draw from it"""
+    if name == 'employees':
+        return EntityColumns(key_columns, group_by='status',
+                             partitions={'manager': lambda e: np.char.find(e['position'], 'Manager') >= 0})
+    return EntityColumns(key_columns, group_by='status' if 'status' in key_columns else None)
+
+
+class StageContext:
+    """Connection, id blocks and value pools used by a stage in the current process"""
+
+    def __init__(self, args, ranges, shard, benchmark):
+        self.args = args
+        self.shard = shard
+        self.conn = connection
+        self.allocator = IdAllocator(connection, args.id_source, ranges)
+        self.values = values
+        self.benchmark = benchmark
+        self.make_loader = partial(open_loader, connection, mode=args.mode, batch_size=args.batch_size,
+                                   benchmark=benchmark)
+
+
+def seed_countries(ctx):
+    """Populates countries"""
+    print("Inserting countries...")
+    country_ids = ctx.allocator.reserve('countries', len(COUNTRIES))
+    inserter = ctx.make_loader('countries', ['id', 'name', 'iso_code'])
+    for i, (name, code) in enumerate(COUNTRIES):
+        inserter.add((country_ids[i], name, code))
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {len(COUNTRIES)} countries ({inserter.report()})\n")
+    return entity_columns('countries', {
+        'id': np.arange(country_ids.start, country_ids.stop),
+        'name': [name for name, code in COUNTRIES]
+    })
+
+
+def seed_regions(ctx, countries):
+    """Populates regions"""
+    print("Inserting regions...")
+    region_ids = ctx.allocator.reserve('regions', NUM_REGIONS)
+    inserter = ctx.make_loader('regions', ['id', 'name', 'country_id'])
+    states = ctx.values.sample('state', NUM_REGIONS)
+    country_rows = countries.draw(columns.rng, NUM_REGIONS)
+    country_ids = countries['id'][country_rows].tolist()
+    country_names = countries['name'][country_rows].tolist()
+    for i in range(NUM_REGIONS):
+        name = f"{states[i]} - {country_names[i]}"
+        inserter.add((region_ids[i], name, country_ids[i]))
+
+        if (i + 1) % 25 == 0:
+            print(f"Regions inserted: {i + 1}/{NUM_REGIONS}")
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {NUM_REGIONS} regions ({inserter.report()})\n")
+    return entity_columns('regions', {'id': np.arange(region_ids.start, region_ids.stop)})
+
+
+def seed_cities(ctx, regions):
+    """Populates cities"""
+    print("Inserting cities...")
+    city_ids = ctx.allocator.reserve('cities', NUM_CITIES)
+    inserter = ctx.make_loader('cities', ['id', 'name', 'region_id'])
+    city_names = ctx.values.sample('city', NUM_CITIES)
+    region_ids = regions['id'][regions.draw(columns.rng, NUM_CITIES)].tolist()
+    for i in range(NUM_CITIES):
+        inserter.add((city_ids[i], city_names[i], region_ids[i]))
+
+        if (i + 1) % 100 == 0:
+            print(f"Cities inserted: {i + 1}/{NUM_CITIES}")
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {NUM_CITIES} cities ({inserter.report()})\n")
+    return entity_columns('cities', {'id': np.arange(city_ids.start, city_ids.stop)})
+
+
+def seed_users(ctx):
+    """Populates users"""
+    print("Inserting users...")
+    user_ids = ctx.allocator.reserve('users', NUM_USERS)
+    inserter = ctx.make_loader(
+        'users',
+        ['id', 'email', 'password_hash', 'first_name', 'last_name', 'phone', 'birth_date', 'status']
+    )
+    password_hash = hash_password("password123")
+    # Birth dates between 18 and 70 years ago
+    birth_dates = columns.dates_between(NUM_USERS, columns.days_ago(70 * 365), columns.days_ago(18 * 365)).tolist()
+    statuses = columns.categorical(NUM_USERS, ['active', 'inactive', 'suspended'], [85, 10, 5]).tolist()
+    # Email suffixes follow the reserved ids, so they never repeat between runs
+    emails = UniqueEmails(ctx.values, start=user_ids.start, max_length=150)  # VARCHAR(150)
+    first_names = ctx.values.sample('first_name', NUM_USERS)
+    last_names = ctx.values.sample('last_name', NUM_USERS)
+    phones = ctx.values.sample('phone_number', NUM_USERS)
+
+    for i in range(NUM_USERS):
+        email = emails.next()
+        first_name = first_names[i][:100]  # Limit to VARCHAR(100)
+        last_name = last_names[i][:100]   # Limit to VARCHAR(100)
+        phone = phones[i][:20]     # Limit to VARCHAR(20)
+        birth_date = birth_dates[i]
+        status = statuses[i]
+
+        inserter.add((user_ids[i], email, password_hash, first_name, last_name, phone, birth_date, status))
+
+        if (i + 1) % 500 == 0:
+            print(f"Users inserted: {i + 1}/{NUM_USERS}")
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {NUM_USERS} users ({inserter.report()})\n")
+    return entity_columns('users', {'id': np.arange(user_ids.start, user_ids.stop), 'status': statuses})
+
+
+def seed_employees(ctx, users, cities):
+    """Populates employees"""
+    print("Inserting employees...")
+    available_users = users['id'][users.positions('active')]
+    positions = [
+        'Sales Representative', 'Sales Supervisor', 'Sales Manager', 'Cashier', 'Warehouse Worker',
+        'Warehouse Manager', 'Accountant', 'Accounting Assistant', 'Receptionist', 'Janitor',
+        'General Manager', 'Assistant Manager', 'Inventory Analyst', 'Buyer',
+        'Purchasing Manager', 'Driver', 'Security', 'Cleaning', 'Maintenance', 'IT Specialist'
+    ]
+
+    # Limit employees to maximum 70% of available users to leave room for customers
+    max_employees = min(NUM_EMPLOYEES, int(len(available_users) * 0.7))
+
+    employee_ids = ctx.allocator.reserve('employees', max_employees)
+
+    inserter = ctx.make_loader(
+        'employees',
+        ['id', 'user_id', 'employee_code', 'position', 'salary', 'hire_date', 'city_id',
+         'commission_percentage', 'status']
+    )
+    position_column = columns.categorical(max_employees, positions)
+    salaries = columns.uniform(max_employees, 1000, 8000).tolist()  # DECIMAL(10,2)
+    hire_dates = columns.dates_between(max_employees, columns.days_ago(5 * 365), columns.today()).tolist()
+    # Only sales positions earn commission - DECIMAL(5,2)
+    commissions = np.where(np.char.find(position_column, 'Sales') >= 0,
+                           columns.uniform(max_employees, 0, 10), 0.00).tolist()
+    statuses = columns.categorical(max_employees, ['active', 'inactive', 'leave'], [90, 5, 5]).tolist()
+    employee_codes = UniqueCodes("EMP", 6, start=employee_ids.start)
+    user_ids = available_users[:max_employees]
+    city_ids = cities['id'][cities.draw(columns.rng, max_employees)].tolist()
+
+    for i, (user_id, position) in enumerate(zip(user_ids.tolist(), position_column.tolist())):
+        employee_code = employee_codes.next()[:20]  # Limit to VARCHAR(20)
+        position = position[:100]  # Limit to VARCHAR(100)
+        salary = salaries[i]
+        hire_date = hire_dates[i]
+        commission = commissions[i]
+        status = statuses[i]
+
+        inserter.add((employee_ids[i], user_id, employee_code, position, salary, hire_date,
+                      city_ids[i], commission, status))
+
+        if (i + 1) % 1000 == 0:
+            print(f"Employees inserted: {i + 1}/{max_employees}")
+
+    inserter.close()
+
+    employees = entity_columns('employees', {
+        'id': np.arange(employee_ids.start, employee_ids.stop),
+        'user_id': user_ids,
+        'position': position_column,
+        'status': statuses
+    })
+
+    # Assign managers to some employees
+    managers = {}
+    for position, employee_id in enumerate(employees['id'].tolist()):
+        if random.random() < 0.3 and len(employees) > 1:  # 30% of employees have a manager
+            manager = employees.choice()
+            while manager == position:
+                manager = employees.choice()
+            managers[employee_id] = employees['id'][manager].item()
+    bulk_update(ctx.conn, 'employees', 'manager_id', managers, ctx.args.batch_size)
+
+    ctx.conn.commit()
+    print(f"Inserted {len(employees)} employees ({inserter.report()})\n")
+    return employees
+
+
+def seed_customers(ctx, users, employees, cities):
+    """Populates customers"""
+    print("Inserting customers...")
+    # Use users that aren't already employees - start from where employees ended
+    available_users = users['id'][users.positions('active')]
+    remaining_users = available_users[~np.isin(available_users, employees['user_id'])]
+
+    print(f"Available users for customers: {len(remaining_users)}")
+
+    customer_ids = ctx.allocator.reserve('customers', min(NUM_CUSTOMERS, len(remaining_users)))
+
+    inserter = ctx.make_loader(
+        'customers',
+        ['id', 'user_id', 'customer_type', 'identification_document', 'registration_date', 'city_id',
+         'address', 'credit_limit', 'assigned_employee_id', 'status']
+    )
+    num_customers = len(customer_ids)
+    customer_types = columns.categorical(num_customers, ['individual', 'corporate'], [80, 20]).tolist()
+    registration_dates = columns.dates_between(num_customers, columns.days_ago(2 * 365), columns.today()).tolist()
+    credit_limits = columns.uniform(num_customers, 1000, 50000).tolist()  # DECIMAL(12,2)
+    has_assigned_employee = columns.chance(num_customers, 0.7)
+    statuses = columns.categorical(num_customers, ['active', 'inactive', 'delinquent'], [85, 10, 5]).tolist()
+    addresses = ctx.values.sample('address', num_customers)
+    user_ids = remaining_users[:num_customers].tolist()
+    city_ids = cities['id'][cities.draw(columns.rng, num_customers)].tolist()
+    assigned_employee_ids = columns.nullable(
+        employees['id'][employees.draw(columns.rng, num_customers)], has_assigned_employee
+    )
+
+    for i in range(num_customers):
+        customer_type = customer_types[i]
+        identification_document = ctx.values.choice('ssn' if customer_type == 'individual' else 'ein')[:50]  # VARCHAR(50)
+        registration_date = registration_dates[i]
+        address = addresses[i]  # TEXT field
+        credit_limit = credit_limits[i]
+        status = statuses[i]
+
+        inserter.add((customer_ids[i], user_ids[i], customer_type, identification_document, registration_date,
+                      city_ids[i], address, credit_limit, assigned_employee_ids[i], status))
+
+        if (i + 1) % 200 == 0:
+            print(f"Customers inserted: {i + 1}/{num_customers}")
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {num_customers} customers ({inserter.report()})\n")
+    return entity_columns('customers', {'id': np.arange(customer_ids.start, customer_ids.stop), 'status': statuses})
+
+
+def seed_suppliers(ctx, cities):
+    """Populates suppliers"""
+    print("Inserting suppliers...")
+    supplier_ids = ctx.allocator.reserve('suppliers', NUM_SUPPLIERS)
+
+    inserter = ctx.make_loader(
+        'suppliers',
+        ['id', 'company_name', 'tax_id', 'email', 'phone', 'address', 'city_id', 'contact_name',
+         'contact_phone', 'status']
+    )
+    company_names = ctx.values.sample('company', NUM_SUPPLIERS)
+    company_emails = ctx.values.sample('company_email', NUM_SUPPLIERS)
+    phones = ctx.values.sample('phone_number', NUM_SUPPLIERS * 2)
+    addresses = ctx.values.sample('address', NUM_SUPPLIERS)
+    contact_names = ctx.values.sample('name', NUM_SUPPLIERS)
+    tax_ids = UniqueCodes("TAX", 6, start=supplier_ids.start)
+    city_ids = cities['id'][cities.draw(columns.rng, NUM_SUPPLIERS)].tolist()
+    statuses = columns.categorical(NUM_SUPPLIERS, ['active', 'inactive'], [90, 10]).tolist()
+    for i in range(NUM_SUPPLIERS):
+        company_name = company_names[i][:150]  # VARCHAR(150)
+
+        tax_id = tax_ids.next()[:20]  # VARCHAR(20) UNIQUE
+
+        email = company_emails[i][:150]  # VARCHAR(150)
+        phone = phones[2 * i][:20]  # VARCHAR(20)
+        address = addresses[i]  # TEXT
+        contact_name = contact_names[i][:100]  # VARCHAR(100)
+        contact_phone = phones[2 * i + 1][:20]  # VARCHAR(20)
+        status = statuses[i]
+
+        inserter.add((supplier_ids[i], company_name, tax_id, email, phone, address, city_ids[i],
+                      contact_name, contact_phone, status))
+
+        if (i + 1) % 500 == 0:
+            print(f"Suppliers inserted: {i + 1}/{NUM_SUPPLIERS}")
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {NUM_SUPPLIERS} suppliers ({inserter.report()})\n")
+    return entity_columns('suppliers', {'id': np.arange(supplier_ids.start, supplier_ids.stop), 'status': statuses})
+
+
+def seed_categories(ctx):
+    """Populates product categories: the main categories and subcategories hanging from any earlier one"""
+    print("Inserting product categories...")
+    num_categories = max(NUM_CATEGORIES, len(MAIN_CATEGORIES))
+    num_subcategories = num_categories - len(MAIN_CATEGORIES)
+    category_ids = ctx.allocator.reserve('product_categories', num_categories)
+    inserter = ctx.make_loader(
+        'product_categories', ['id', 'name', 'description', 'parent_category_id']
+    )
+
+    # The parent of each subcategory is any category before it, main or sub
+    earlier = np.arange(len(MAIN_CATEGORIES), num_categories)
+    parents = np.concatenate([np.full(len(MAIN_CATEGORIES), -1),
+                              (columns.uniform(num_subcategories, 0, 1, None) * earlier).astype(np.int64)])
+    names = list(MAIN_CATEGORIES)
+    for word, parent in zip(ctx.values.sample('word', num_subcategories), parents[len(MAIN_CATEGORIES):].tolist()):
+        names.append(f"{word.title()} {names[parent]}"[:100])  # VARCHAR(100)
+    descriptions = ctx.values.sample('text', num_categories, max_nb_chars=200)
+    parent_ids = columns.nullable(category_ids.start + parents, parents >= 0)
+
+    for row in columns.rows(category_ids, names, descriptions, parent_ids):
+        inserter.add(row)
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {num_categories} product categories ({inserter.report()})\n")
+    return entity_columns('categories', {'id': np.arange(category_ids.start, category_ids.stop)})
+
+
+def seed_products(ctx, categories, suppliers):
+    """Populates products"""
+    print("Inserting products...")
+    units = ['unit', 'kilogram', 'liter', 'meter', 'box', 'package']
+
+    product_ids = ctx.allocator.reserve('products', NUM_PRODUCTS)
+
+    inserter = ctx.make_loader(
+        'products',
+        ['id', 'product_code', 'name', 'description', 'category_id', 'supplier_id', 'purchase_price',
+         'sale_price', 'current_stock', 'minimum_stock', 'unit_of_measure', 'weight', 'dimensions',
+         'status']
+    )
+    purchase_price_column = columns.uniform(NUM_PRODUCTS, 10, 500)  # DECIMAL(10,2)
+    purchase_prices = purchase_price_column.tolist()
+    sale_price_column = np.round(purchase_price_column * columns.uniform(NUM_PRODUCTS, 1.2, 3.0, None), 2)
+    sale_prices = sale_price_column.tolist()
+    minimum_stocks = columns.integers(NUM_PRODUCTS, 5, 50).tolist()
+    unit_column = columns.categorical(NUM_PRODUCTS, units).tolist()
+    weights = columns.uniform(NUM_PRODUCTS, 0.1, 10.0, 3).tolist()  # DECIMAL(8,3)
+    sizes = columns.integers((NUM_PRODUCTS, 3), 1, 50).tolist()
+    statuses = columns.categorical(NUM_PRODUCTS, ['active', 'discontinued', 'out_of_stock'], [85, 10, 5]).tolist()
+    words = ctx.values.sample('word', NUM_PRODUCTS * 2)
+    descriptions = ctx.values.sample('text', NUM_PRODUCTS, max_nb_chars=500)
+    product_codes = UniqueCodes("PROD", 8, start=product_ids.start)
+    category_ids = categories['id'][categories.draw(columns.rng, NUM_PRODUCTS)].tolist()
+    supplier_ids = suppliers['id'][suppliers.draw(columns.rng, NUM_PRODUCTS, 'active')].tolist()
+
+    for i in range(NUM_PRODUCTS):
+        code = product_codes.next()[:50]  # VARCHAR(50)
+        name = f"{words[2 * i].title()} {words[2 * i + 1].title()}"[:200]  # VARCHAR(200)
+        description = descriptions[i]  # TEXT
+        purchase_price = purchase_prices[i]
+        sale_price = sale_prices[i]
+        minimum_stock = minimum_stocks[i]
+        unit = unit_column[i][:20]  # VARCHAR(20)
+        weight = weights[i]
+        dimensions = "{}x{}x{} cm".format(*sizes[i])[:100]  # VARCHAR(100)
+        status = statuses[i]
+
+        inserter.add((product_ids[i], code, name, description, category_ids[i], supplier_ids[i],
+                      purchase_price, sale_price, 0, minimum_stock,  # current_stock is set by the stock stage
+                      unit, weight, dimensions, status))
+
+        if (i + 1) % 1000 == 0:
+            print(f"Products inserted: {i + 1}/{NUM_PRODUCTS}")
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {NUM_PRODUCTS} products ({inserter.report()})\n")
+    return entity_columns('products', {
+        'id': np.arange(product_ids.start, product_ids.stop),
+        'sale_price': sale_price_column,
+        'status': statuses
+    })
+
+
+def seed_warehouses(ctx, cities, employees):
+    """Populates warehouses"""
+    print("Inserting warehouses...")
+    warehouse_ids = ctx.allocator.reserve('warehouses', NUM_WAREHOUSES)
+    inserter = ctx.make_loader(
+        'warehouses',
+        ['id', 'name', 'address', 'city_id', 'phone', 'max_capacity', 'manager_employee_id', 'status']
+    )
+    names = [f"Warehouse {city}"[:100] for city in ctx.values.sample('city', NUM_WAREHOUSES)]  # VARCHAR(100)
+    addresses = ctx.values.sample('address', NUM_WAREHOUSES)  # TEXT NOT NULL
+    city_ids = cities['id'][cities.draw(columns.rng, NUM_WAREHOUSES)]
+    phones = columns.nullable(  # VARCHAR(20)
+        np.array([phone[:20] for phone in ctx.values.sample('phone_number', NUM_WAREHOUSES)], dtype=object),
+        columns.chance(NUM_WAREHOUSES, 0.7)
+    )
+    max_capacities = columns.integers(NUM_WAREHOUSES, 1000, 50000)  # INT
+    manager_ids = employees['id'][employees.draw(columns.rng, NUM_WAREHOUSES, 'manager')]
+    statuses = columns.categorical(NUM_WAREHOUSES, ['active', 'inactive', 'maintenance'], [85, 10, 5])
+
+    for row in columns.rows(warehouse_ids, names, addresses, city_ids, phones, max_capacities, manager_ids,
+                            statuses):
+        inserter.add(row)
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {NUM_WAREHOUSES} warehouses ({inserter.report()})\n")
+    return entity_columns('warehouses', {'id': np.arange(warehouse_ids.start, warehouse_ids.stop), 'status': statuses})
+
+
+def load_movements(ctx, product_ids, warehouse_ids, movement_types, quantities, reference_types, reference_ids,
+                   employee_ids, movement_dates, notes=None):
+    """Loads inventory movements from NumPy columns and returns their monthly ledger"""
+    num_movements = len(product_ids)
+    movement_ids = ctx.allocator.reserve('inventory_movements', num_movements)
+    inserter = ctx.make_loader(
+        'inventory_movements',
+        ['id', 'product_id', 'warehouse_id', 'movement_type', 'quantity', 'reference_type', 'reference_id',
+         'employee_id', 'notes', 'movement_date']
+    )
+    for row in columns.rows(movement_ids, product_ids, warehouse_ids, movement_types, quantities, reference_types,
+                            reference_ids, employee_ids, notes or [None] * num_movements, movement_dates):
+        inserter.add(row)
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {num_movements} inventory movements ({inserter.report()})")
+    return ledger(product_ids, warehouse_ids, movement_dates, quantities, np.isin(movement_types, INBOUND_MOVEMENTS))
+
+
+def seed_stock(ctx, products, warehouses, employees, purchase_orders, sales, movements):
+    """Derives the stock of every product and warehouse from the monthly ledger of the loaded movements
+
+    Pairs that would go below zero get an opening adjustment at the start of
+    the first month, then warehouse_inventory holds the final balances,
+    products.current_stock their sum over the warehouses and stock_snapshots
+    the balance at the end of every closed month with movements.
+    """
+    print("Deriving stock from the inventory movements...")
+    merged = merge_ledgers([purchase_orders['ledger'], sales['ledger'], movements['ledger']])
+    pairs, _ = balances(merged)
+
+    # Opening adjustments, so the running balance of every pair stays non-negative
+    opened = np.flatnonzero(pairs['opening'] > 0)
+    num_openings = len(opened)
+    first_month = merged['month'].min() if len(merged['month']) else month_index(np.datetime64(columns.now()))
+    opening_dates = np.full(num_openings, np.datetime64(int(first_month), 'M').astype('datetime64[s]'))
+    employee_ids = employees['id'][employees.draw(columns.rng, num_openings, 'active')]
+    opening_ledger = load_movements(
+        ctx, pairs['product_id'][opened], pairs['warehouse_id'][opened], np.full(num_openings, 'adjustment'),
+        pairs['opening'][opened], np.full(num_openings, 'adjustment'), [None] * num_openings, employee_ids,
+        opening_dates, ['Opening balance'] * num_openings
+    )
+    pairs, months = balances(merge_ledgers([merged, opening_ledger]))
+
+    inserter = ctx.make_loader('warehouse_inventory', ['product_id', 'warehouse_id', 'quantity', 'location'])
+    num_pairs = len(pairs['product_id'])
+    # Locations A1-1-1 to E10-5-20 - VARCHAR(50)
+    aisles = columns.categorical(num_pairs, list('ABCDE'))
+    spots = columns.integers((num_pairs, 3), 1, [10, 5, 20])
+    locations = [f"{aisle}{rack}-{level}-{slot}" for aisle, (rack, level, slot) in zip(aisles.tolist(), spots.tolist())]
+    for row in columns.rows(pairs['product_id'], pairs['warehouse_id'], pairs['balance'], locations):
+        inserter.add(row)
+    num_inventory = inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {num_inventory} warehouse inventory records ({inserter.report()})")
+
+    # The month of the reference time is still open, so it gets no snapshot
+    closed = months['month'] < month_index(np.datetime64(columns.now()))
+    inserter = ctx.make_loader('stock_snapshots', ['product_id', 'warehouse_id', 'snapshot_date', 'quantity'])
+    for row in columns.rows(months['product_id'][closed], months['warehouse_id'][closed],
+                            month_end(months['month'][closed]), months['balance'][closed]):
+        inserter.add(row)
+    num_snapshots = inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {num_snapshots} stock snapshots ({inserter.report()})")
+
+    product_stock = np.bincount(np.searchsorted(products['id'], pairs['product_id']),
+                                weights=pairs['balance'], minlength=len(products)).astype(np.int64)
+    with ctx.benchmark.table('products'):
+        with ctx.benchmark.db('products'):
+            bulk_update(ctx.conn, 'products', 'current_stock',
+                        dict(zip(products['id'].tolist(), product_stock.tolist())), ctx.args.batch_size)
+    ctx.conn.commit()
+    print(f"Updated the current stock of {len(products)} products\n")
+    return {'inventory_movements': num_openings, 'warehouse_inventory': num_inventory,
+            'stock_snapshots': num_snapshots}
+
+
+def seed_purchase_orders(ctx, suppliers, employees, products, warehouses):
+    """Populates a shard of purchase orders followed by their details and the receipts of the delivered ones"""
+    print(f"Inserting purchase orders {ctx.shard.start + 1}-{ctx.shard.stop}...")
+
+    num_orders = len(ctx.shard)
+    purchase_order_ids = ctx.allocator.reserve('purchase_orders', num_orders)
+    inserter = ctx.make_loader(
+        'purchase_orders',
+        ['id', 'order_number', 'supplier_id', 'requesting_employee_id', 'order_date', 'estimated_delivery_date',
+         'actual_delivery_date', 'subtotal', 'taxes', 'total', 'status', 'notes']
+    )
+    order_date_column = columns.dates_between(num_orders, columns.days_ago(365), columns.today())
+    # Calculate delivery date (1-30 days after order date)
+    estimated_date_column = order_date_column + columns.integers(num_orders, 1, 30)
+    # Some orders are already delivered - 70% delivered
+    delivered = columns.chance(num_orders, 0.7)
+    actual_delivery_column = estimated_date_column + columns.integers(num_orders, -5, 10)
+    actual_delivery_dates = columns.nullable(actual_delivery_column, delivered)
+    statuses = np.where(
+        delivered, 'received',
+        columns.categorical(num_orders, ['pending', 'approved', 'shipped', 'cancelled'], [30, 30, 30, 10])
+    ).tolist()
+    order_dates = order_date_column.tolist()
+    estimated_delivery_dates = estimated_date_column.tolist()
+
+    # Calculate amounts - DECIMAL(12,2)
+    subtotal_column = columns.uniform(num_orders, 100, 10000)
+    tax_column = np.round(subtotal_column * 0.18, 2)  # 18% tax
+    totals = np.round(subtotal_column + tax_column, 2).tolist()
+    subtotals, taxes_list = subtotal_column.tolist(), tax_column.tolist()
+    has_notes = columns.chance(num_orders, 0.3).tolist()
+    order_numbers = UniqueCodes("PO", 10, start=purchase_order_ids.start)
+    supplier_ids = suppliers['id'][suppliers.draw(columns.rng, num_orders, 'active')].tolist()
+    employee_id_column = employees['id'][employees.draw(columns.rng, num_orders, 'active')]
+    employee_ids = employee_id_column.tolist()
+
+    for i in range(num_orders):
+        order_number = order_numbers.next()[:50]  # VARCHAR(50)
+        notes = ctx.values.choice('text', max_nb_chars=200) if has_notes[i] else None
+
+        inserter.add((purchase_order_ids[i], order_number, supplier_ids[i], employee_ids[i],
+                      order_dates[i], estimated_delivery_dates[i], actual_delivery_dates[i],
+                      subtotals[i], taxes_list[i], totals[i], statuses[i], notes))
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {num_orders} purchase orders ({inserter.report()})")
+
+    details = seed_purchase_order_details(ctx, purchase_order_ids, products)
+
+    # Each received order is stocked in one warehouse during working hours of its delivery day
+    order_warehouses = warehouses['id'][warehouses.draw(columns.rng, num_orders, 'active')]
+    receipt_moments = np.minimum(
+        actual_delivery_column.astype('datetime64[s]') + columns.integers(num_orders, 8 * 3600, 18 * 3600),
+        np.datetime64(columns.now())
+    )
+    received = delivered[details['order']]
+    orders = details['order'][received]
+    receipts = load_movements(
+        ctx, details['product_id'][received], order_warehouses[orders], np.full(len(orders), 'in'),
+        details['quantity'][received], np.full(len(orders), 'purchase'), purchase_order_ids.start + orders,
+        employee_id_column[orders], receipt_moments[orders]
+    )
+    print()
+    return {'purchase_orders': num_orders, 'purchase_order_details': len(details['order']),
+            'inventory_movements': len(orders), 'ledger': receipts}
+
+
+def seed_purchase_order_details(ctx, purchase_order_ids, products):
+    """Populates the details of the purchase orders just loaded"""
+    inserter = ctx.make_loader(
+        'purchase_order_details',
+        ['purchase_order_id', 'product_id', 'quantity', 'unit_price', 'subtotal']
+    )
+    # Each purchase order has 1-5 different products
+    product_counts = columns.integers(len(purchase_order_ids), 1, 5).tolist()
+    order_products = [products.sample(count, 'active') for count in product_counts]
+    product_id_column = products['id'][np.concatenate(order_products)] if order_products else np.empty(0, np.int64)
+    product_ids = product_id_column.tolist()
+
+    num_details = len(product_ids)
+    quantity_column = columns.integers(num_details, 1, 100)
+    unit_price_column = columns.uniform(num_details, 10, 500)  # DECIMAL(10,2)
+    subtotals = np.round(quantity_column * unit_price_column, 2).tolist()  # DECIMAL(12,2)
+    quantities, unit_prices = quantity_column.tolist(), unit_price_column.tolist()
+
+    detail = 0
+    for purchase_order_id, po_products in zip(purchase_order_ids, order_products):
+        for _ in po_products:
+            inserter.add((purchase_order_id, product_ids[detail], quantities[detail], unit_prices[detail],
+                          subtotals[detail]))
+            detail += 1
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {inserter.total_rows} purchase order details ({inserter.report()})")
+    return {
+        'order': np.repeat(np.arange(len(purchase_order_ids)), [len(po_products) for po_products in order_products]),
+        'product_id': product_id_column,
+        'quantity': quantity_column
+    }
+
+
+def seed_sales_shard(ctx, customers, employees, products, warehouses):
+    """Populates a shard of sales and the details, accounts, payments and returns that hang from it
+
+    Each table of the shard is generated, loaded and committed before the next
+    one, and only the compact key arrays the following table needs are kept.
+    """
+    sales = seed_sales(ctx, customers, employees)
+    counts = {'sale_ids': range(sales['id'][0], sales['id'][-1] + 1) if len(sales['id']) else range(0),
+              'sales': len(sales['id'])}
+    details = seed_sale_details(ctx, sales, products)
+    counts['sale_details'] = len(details['sale'])
+    shipments = seed_sale_shipments(ctx, sales, details, warehouses)
+    counts['inventory_movements'] = len(shipments['sale'])
+    counts['ledger'] = shipments['ledger']
+    accounts = seed_accounts_receivable(ctx, sales)
+    counts['accounts_receivable'] = len(accounts['id'])
+    counts['payments_received'] = seed_payments_received(ctx, accounts, employees)
+    returns = seed_returns(ctx, sales, employees)
+    counts['returns'] = len(returns['id'])
+    counts['return_details'] = seed_return_details(ctx, returns, products)
+    print()
+    return counts
+
+
+def seed_sales(ctx, customers, employees):
+    """Populates the sales of a shard and returns their key columns"""
+    print(f"Inserting sales {ctx.shard.start + 1}-{ctx.shard.stop}...")
+    payment_methods = ['cash', 'credit_card', 'debit_card', 'transfer', 'credit']
+
+    num_sales = len(ctx.shard)
+    sale_ids = ctx.allocator.reserve('sales', num_sales)
+
+    inserter = ctx.make_loader(
+        'sales',
+        ['id', 'sale_number', 'customer_id', 'salesperson_employee_id', 'sale_date', 'subtotal', 'discount',
+         'taxes', 'total', 'payment_method', 'status', 'notes']
+    )
+    sale_date_column = columns.datetimes_between(num_sales, columns.moments_ago(HISTORY_DAYS), columns.now())
+    sale_dates = sale_date_column.tolist()
+    payment_method_column = columns.categorical(num_sales, payment_methods).tolist()
+
+    # Calculate amounts - DECIMAL(12,2)
+    subtotal_column = columns.uniform(num_sales, 50, 2000)
+    discount_column = np.where(  # 30% chance of discount
+        columns.chance(num_sales, 0.3), np.round(subtotal_column * columns.uniform(num_sales, 0, 0.2, None), 2), 0.00
+    )
+    tax_column = np.round(subtotal_column * 0.18, 2)  # 18% tax
+    totals = np.round(subtotal_column + tax_column - discount_column, 2).tolist()
+    subtotals, discounts, taxes_list = subtotal_column.tolist(), discount_column.tolist(), tax_column.tolist()
+    has_notes = columns.chance(num_sales, 0.2).tolist()
+    statuses = columns.categorical(num_sales, ['completed', 'cancelled', 'returned'], [90, 5, 5]).tolist()
+    sale_numbers = UniqueCodes("S", 10, start=sale_ids.start)
+    customer_id_column = customers['id'][customers.draw(columns.rng, num_sales, 'active')]
+    customer_ids = customer_id_column.tolist()
+    employee_id_column = employees['id'][employees.draw(columns.rng, num_sales, 'active')]
+    employee_ids = employee_id_column.tolist()
+
+    for i in range(num_sales):
+        sale_number = sale_numbers.next()[:50]  # VARCHAR(50)
+        sale_date = sale_dates[i]
+        payment_method = payment_method_column[i]
+        subtotal = subtotals[i]
+        discount = discounts[i]
+        taxes = taxes_list[i]
+        total = totals[i]
+        notes = ctx.values.choice('text', max_nb_chars=200) if has_notes[i] else None
+        status = statuses[i]
+
+        inserter.add((sale_ids[i], sale_number, customer_ids[i], employee_ids[i], sale_date,
+                      subtotal, discount, taxes, total, payment_method, status, notes))
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {num_sales} sales ({inserter.report()})")
+    return {
+        'id': np.arange(sale_ids.start, sale_ids.stop),
+        'customer_id': customer_id_column,
+        'employee_id': employee_id_column,
+        'sale_date': sale_date_column,
+        'status': np.array(statuses),
+        'total': np.array(totals)
+    }
+
+
+def seed_sale_details(ctx, sales, products):
+    """Populates the details of the sales of a shard"""
+    inserter = ctx.make_loader(
+        'sale_details',
+        ['sale_id', 'product_id', 'quantity', 'unit_price', 'unit_discount', 'subtotal']
+    )
+    # Each sale has 1-3 different products
+    product_counts = columns.integers(len(sales['id']), 1, 3).tolist()
+    sale_products = [products.sample(count, 'active') for count in product_counts]
+
+    detail_products = np.concatenate(sale_products) if sale_products else np.empty(0, dtype=np.int64)
+    num_details = len(detail_products)
+    prices = products['sale_price'][detail_products]
+    product_ids = products['id'][detail_products].tolist()
+
+    quantity_column = columns.integers(num_details, 1, 10)
+    unit_price_column = np.round(prices * columns.uniform(num_details, 0.9, 1.1, None), 2)  # DECIMAL(10,2)
+    unit_discount_column = np.where(  # DECIMAL(10,2)
+        columns.chance(num_details, 0.2), np.round(unit_price_column * columns.uniform(num_details, 0, 0.1, None), 2), 0.00
+    )
+    subtotals = np.round((unit_price_column - unit_discount_column) * quantity_column, 2).tolist()  # DECIMAL(12,2)
+    quantities, unit_prices = quantity_column.tolist(), unit_price_column.tolist()
+    unit_discounts = unit_discount_column.tolist()
+
+    detail = 0
+    for i, (sale_id, sale_product_rows) in enumerate(zip(sales['id'].tolist(), sale_products)):
+        for _ in sale_product_rows:
+            inserter.add((sale_id, product_ids[detail], quantities[detail], unit_prices[detail],
+                          unit_discounts[detail], subtotals[detail]))
+            detail += 1
+
+        if (i + 1) % 1000 == 0:
+            inserter.flush()
+            ctx.conn.commit()
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {inserter.total_rows} sales details ({inserter.report()})")
+    return {
+        'sale': np.repeat(np.arange(len(sales['id'])), product_counts),
+        'product_id': products['id'][detail_products],
+        'quantity': quantity_column
+    }
+
+
+def seed_sale_shipments(ctx, sales, details, warehouses):
+    """Takes the products of the completed and returned sales of a shard out of stock and returns their ledger
+
+    Each sale ships from one warehouse at the moment of the sale, so the
+    movements match sale_details line by line.
+    """
+    shipped = np.isin(sales['status'][details['sale']], ['completed', 'returned'])
+    shipped_sales = details['sale'][shipped]
+    sale_warehouses = warehouses['id'][warehouses.draw(columns.rng, len(sales['id']), 'active')]
+    num_shipments = len(shipped_sales)
+    shipments = load_movements(
+        ctx, details['product_id'][shipped], sale_warehouses[shipped_sales], np.full(num_shipments, 'out'),
+        details['quantity'][shipped], np.full(num_shipments, 'sale'), sales['id'][shipped_sales],
+        sales['employee_id'][shipped_sales], sales['sale_date'][shipped_sales]
+    )
+    return {'sale': shipped_sales, 'ledger': shipments}
+
+
+def seed_inventory_movements(ctx, products, warehouses, employees):
+    """Populates a shard of stock adjustments and transfers between warehouses and returns their ledger
+
+    Sales and received purchase orders load their own movements; a transfer
+    is a transfer movement out of one warehouse and an in movement into another.
+    """
+    print(f"Inserting stock adjustments and transfers {ctx.shard.start + 1}-{ctx.shard.stop}...")
+    num_operations = len(ctx.shard)
+    transfer = columns.chance(num_operations, 0.5)
+    product_ids = products['id'][products.draw(columns.rng, num_operations, 'active')]
+    sources = warehouses['id'][warehouses.draw(columns.rng, num_operations, 'active')]
+    destinations = warehouses['id'][warehouses.draw(columns.rng, num_operations, 'active')]
+    employee_ids = employees['id'][employees.draw(columns.rng, num_operations, 'active')]
+    quantities = columns.integers(num_operations, 1, 50)
+    moments = columns.datetimes_between(num_operations, columns.moments_ago(HISTORY_DAYS), columns.now())
+    has_notes = columns.chance(num_operations, 0.3).tolist()
+    notes = [ctx.values.choice('text', max_nb_chars=200) if has_note else None for has_note in has_notes]
+
+    # Every operation gives one row, transfers a second one for the receiving warehouse
+    received = np.flatnonzero(transfer)
+    operations = np.concatenate([np.arange(num_operations), received])
+    movement_types = np.where(transfer, 'transfer', 'adjustment').tolist() + ['in'] * len(received)
+    reference_types = np.where(transfer, 'transfer', 'adjustment').tolist() + ['transfer'] * len(received)
+    movements = load_movements(
+        ctx, product_ids[operations], np.concatenate([sources, destinations[received]]), np.array(movement_types),
+        quantities[operations], reference_types, [None] * len(operations), employee_ids[operations],
+        moments[operations], [notes[operation] for operation in operations.tolist()]
+    )
+    print()
+    return {'inventory_movements': len(operations), 'ledger': movements}
+
+
+def seed_accounts_receivable(ctx, sales):
+    """Populates the accounts receivable of the completed sales of a shard and returns their key columns"""
+    inserter = ctx.make_loader(
+        'accounts_receivable',
+        ['id', 'sale_id', 'customer_id', 'total_amount', 'pending_amount', 'due_date', 'days_overdue', 'status']
+    )
+
+    completed = np.flatnonzero(sales['status'] == 'completed')
+    credit_sales = completed[:int(len(completed) * 0.3)]  # 30% of sales have credit
+    num_accounts = len(credit_sales)
+    account_ids = ctx.allocator.reserve('accounts_receivable', num_accounts)
+    due_dates = columns.dates_between(num_accounts, columns.today(), columns.days_ago(-60))
+    total_amounts = sales['total'][credit_sales]
+
+    # 60% fully pending, 32% partially paid and 8% fully paid
+    statuses = columns.categorical(num_accounts, ['pending', 'partial', 'paid'], [60, 32, 8])
+    partial_amounts = np.round(total_amounts * columns.uniform(num_accounts, 0.3, 0.9, None), 2)
+    pending_amounts = np.select([statuses == 'pending', statuses == 'partial'], [total_amounts, partial_amounts], 0.0)
+    days_overdue = np.maximum((np.datetime64(columns.today()) - due_dates).astype(np.int64), 0) * (pending_amounts > 0)
+    statuses = np.where(days_overdue > 0, 'overdue', statuses)
+
+    for row in columns.rows(account_ids, sales['id'][credit_sales], sales['customer_id'][credit_sales], total_amounts,
+                            pending_amounts, due_dates, days_overdue, statuses):
+        inserter.add(row)
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {num_accounts} accounts receivable ({inserter.report()})")
+    return {
+        'id': np.arange(account_ids.start, account_ids.stop),
+        'total_amount': total_amounts,
+        'pending_amount': pending_amounts,
+        'status': statuses
+    }
+
+
+def seed_payments_received(ctx, accounts, employees):
+    """Populates the payments of the accounts receivable of a shard
+
+    Paid and partial accounts get 1 to 3 payments of what was already paid:
+    a single payment covers all of it, otherwise each one takes 30-80% of
+    what the earlier ones left.
+    """
+    payment_methods_received = ['cash', 'credit_card', 'debit_card', 'transfer', 'check']
+
+    inserter = ctx.make_loader(
+        'payments_received',
+        ['id', 'accounts_receivable_id', 'payment_amount', 'payment_method', 'reference_number', 'payment_date',
+         'receiving_employee_id', 'notes']
+    )
+
+    # Up to 3 payments per account
+    payment_ids = ctx.allocator.reserve('payments_received', 3 * len(accounts['id']))
+    paid_amounts = accounts['total_amount'] - accounts['pending_amount']
+    paying = np.flatnonzero(np.isin(accounts['status'], ['paid', 'partial']) & (paid_amounts > 0))
+    counts = columns.integers(len(paying), 1, 3)
+    shares = columns.uniform((len(paying), 3), 0.3, 0.8, None)
+    left_before = np.hstack([np.ones((len(paying), 1)), np.cumprod(1 - shares, axis=1)[:, :-1]])
+    amounts = np.where((counts == 1)[:, None], 1.0, shares * left_before) * paid_amounts[paying][:, None]
+    made = np.arange(3) < counts[:, None]
+    payment_amounts = np.round(amounts[made], 2)
+    payment_accounts = accounts['id'][np.repeat(paying, counts)]
+    num_payments_received = len(payment_amounts)
+
+    payment_methods = columns.categorical(num_payments_received, payment_methods_received)
+    reference_numbers = columns.nullable(
+        np.char.add('REF', columns.integers(num_payments_received, 100000, 999999).astype(str)),
+        np.isin(payment_methods, ['transfer', 'check'])
+    )
+    payment_dates = columns.datetimes_between(num_payments_received, columns.moments_ago(91), columns.now())
+    employee_ids = employees['id'][employees.draw(columns.rng, num_payments_received, 'active')]
+    notes = columns.nullable(
+        np.array(ctx.values.sample('text', num_payments_received, max_nb_chars=100), dtype=object),
+        columns.chance(num_payments_received, 0.2)
+    )
+
+    for row in columns.rows(payment_ids[:num_payments_received], payment_accounts, payment_amounts, payment_methods,
+                            reference_numbers, payment_dates, employee_ids, notes):
+        inserter.add(row)
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {num_payments_received} payments received ({inserter.report()})")
+    return num_payments_received
+
+
+def seed_returns(ctx, sales, employees):
+    """Populates the returns of the completed sales of a shard and returns their key columns"""
+    # Returns are based on completed sales, each sale is returned at most once
+    completed = np.flatnonzero(sales['status'] == 'completed').tolist()
+    num_returns = min(shard_share(NUM_RETURNS, ctx.shard, NUM_SALES), len(completed))
+    returned_sales = np.array(random.sample(completed, num_returns), dtype=np.int64)
+
+    return_ids = ctx.allocator.reserve('returns', num_returns)
+
+    inserter = ctx.make_loader(
+        'returns',
+        ['id', 'return_number', 'sale_id', 'customer_id', 'authorizing_employee_id', 'return_date', 'reason',
+         'total_returned', 'status']
+    )
+    return_dates = columns.datetimes_between(num_returns, columns.moments_ago(HISTORY_DAYS), columns.now()).tolist()
+    sale_totals = sales['total'][returned_sales]
+    totals_returned = np.round(sale_totals * columns.uniform(num_returns, 0.1, 1.0, None), 2).tolist()  # DECIMAL(12,2)
+    statuses = columns.categorical(
+        num_returns, ['approved', 'rejected', 'pending', 'processed'], [60, 10, 20, 10]
+    ).tolist()
+    return_numbers = UniqueCodes("R", 10, start=return_ids.start)
+    employee_ids = employees['id'][employees.draw(columns.rng, num_returns, 'active')].tolist()
+
+    for i, (sale_id, customer_id) in enumerate(zip(sales['id'][returned_sales].tolist(),
+                                                   sales['customer_id'][returned_sales].tolist())):
+        return_number = return_numbers.next()[:50]  # VARCHAR(50)
+        return_date = return_dates[i]
+        reason = ctx.values.choice('text', max_nb_chars=300)  # TEXT field
+        total_returned = totals_returned[i]
+        status = statuses[i]
+
+        inserter.add((return_ids[i], return_number, sale_id, customer_id, employee_ids[i],
+                      return_date, reason, total_returned, status))
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {num_returns} returns ({inserter.report()})")
+    return {'id': np.arange(return_ids.start, return_ids.stop)}
+
+
+def seed_return_details(ctx, returns, products):
+    """Populates the details of the returns of a shard"""
+    product_conditions = ['new', 'used', 'damaged']
+
+    inserter = ctx.make_loader(
+        'return_details',
+        ['id', 'return_id', 'product_id', 'quantity_returned', 'unit_price', 'subtotal_returned',
+         'product_condition']
+    )
+
+    # Each return has 1-3 products returned
+    product_counts = columns.integers(len(returns['id']), 1, 3).tolist()
+    returned_products = [products.sample(count, 'active') for count in product_counts]
+
+    detail_products = np.concatenate(returned_products) if returned_products else np.empty(0, dtype=np.int64)
+    num_details = len(detail_products)
+    prices = products['sale_price'][detail_products]
+    product_ids = products['id'][detail_products].tolist()
+    quantity_column = columns.integers(num_details, 1, 5)
+    unit_price_column = np.round(prices * columns.uniform(num_details, 0.9, 1.1, None), 2)  # DECIMAL(10,2)
+    subtotals = np.round(unit_price_column * quantity_column, 2).tolist()  # DECIMAL(12,2)
+    quantities, unit_prices = quantity_column.tolist(), unit_price_column.tolist()
+    conditions = columns.categorical(num_details, product_conditions).tolist()
+    return_detail_ids = ctx.allocator.reserve('return_details', num_details)
+
+    detail = 0
+    for return_id, return_products in zip(returns['id'].tolist(), returned_products):
+        for _ in return_products:
+            quantity_returned = quantities[detail]
+            unit_price = unit_prices[detail]
+            subtotal_returned = subtotals[detail]
+            product_condition = conditions[detail]
+
+            inserter.add((return_detail_ids[detail], return_id, product_ids[detail], quantity_returned, unit_price,
+                          subtotal_returned, product_condition))
+            detail += 1
+
+    inserter.close()
+    ctx.conn.commit()
+    print(f"Inserted {num_details} return details ({inserter.report()})")
+    return num_details
+
+
+def shard_share(total, shard, rows):
+    """Part of total that falls on a shard of rows; the shares of all the shards add up to total"""
+    return total * shard.stop // rows - total * shard.start // rows
+
+
+# Stages and the stages they read from; ids gives the number of ids reserved
+# for each table of a stage or shard before it starts (an upper bound when not
+# known yet). Stages with rows are split in shards of --shard-size rows. The
+# sales and purchase order shards load their child tables right after their
+# parents and only return counts, so memory does not grow with NUM_SALES
+STAGES = {
+    'countries': Stage(seed_countries, [], {'countries': lambda results, shard: len(COUNTRIES)}),
+    'regions': Stage(seed_regions, ['countries'], {'regions': lambda results, shard: NUM_REGIONS}),
+    'cities': Stage(seed_cities, ['regions'], {'cities': lambda results, shard: NUM_CITIES}),
+    'users': Stage(seed_users, [], {'users': lambda results, shard: NUM_USERS}),
+    'employees': Stage(seed_employees, ['users', 'cities'], {'employees': lambda results, shard: NUM_EMPLOYEES}),
+    'customers': Stage(seed_customers, ['users', 'employees', 'cities'],
+                       {'customers': lambda results, shard: NUM_CUSTOMERS}),
+    'suppliers': Stage(seed_suppliers, ['cities'], {'suppliers': lambda results, shard: NUM_SUPPLIERS}),
+    'categories': Stage(seed_categories, [], {
+        'product_categories': lambda results, shard: max(NUM_CATEGORIES, len(MAIN_CATEGORIES)),
+    }),
+    'products': Stage(seed_products, ['categories', 'suppliers'],
+                      {'products': lambda results, shard: NUM_PRODUCTS}),
+    'warehouses': Stage(seed_warehouses, ['cities', 'employees'],
+                        {'warehouses': lambda results, shard: NUM_WAREHOUSES}),
+    'purchase_orders': Stage(seed_purchase_orders, ['suppliers', 'employees', 'products', 'warehouses'], {
+        'purchase_orders': lambda results, shard: len(shard),
+        'inventory_movements': lambda results, shard: 5 * len(shard),
+    }, rows=lambda results: NUM_PURCHASE_ORDERS),
+    'sales': Stage(seed_sales_shard, ['customers', 'employees', 'products', 'warehouses'], {
+        'sales': lambda results, shard: len(shard),
+        'inventory_movements': lambda results, shard: 3 * len(shard),
+        'accounts_receivable': lambda results, shard: int(len(shard) * 0.3),
+        'payments_received': lambda results, shard: 3 * int(len(shard) * 0.3),
+        'returns': lambda results, shard: shard_share(NUM_RETURNS, shard, NUM_SALES),
+        'return_details': lambda results, shard: 3 * shard_share(NUM_RETURNS, shard, NUM_SALES),
+    }, rows=lambda results: NUM_SALES),
+    'inventory_movements': Stage(seed_inventory_movements, ['products', 'warehouses', 'employees'],
+                                 {'inventory_movements': lambda results, shard: 2 * len(shard)},
+                                 rows=lambda results: NUM_STOCK_OPERATIONS),
+    # At most one opening adjustment per product and warehouse pair of the ledgers
+    'stock': Stage(seed_stock, ['products', 'warehouses', 'employees', 'purchase_orders', 'sales',
+                                'inventory_movements'],
+                   {'inventory_movements': lambda results, shard: sum(
+                       len(results[name]['ledger']['product_id'])
+                       for name in ('purchase_orders', 'sales', 'inventory_movements'))}),
+}
+
+
+# Rows keyed by the ids of another table that a stage loads without ids of their own;
+# they are deleted together with the ids of the stage before an unfinished task runs again
+CHILD_ROWS = {
+    'stock': [('warehouse_inventory', 'warehouse_id', 'warehouses'), ('stock_snapshots', 'warehouse_id', 'warehouses')],
+    'purchase_orders': [('purchase_order_details', 'purchase_order_id', 'purchase_orders')],
+    'sales': [('sale_details', 'sale_id', 'sales')],
+}
+
+# Options that decide the generated data; a resumed run takes them from the checkpoint
+RUN_OPTIONS = ['seed', 'reference_time', 'scale_factor', 'shard_size', 'value_pool_size']
+
+
+def value_rows():
+    """Rows of the run that draw from each Faker provider, so small runs generate small pools"""
+    num_payments = 3 * int(NUM_SALES * 0.3)
+    return {
+        'state': NUM_REGIONS,
+        'city': NUM_CITIES + NUM_WAREHOUSES,
+        'first_name': NUM_USERS,
+        'last_name': NUM_USERS,
+        'user_name': NUM_USERS,
+        'domain_name': NUM_USERS,
+        'phone_number': NUM_USERS + 2 * NUM_SUPPLIERS + NUM_WAREHOUSES,
+        'address': NUM_CUSTOMERS + NUM_SUPPLIERS + NUM_WAREHOUSES,
+        'ssn': NUM_CUSTOMERS,
+        'ein': NUM_CUSTOMERS,
+        'company': NUM_SUPPLIERS,
+        'company_email': NUM_SUPPLIERS,
+        'name': NUM_SUPPLIERS,
+        'word': NUM_CATEGORIES + 2 * NUM_PRODUCTS,
+        'text': (NUM_CATEGORIES + NUM_PRODUCTS + NUM_PURCHASE_ORDERS + NUM_SALES + NUM_STOCK_OPERATIONS
+                 + num_payments + NUM_RETURNS),
+    }
+
+
+def init_worker(args):
+    """Opens the connection and value pools of a worker process"""
+    global connection, values
+    # Spawned workers import the module again, with the unscaled counts
+    scale_counts(globals(), args.scale_factor, fixed=('NUM_COUNTRIES',))
+    connection = connect(args)
+    values = FakerValues(fake, args.value_pool_size, args.value_cache, args.seed, value_rows())
+
+
+def merge_results(parts):
+    """Joins the results of the shards of a stage, adding up their monthly ledgers into one"""
+    if not all(isinstance(part, dict) and 'ledger' in part for part in parts):
+        return merge_shards(parts)
+    merged = merge_shards([{key: value for key, value in part.items() if key != 'ledger'} for part in parts])
+    merged['ledger'] = merge_ledgers([part['ledger'] for part in parts])
+    return merged
+
+
+def plan_stage(args, allocator, checkpoint, blocks_conn, name, results):
+    """Reserves the id blocks of a stage and returns the arguments of each of its shards
+
+    With blocks_conn, the blocks are listed in open_id_blocks before any
+    shard runs, so a summary refresh during the load stops below them.
+    """
+    stage = STAGES[name]
+    inputs = tuple(results[dependency] for dependency in stage.dependencies)
+    shards = [None] if stage.rows is None else shard_ranges(stage.rows(results), args.shard_size)
+
+    tasks = []
+    for index, shard in enumerate(shards):
+        shard_index = None if shard is None else index
+        # On resume a task planned by the interrupted run gets back exactly the ranges it had
+        ranges = checkpoint.task_ranges(name, shard_index) if checkpoint else None
+        if ranges is None:
+            ranges = {table: allocator.reserve(table, count(results, shard)) for table, count in stage.ids.items()}
+            if checkpoint:
+                checkpoint.reserved(name, shard_index, ranges)
+        else:
+            for table, block in ranges.items():
+                allocator.claim(table, block)
+        if blocks_conn:
+            open_blocks(blocks_conn, ranges)
+        tasks.append((args, ranges, shard_index, shard) + inputs)
+    if checkpoint:
+        checkpoint.save()
+    return tasks
+
+
+def delete_task_rows(name, ranges, inputs):
+    """Deletes the rows an interrupted task may have committed, so it can run again with the same ids"""
+    targets = [(table, 'id', block) for table, block in ranges.items()]
+    for table, column, parent in CHILD_ROWS.get(name, ()):
+        if parent in ranges:
+            targets.append((table, column, ranges[parent]))
+        else:
+            parent_ids = inputs[parent]['id']
+            targets.append((table, column, range(parent_ids.min(), parent_ids.max() + 1)))
+
+    cursor = connection.cursor()
+    # The whole id range goes at once, including rows that reference each other
+    cursor.execute('SET @seed_fk_checks = @@SESSION.foreign_key_checks, foreign_key_checks = 0')
+    for table, column, block in targets:
+        if block:
+            cursor.execute(f'DELETE FROM {table} WHERE {column} BETWEEN %s AND %s', (block.start, block.stop - 1))
+    cursor.execute('SET foreign_key_checks = @seed_fk_checks')
+    cursor.close()
+    connection.commit()
+
+
+def run_stage(name, args, ranges, shard_index, shard, *inputs):
+    """Runs a stage or shard with its own random streams, derived from --seed and its position
+
+    Returns the result of the stage with the load statistics of its tables and
+    what the checkpoint records about it. With --checkpoint, a task finished
+    by an earlier run returns its saved result instead of loading again.
+    """
+    stage = STAGES[name]
+    key = (list(STAGES).index(name),) if shard_index is None else (list(STAGES).index(name), shard_index)
+    info = {
+        'shard': shard_index,
+        'ranges': {table: [block.start, block.stop] for table, block in ranges.items()},
+        'seed': {'entropy': args.seed, 'spawn_key': list(key)},
+    }
+    if args.checkpoint:
+        saved = load_result(args.checkpoint, name, shard_index)
+        if saved is not None:
+            return saved, dict(info, tables={})
+        if args.resume:
+            delete_task_rows(name, ranges, dict(zip(stage.dependencies, inputs)))
+
+    stage_seed = np.random.SeedSequence(args.seed, spawn_key=key)
+    column_seed, value_seed, random_seed = stage_seed.spawn(3)
+    columns.seed(column_seed)
+    values.reseed(value_seed)
+    random.seed(int(random_seed.generate_state(1)[0]))
+    columns.set_now(args.reference_time)
+
+    benchmark = Benchmark()
+    try:
+        result = stage.function(StageContext(args, ranges, shard, benchmark), *inputs)
+        return result, dict(info, tables=benchmark.tables)
+    except Exception:
+        connection.rollback()
+        raise
+
+
+def finish_task(benchmark, checkpoint, blocks_conn, name, result, info):
+    """Adds the statistics of a finished task to the report, records it in the checkpoint and closes its blocks"""
+    benchmark.merge(info.pop('tables'))
+    shard_index = info.pop('shard')
+    if checkpoint and not checkpoint.done(name, shard_index):
+        checkpoint.record(name, shard_index, result, info)
+    if blocks_conn:
+        close_blocks(blocks_conn, {table: range(*block) for table, block in info['ranges'].items()})
+
+
+def open_checkpoint(args):
+    """Starts the checkpoint of a new run, or loads the one to resume and takes its options"""
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.resume:
+        if not checkpoint.exists():
+            raise ValueError(f"No checkpoint to resume in {args.checkpoint}")
+        checkpoint.load()
+        for option in RUN_OPTIONS:
+            setattr(args, option, checkpoint.run[option])
+        args.reference_time = datetime.fromisoformat(args.reference_time)
+        print(f"Resuming from {args.checkpoint}: {len(checkpoint.tasks)} stages and shards already loaded\n")
+    else:
+        # A resumed run has to draw the same values, so the run always gets a seed
+        if args.seed is None:
+            args.seed = int(np.random.SeedSequence().entropy)
+        checkpoint.start({option: getattr(args, option) for option in RUN_OPTIONS})
+    return checkpoint
+
+
+def main(args):
     conn = None
-    cursor = None
+    blocks_conn = None
     try:
-        # Connect to database
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        # Sets to track unique values
-        used_emails = set()
-        used_codes = set()
+        # Every process measures its date ranges from the same moment
+        if args.reference_time is None:
+            args.reference_time = datetime.now().replace(microsecond=0)
+        checkpoint = open_checkpoint(args) if args.checkpoint else None
+        scale_counts(globals(), args.scale_factor, fixed=('NUM_COUNTRIES',))
+        benchmark = Benchmark()
+        # The parent connection only reserves id blocks, stages load through their worker connection
+        conn = connect(args)
+        allocator = IdAllocator(conn, args.id_source)
+        # With the summary tables installed, the blocks being loaded are announced to their refresh
+        blocks_conn = conn if has_open_blocks(conn) else None
+        if checkpoint:
+            # Tasks not planned by the interrupted run get new blocks from the same first ids
+            allocator.next_ids.update(checkpoint.start_ids)
+        if args.partitions:
+            for table in PARTITIONED_TABLES:
+                added = add_partitions(conn, table, args.reference_time - timedelta(days=HISTORY_DAYS),
+                                       args.reference_time)
+                print(f"Added {len(added)} monthly partitions to {table}")
+            print()
+        keys = None
+        if args.defer_keys:
+            keys = defer_keys(conn, args.defer_keys)
+            print(f"Deferred {sum(map(len, keys['indexes'].values()))} indexes and "
+                  f"{sum(map(len, keys['foreign_keys'].values()))} foreign keys, saved to {args.defer_keys}\n")
 
         print("=== STARTING SALES DATABASE POPULATION ===\n")
 
-        # 1. Populate countries
-        countries_data = []
-        countries_info = [
-            ('United States', 'USA'), ('Canada', 'CAN'), ('Mexico', 'MEX'), ('United Kingdom', 'GBR'),
-            ('Germany', 'DEU'), ('France', 'FRA'), ('Italy', 'ITA'), ('Spain', 'ESP'),
-            ('Brazil', 'BRA'), ('Argentina', 'ARG'), ('Chile', 'CHL'), ('Peru', 'PER'),
-            ('Colombia', 'COL'), ('China', 'CHN'), ('Japan', 'JPN'), ('South Korea', 'KOR'),
-            ('Australia', 'AUS'), ('India', 'IND'), ('Russia', 'RUS'), ('Netherlands', 'NLD')
-        ]
-
-        print("Inserting countries...")
-        for i, (name, code) in enumerate(countries_info):
-            cursor.execute(
-                'INSERT INTO countries (name, iso_code) VALUES (%s, %s)',
-                (name, code)
-            )
-            country_id = cursor.lastrowid
-            countries_data.append({'id': country_id, 'name': name, 'code': code})
-
-        conn.commit()
-        print(f"Inserted {len(countries_data)} countries\n")
-
-        # 2. Populate regions
-        regions_data = []
-        print("Inserting regions...")
-        for i in range(NUM_REGIONS):
-            country = random.choice(countries_data)
-            name = f"{fake.state()} - {country['name']}"
-
-            cursor.execute(
-                'INSERT INTO regions (name, country_id) VALUES (%s, %s)',
-                (name, country['id'])
-            )
-            region_id = cursor.lastrowid
-            regions_data.append({
-                'id': region_id,
-                'name': name,
-                'country_id': country['id']
-            })
-
-            if (i + 1) % 25 == 0:
-                print(f"Regions inserted: {i + 1}/{NUM_REGIONS}")
-
-        conn.commit()
-        print(f"Inserted {NUM_REGIONS} regions\n")
-
-        # 3. Populate cities
-        cities_data = []
-        print("Inserting cities...")
-        for i in range(NUM_CITIES):
-            region = random.choice(regions_data)
-            name = fake.city()
-
-            cursor.execute(
-                'INSERT INTO cities (name, region_id) VALUES (%s, %s)',
-                (name, region['id'])
-            )
-            city_id = cursor.lastrowid
-            cities_data.append({
-                'id': city_id,
-                'name': name,
-                'region_id': region['id']
-            })
-
-            if (i + 1) % 100 == 0:
-                print(f"Cities inserted: {i + 1}/{NUM_CITIES}")
-
-        conn.commit()
-        print(f"Inserted {NUM_CITIES} cities\n")
-
-        # 4. Populate users
-        users_data = []
-        print("Inserting users...")
-        for i in range(NUM_USERS):
-            email = generate_unique_email(used_emails)
-            # Ensure email doesn't exceed VARCHAR(150)
-            if len(email) > 150:
-                email = email[:147] + "..."
-
-            password_hash = hash_password("password123")
-            first_name = fake.first_name()[:100]  # Limit to VARCHAR(100)
-            last_name = fake.last_name()[:100]   # Limit to VARCHAR(100)
-            phone = fake.phone_number()[:20]     # Limit to VARCHAR(20)
-            birth_date = fake.date_of_birth(minimum_age=18, maximum_age=70)
-            status = random.choices(['active', 'inactive', 'suspended'], weights=[85, 10, 5])[0]
-
-            cursor.execute(
-                '''INSERT INTO users (email, password_hash, first_name, last_name, phone,
-                                      birth_date, status)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s)''',
-                (email, password_hash, first_name, last_name, phone, birth_date, status)
-            )
-            user_id = cursor.lastrowid
-            users_data.append({
-                'id': user_id,
-                'email': email,
-                'first_name': first_name,
-                'last_name': last_name,
-                'status': status
-            })
-
-            if (i + 1) % 500 == 0:
-                print(f"Users inserted: {i + 1}/{NUM_USERS}")
-
-        conn.commit()
-        print(f"Inserted {NUM_USERS} users\n")
-
-        # 5. Populate employees
-        employees_data = []
-        print("Inserting employees...")
-        available_users = [u for u in users_data if u['status'] == 'active']
-        positions = [
-            'Sales Representative', 'Sales Supervisor', 'Sales Manager', 'Cashier', 'Warehouse Worker',
-            'Warehouse Manager', 'Accountant', 'Accounting Assistant', 'Receptionist', 'Janitor',
-            'General Manager', 'Assistant Manager', 'Inventory Analyst', 'Buyer',
-            'Purchasing Manager', 'Driver', 'Security', 'Cleaning', 'Maintenance', 'IT Specialist'
-        ]
-
-        # Limit employees to maximum 70% of available users to leave room for customers
-        max_employees = min(NUM_EMPLOYEES, int(len(available_users) * 0.7))
-
-        for i in range(max_employees):
-            user = available_users[i]
-            employee_code = generate_unique_code("EMP", used_codes, 6)[:20]  # Limit to VARCHAR(20)
-            position = random.choice(positions)[:100]  # Limit to VARCHAR(100)
-            salary = round(random.uniform(1000, 8000), 2)  # DECIMAL(10,2)
-            hire_date = fake.date_between(start_date='-5y', end_date='today')
-            city = random.choice(cities_data)
-            commission = round(random.uniform(0, 10), 2) if 'Sales' in position else 0.00  # DECIMAL(5,2)
-            status = random.choices(['active', 'inactive', 'leave'], weights=[90, 5, 5])[0]
-
-            cursor.execute(
-                '''INSERT INTO employees (user_id, employee_code, position, salary,
-                                          hire_date, city_id, commission_percentage, status)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s)''',
-                (user['id'], employee_code, position, salary, hire_date,
-                 city['id'], commission, status)
-            )
-            employee_id = cursor.lastrowid
-            employees_data.append({
-                'id': employee_id,
-                'user_id': user['id'],
-                'code': employee_code,
-                'position': position,
-                'status': status
-            })
-
-            if (i + 1) % 1000 == 0:
-                print(f"Employees inserted: {i + 1}/{max_employees}")
-
-        # Assign managers to some employees
-        for employee in employees_data:
-            if random.random() < 0.3:  # 30% of employees have a manager
-                manager = random.choice([e for e in employees_data if e['id'] != employee['id']])
-                cursor.execute(
-                    'UPDATE employees SET manager_id = %s WHERE id = %s',
-                    (manager['id'], employee['id'])
-                )
-
-        conn.commit()
-        print(f"Inserted {len(employees_data)} employees\n")
-
-        # 6. Populate customers
-        customers_data = []
-        print("Inserting customers...")
-        # Use users that aren't already employees - start from where employees ended
-        used_user_ids = {emp['user_id'] for emp in employees_data}
-        remaining_users = [u for u in available_users if u['id'] not in used_user_ids]
-
-        print(f"Available users for customers: {len(remaining_users)}")
-
-        for i in range(min(NUM_CUSTOMERS, len(remaining_users))):
-            user = remaining_users[i]
-            customer_type = random.choices(['individual', 'corporate'], weights=[80, 20])[0]
-            identification_document = fake.ssn()[:50] if customer_type == 'individual' else fake.ein()[:50]  # VARCHAR(50)
-            registration_date = fake.date_between(start_date='-2y', end_date='today')
-            city = random.choice(cities_data)
-            address = fake.address()  # TEXT field
-            credit_limit = round(random.uniform(1000, 50000), 2)  # DECIMAL(12,2)
-            assigned_employee = random.choice(employees_data) if random.random() < 0.7 else None
-            status = random.choices(['active', 'inactive', 'delinquent'], weights=[85, 10, 5])[0]
-
-            cursor.execute(
-                '''INSERT INTO customers (user_id, customer_type, identification_document,
-                                          registration_date, city_id, address, credit_limit, assigned_employee_id,
-                                          status)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)''',
-                (user['id'], customer_type, identification_document, registration_date, city['id'],
-                 address, credit_limit, assigned_employee['id'] if assigned_employee else None, status)
-            )
-            customer_id = cursor.lastrowid
-            customers_data.append({
-                'id': customer_id,
-                'user_id': user['id'],
-                'type': customer_type,
-                'status': status
-            })
-
-            if (i + 1) % 200 == 0:
-                print(f"Customers inserted: {i + 1}/{min(NUM_CUSTOMERS, len(remaining_users))}")
-
-        conn.commit()
-        print(f"Inserted {len(customers_data)} customers\n")
-
-        # 7. Populate suppliers
-        suppliers_data = []
-        print("Inserting suppliers...")
-        used_tax_ids = set()  # Track unique tax_ids
-
-        for i in range(NUM_SUPPLIERS):
-            company_name = fake.company()[:150]  # VARCHAR(150)
-
-            # Generate unique tax_id using the same logic as codes
-            tax_id = generate_unique_code("TAX", used_tax_ids, 6)[:20]  # VARCHAR(20) UNIQUE
-
-            email = fake.company_email()[:150]  # VARCHAR(150)
-            phone = fake.phone_number()[:20]  # VARCHAR(20)
-            address = fake.address()  # TEXT
-            city = random.choice(cities_data)
-            contact_name = fake.name()[:100]  # VARCHAR(100)
-            contact_phone = fake.phone_number()[:20]  # VARCHAR(20)
-            status = random.choices(['active', 'inactive'], weights=[90, 10])[0]
-
-            cursor.execute(
-                '''INSERT INTO suppliers (company_name, tax_id, email, phone, address,
-                                          city_id, contact_name, contact_phone, status)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)''',
-                (company_name, tax_id, email, phone, address, city['id'],
-                 contact_name, contact_phone, status)
-            )
-            supplier_id = cursor.lastrowid
-            suppliers_data.append({
-                'id': supplier_id,
-                'name': company_name,
-                'status': status
-            })
-
-            if (i + 1) % 500 == 0:
-                print(f"Suppliers inserted: {i + 1}/{NUM_SUPPLIERS}")
-
-        conn.commit()
-        print(f"Inserted {NUM_SUPPLIERS} suppliers\n")
-
-        # 8. Populate product categories
-        categories_data = []
-        print("Inserting product categories...")
-        main_categories = [
-            'Electronics', 'Clothing & Footwear', 'Home & Garden', 'Sports', 'Books',
-            'Health & Beauty', 'Automotive', 'Toys', 'Music', 'Movies',
-            'Food', 'Beverages', 'Pet Supplies', 'Office Supplies', 'Tools'
-        ]
-
-        # Insert main categories
-        for category in main_categories:
-            cursor.execute(
-                'INSERT INTO product_categories (name, description) VALUES (%s, %s)',
-                (category[:100], fake.text(max_nb_chars=200))  # VARCHAR(100) for name
-            )
-            category_id = cursor.lastrowid
-            categories_data.append({
-                'id': category_id,
-                'name': category,
-                'is_parent': True
-            })
-
-        # Insert subcategories
-        for i in range(NUM_CATEGORIES - len(main_categories)):
-            parent_category = random.choice(categories_data)
-            name = f"{fake.word().title()} {parent_category['name']}"[:100]  # VARCHAR(100)
-
-            cursor.execute(
-                '''INSERT INTO product_categories (name, description, parent_category_id)
-                   VALUES (%s, %s, %s)''',
-                (name, fake.text(max_nb_chars=200), parent_category['id'])
-            )
-            category_id = cursor.lastrowid
-            categories_data.append({
-                'id': category_id,
-                'name': name,
-                'is_parent': False
-            })
-
-        conn.commit()
-        print(f"Inserted {NUM_CATEGORIES} product categories\n")
-
-        # 9. Populate products
-        products_data = []
-        print("Inserting products...")
-        units = ['unit', 'kilogram', 'liter', 'meter', 'box', 'package']
-
-        for i in range(NUM_PRODUCTS):
-            code = generate_unique_code("PROD", used_codes, 8)[:50]  # VARCHAR(50)
-            name = f"{fake.word().title()} {fake.word().title()}"[:200]  # VARCHAR(200)
-            description = fake.text(max_nb_chars=500)  # TEXT
-            category = random.choice(categories_data)
-            supplier = random.choice([s for s in suppliers_data if s['status'] == 'active'])
-            purchase_price = round(random.uniform(10, 500), 2)  # DECIMAL(10,2)
-            sale_price = round(purchase_price * random.uniform(1.2, 3.0), 2)  # DECIMAL(10,2)
-            current_stock = random.randint(0, 1000)
-            minimum_stock = random.randint(5, 50)
-            unit = random.choice(units)[:20]  # VARCHAR(20)
-            weight = round(random.uniform(0.1, 10.0), 3)  # DECIMAL(8,3)
-            dimensions = f"{random.randint(1, 50)}x{random.randint(1, 50)}x{random.randint(1, 50)} cm"[:100]  # VARCHAR(100)
-            status = random.choices(['active', 'discontinued', 'out_of_stock'], weights=[85, 10, 5])[0]
-
-            cursor.execute(
-                '''INSERT INTO products (product_code, name, description, category_id,
-                                         supplier_id, purchase_price, sale_price, current_stock, minimum_stock,
-                                         unit_of_measure, weight, dimensions, status)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)''',
-                (code, name, description, category['id'], supplier['id'],
-                 purchase_price, sale_price, current_stock, minimum_stock,
-                 unit, weight, dimensions, status)
-            )
-            product_id = cursor.lastrowid
-            products_data.append({
-                'id': product_id,
-                'code': code,
-                'name': name,
-                'purchase_price': purchase_price,
-                'sale_price': sale_price,
-                'current_stock': current_stock,
-                'status': status
-            })
-
-            if (i + 1) % 1000 == 0:
-                print(f"Products inserted: {i + 1}/{NUM_PRODUCTS}")
-
-        conn.commit()
-        print(f"Inserted {NUM_PRODUCTS} products\n")
-
-        # 10. Populate warehouses
-        warehouses_data = []
-        print("Inserting warehouses...")
-        for i in range(NUM_WAREHOUSES):
-            name = f"Warehouse {fake.city()}"[:100]  # VARCHAR(100)
-            address = fake.address()  # TEXT NOT NULL
-            city = random.choice(cities_data)
-            phone = fake.phone_number()[:20] if random.random() < 0.7 else None  # VARCHAR(20)
-            max_capacity = random.randint(1000, 50000)  # INT
-            manager = random.choice([e for e in employees_data if 'Manager' in e['position']])
-            status = random.choices(['active', 'inactive', 'maintenance'], weights=[85, 10, 5])[0]
-
-            cursor.execute(
-                '''INSERT INTO warehouses (name, address, city_id, phone, max_capacity,
-                                          manager_employee_id, status)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s)''',
-                (name, address, city['id'], phone, max_capacity, manager['id'], status)
-            )
-            warehouse_id = cursor.lastrowid
-            warehouses_data.append({
-                'id': warehouse_id,
-                'name': name,
-                'status': status
-            })
-
-        conn.commit()
-        print(f"Inserted {NUM_WAREHOUSES} warehouses\n")
-
-        # 11. Populate warehouse inventory
-        warehouse_inventory_data = []
-        print("Inserting warehouse inventory...")
-
-        # More realistic approach: each warehouse has inventory for 10-25% of products
-        # This will create approximately 15,000-25,000 records instead of 500,000+
-        batch_size = 1000
-        total_inventory_records = 0
-
-        for warehouse_idx, warehouse in enumerate(warehouses_data):
-            # Each warehouse has inventory for 10-25% of products (more realistic)
-            inventory_percentage = random.uniform(0.10, 0.25)
-            num_products = int(len(products_data) * inventory_percentage)
-            warehouse_products = random.sample(products_data, num_products)
-
-            batch_inventory = []
-            for product in warehouse_products:
-                # More realistic quantity ranges based on product type
-                if product['current_stock'] > 100:
-                    quantity = random.randint(50, 300)
-                elif product['current_stock'] > 50:
-                    quantity = random.randint(10, 100)
-                else:
-                    quantity = random.randint(0, 50)
-
-                location = f"{chr(65 + random.randint(0, 4))}{random.randint(1, 10)}-{random.randint(1, 5)}-{random.randint(1, 20)}"[:50]  # A1-1-1 to E10-5-20
-
-                batch_inventory.append((product['id'], warehouse['id'], quantity, location))
-
-                # Insert in batches for better performance
-                if len(batch_inventory) >= batch_size:
-                    cursor.executemany(
-                        '''INSERT INTO warehouse_inventory (product_id, warehouse_id, quantity, location)
-                           VALUES (%s, %s, %s, %s)''',
-                        batch_inventory
-                    )
-                    warehouse_inventory_data.extend([{
-                        'id': None,  # We don't need the actual ID for our use case
-                        'product_id': item[0],
-                        'warehouse_id': item[1],
-                        'quantity': item[2]
-                    } for item in batch_inventory])
-                    total_inventory_records += len(batch_inventory)
-                    batch_inventory = []
-
-            # Insert remaining records in batch
-            if batch_inventory:
-                cursor.executemany(
-                    '''INSERT INTO warehouse_inventory (product_id, warehouse_id, quantity, location)
-                       VALUES (%s, %s, %s, %s)''',
-                    batch_inventory
-                )
-                warehouse_inventory_data.extend([{
-                    'id': None,
-                    'product_id': item[0],
-                    'warehouse_id': item[1],
-                    'quantity': item[2]
-                } for item in batch_inventory])
-                total_inventory_records += len(batch_inventory)
-
-            # Progress update every 10 warehouses
-            if (warehouse_idx + 1) % 10 == 0:
-                conn.commit()  # Commit every 10 warehouses
-                print(f"Warehouse inventory processed: {warehouse_idx + 1}/{len(warehouses_data)} warehouses, {total_inventory_records} records")
-
-        conn.commit()
-        print(f"Inserted {total_inventory_records} warehouse inventory records (optimized)\n")
-
-        # 12. Populate purchase orders
-        purchase_orders_data = []
-        print("Inserting purchase orders...")
-
-        # Process in batches to avoid memory issues
-        batch_size = 10000
-        for batch_start in range(0, NUM_PURCHASE_ORDERS, batch_size):
-            batch_end = min(batch_start + batch_size, NUM_PURCHASE_ORDERS)
-            batch_orders = []
-
-            for i in range(batch_start, batch_end):
-                order_number = generate_unique_code("PO", used_codes, 10)[:50]  # VARCHAR(50)
-                supplier = random.choice([s for s in suppliers_data if s['status'] == 'active'])
-                employee = random.choice([e for e in employees_data if e['status'] == 'active'])
-                order_date = fake.date_between(start_date='-1y', end_date='today')
-
-                # Calculate delivery date (1-30 days after order date)
-                delivery_days = random.randint(1, 30)
-                estimated_delivery_date = order_date + timedelta(days=delivery_days)
-
-                # Some orders are already delivered
-                if random.random() < 0.7:  # 70% delivered
-                    actual_delivery_date = estimated_delivery_date + timedelta(days=random.randint(-5, 10))
-                    status = 'received'
-                else:
-                    actual_delivery_date = None
-                    status = random.choices(['pending', 'approved', 'shipped', 'cancelled'], weights=[30, 30, 30, 10])[0]
-
-                # Calculate amounts - DECIMAL(12,2)
-                subtotal = round(random.uniform(100, 10000), 2)
-                taxes = round(subtotal * 0.18, 2)  # 18% tax
-                total = round(subtotal + taxes, 2)
-                notes = fake.text(max_nb_chars=200) if random.random() < 0.3 else None
-
-                cursor.execute(
-                    '''INSERT INTO purchase_orders (order_number, supplier_id, requesting_employee_id,
-                                                    order_date, estimated_delivery_date, actual_delivery_date,
-                                                    subtotal, taxes, total, status, notes)
-                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)''',
-                    (order_number, supplier['id'], employee['id'],
-                     order_date, estimated_delivery_date, actual_delivery_date,
-                     subtotal, taxes, total, status, notes)
-                )
-                po_id = cursor.lastrowid
-                batch_orders.append({
-                    'id': po_id,
-                    'number': order_number,
-                    'status': status,
-                    'supplier_id': supplier['id'],
-                    'subtotal': subtotal
-                })
-
-            purchase_orders_data.extend(batch_orders)
-            conn.commit()
-            print(f"Purchase orders inserted: {batch_end}/{NUM_PURCHASE_ORDERS}")
-
-        print(f"Inserted {NUM_PURCHASE_ORDERS} purchase orders\n")
-
-        # 13. Populate purchase order details
-        print("Inserting purchase order details...")
-        for i, po in enumerate(purchase_orders_data):
-            # Each purchase order has 1-5 different products
-            num_products = random.randint(1, 5)
-            po_products = random.sample([p for p in products_data if p['status'] == 'active'],
-                                      min(num_products, len([p for p in products_data if p['status'] == 'active'])))
-
-            for product in po_products:
-                quantity = random.randint(1, 100)
-                unit_price = round(random.uniform(10, 500), 2)  # DECIMAL(10,2)
-                subtotal = round(quantity * unit_price, 2)  # DECIMAL(12,2)
-
-                cursor.execute(
-                    '''INSERT INTO purchase_order_details (purchase_order_id, product_id, quantity,
-                                                           unit_price, subtotal)
-                       VALUES (%s, %s, %s, %s, %s)''',
-                    (po['id'], product['id'], quantity, unit_price, subtotal)
-                )
-
-            if (i + 1) % 10000 == 0:
-                conn.commit()
-                print(f"Purchase order details processed: {i + 1}/{len(purchase_orders_data)}")
-
-        conn.commit()
-        print(f"Inserted purchase order details for all orders\n")
-
-        # 14. Populate sales
-        sales_data = []
-        print("Inserting sales...")
-        payment_methods = ['cash', 'credit_card', 'debit_card', 'transfer', 'credit']
-
-        for i in range(NUM_SALES):
-            sale_number = generate_unique_code("S", used_codes, 10)[:50]  # VARCHAR(50)
-            customer = random.choice([c for c in customers_data if c['status'] == 'active'])
-            employee = random.choice([e for e in employees_data if e['status'] == 'active'])
-            sale_date = fake.date_time_between(start_date='-6m', end_date='now')
-            payment_method = random.choice(payment_methods)
-
-            # Calculate amounts - DECIMAL(12,2)
-            subtotal = round(random.uniform(50, 2000), 2)
-            discount = round(subtotal * random.uniform(0, 0.2), 2) if random.random() < 0.3 else 0.00  # 30% chance of discount
-            taxes = round(subtotal * 0.18, 2)  # 18% tax
-            total = round(subtotal + taxes - discount, 2)
-            notes = fake.text(max_nb_chars=200) if random.random() < 0.2 else None
-
-            status = random.choices(['completed', 'cancelled', 'returned'], weights=[90, 5, 5])[0]
-
-            cursor.execute(
-                '''INSERT INTO sales (sale_number, customer_id, salesperson_employee_id, sale_date,
-                                     subtotal, discount, taxes, total, payment_method, status, notes)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)''',
-                (sale_number, customer['id'], employee['id'], sale_date,
-                 subtotal, discount, taxes, total, payment_method, status, notes)
-            )
-            sale_id = cursor.lastrowid
-            sales_data.append({
-                'id': sale_id,
-                'number': sale_number,
-                'customer_id': customer['id'],
-                'status': status,
-                'total': total
-            })
-
-            if (i + 1) % 1000 == 0:
-                print(f"Sales inserted: {i + 1}/{NUM_SALES}")
-
-        conn.commit()
-        print(f"Inserted {NUM_SALES} sales\n")
-
-        # 15. Populate sales details
-        print("Inserting sales details...")
-        for i, sale in enumerate(sales_data):
-            # Each sale has 1-3 different products
-            num_products = random.randint(1, 3)
-            sale_products = random.sample([p for p in products_data if p['status'] == 'active' and p['current_stock'] > 0],
-                                        min(num_products, len([p for p in products_data if p['status'] == 'active' and p['current_stock'] > 0])))
-
-            for product in sale_products:
-                quantity = random.randint(1, min(10, product['current_stock']))
-                unit_price = round(product['sale_price'] * random.uniform(0.9, 1.1), 2)  # DECIMAL(10,2)
-                unit_discount = round(unit_price * random.uniform(0, 0.1), 2) if random.random() < 0.2 else 0.00  # DECIMAL(10,2)
-                subtotal = round((unit_price - unit_discount) * quantity, 2)  # DECIMAL(12,2)
-
-                cursor.execute(
-                    '''INSERT INTO sale_details (sale_id, product_id, quantity, unit_price, unit_discount, subtotal)
-                       VALUES (%s, %s, %s, %s, %s, %s)''',
-                    (sale['id'], product['id'], quantity, unit_price, unit_discount, subtotal)
-                )
-
-            if (i + 1) % 1000 == 0:
-                conn.commit()
-                print(f"Sales details processed: {i + 1}/{len(sales_data)}")
-
-        conn.commit()
-        print(f"Inserted sales details for all sales\n")
-
-        # 16. Populate inventory movements
-        inventory_movements_data = []
-        print("Inserting inventory movements...")
-        movement_types = ['in', 'out', 'adjustment', 'transfer']
-        reference_types = ['sale', 'purchase', 'adjustment', 'transfer']
-
-        for i in range(NUM_SALES * 2):  # 2 movements per sale on average
-            product = random.choice(products_data)
-            warehouse = random.choice([w for w in warehouses_data if w['status'] == 'active'])
-            movement_type = random.choice(movement_types)
-            reference_type = random.choice(reference_types)
-            quantity = random.randint(1, 50)
-            employee = random.choice([e for e in employees_data if e['status'] == 'active'])
-            notes = fake.text(max_nb_chars=200) if random.random() < 0.3 else None
-            movement_date = fake.date_time_between(start_date='-6m', end_date='now')
-            reference_id = random.choice(sales_data)['id'] if reference_type == 'sale' else None
-
-            cursor.execute(
-                '''INSERT INTO inventory_movements (product_id, warehouse_id, movement_type, quantity,
-                                                   reference_type, reference_id, employee_id, notes, movement_date)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)''',
-                (product['id'], warehouse['id'], movement_type, quantity, reference_type,
-                 reference_id, employee['id'], notes, movement_date)
-            )
-
-            inventory_movements_data.append({
-                'id': cursor.lastrowid,
-                'product_id': product['id'],
-                'warehouse_id': warehouse['id']
-            })
-
-        conn.commit()
-        print(f"Inserted {len(inventory_movements_data)} inventory movements\n")
-
-        # 17. Populate accounts receivable
-        accounts_receivable_data = []
-        print("Inserting accounts receivable...")
-        credit_sales = [s for s in sales_data if s['status'] == 'completed']
-
-        for sale in credit_sales[:int(len(credit_sales) * 0.3)]:  # 30% of sales have credit
-            customer_id = sale['customer_id']
-            total_amount = sale['total']
-            # Some accounts are partially paid
-            if random.random() < 0.6:  # 60% fully pending
-                pending_amount = total_amount
-                status = 'pending'
-            elif random.random() < 0.8:  # 20% partially paid
-                pending_amount = round(total_amount * random.uniform(0.3, 0.9), 2)
-                status = 'partial'
-            else:  # 20% fully paid
-                pending_amount = 0.00
-                status = 'paid'
-
-            due_date = fake.date_between(start_date='today', end_date='+60d')
-            days_overdue = max(0, (datetime.now().date() - due_date).days) if pending_amount > 0 else 0
-            if days_overdue > 0:
-                status = 'overdue'
-
-            cursor.execute(
-                '''INSERT INTO accounts_receivable (sale_id, customer_id, total_amount, pending_amount,
-                                                   due_date, days_overdue, status)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s)''',
-                (sale['id'], customer_id, total_amount, pending_amount, due_date, days_overdue, status)
-            )
-
-            accounts_receivable_data.append({
-                'id': cursor.lastrowid,
-                'sale_id': sale['id'],
-                'customer_id': customer_id,
-                'total_amount': total_amount,
-                'pending_amount': pending_amount,
-                'status': status
-            })
-
-        conn.commit()
-        print(f"Inserted {len(accounts_receivable_data)} accounts receivable\n")
-
-        # 18. Populate payments received
-        payments_received_data = []
-        print("Inserting payments received...")
-        payment_methods_received = ['cash', 'credit_card', 'debit_card', 'transfer', 'check']
-
-        for ar in accounts_receivable_data:
-            if ar['status'] in ['paid', 'partial']:
-                num_payments = random.randint(1, 3)
-                remaining_amount = ar['total_amount'] - ar['pending_amount']
-
-                for _ in range(num_payments):
-                    if remaining_amount <= 0:
-                        break
-
-                    if num_payments == 1:
-                        payment_amount = remaining_amount
-                    else:
-                        payment_amount = round(remaining_amount * random.uniform(0.3, 0.8), 2)
-
-                    payment_method = random.choice(payment_methods_received)
-                    reference_number = f"REF{random.randint(100000, 999999)}" if payment_method in ['transfer', 'check'] else None
-                    payment_date = fake.date_time_between(start_date='-3m', end_date='now')
-                    receiving_employee = random.choice([e for e in employees_data if e['status'] == 'active'])
-                    notes = fake.text(max_nb_chars=100) if random.random() < 0.2 else None
-
-                    cursor.execute(
-                        '''INSERT INTO payments_received (accounts_receivable_id, payment_amount, payment_method,
-                                                         reference_number, payment_date, receiving_employee_id, notes)
-                           VALUES (%s, %s, %s, %s, %s, %s, %s)''',
-                        (ar['id'], payment_amount, payment_method, reference_number,
-                         payment_date, receiving_employee['id'], notes)
-                    )
-
-                    payments_received_data.append({
-                        'id': cursor.lastrowid,
-                        'accounts_receivable_id': ar['id'],
-                        'payment_amount': payment_amount
-                    })
-
-                    remaining_amount -= payment_amount
-
-        conn.commit()
-        print(f"Inserted {len(payments_received_data)} payments received\n")
-
-        # 19. Populate returns
-        returns_data = []
-        print("Inserting returns...")
-
-        # Returns are based on completed sales
-        completed_sales = [s for s in sales_data if s['status'] == 'completed']
-
-        for i in range(min(NUM_RETURNS, len(completed_sales))):
-            sale = random.choice(completed_sales)
-            return_number = generate_unique_code("R", used_codes, 10)[:50]  # VARCHAR(50)
-            return_date = fake.date_time_between(start_date='-6m', end_date='now')
-            reason = fake.text(max_nb_chars=300)  # TEXT field
-            total_returned = round(sale['total'] * random.uniform(0.1, 1.0), 2)  # DECIMAL(12,2)
-            status = random.choices(['approved', 'rejected', 'pending', 'processed'], weights=[60, 10, 20, 10])[0]
-
-            # Get customer from sale
-            customer_id = sale['customer_id']
-            authorizing_employee = random.choice([e for e in employees_data if e['status'] == 'active'])
-
-            cursor.execute(
-                '''INSERT INTO returns (return_number, sale_id, customer_id, authorizing_employee_id,
-                                       return_date, reason, total_returned, status)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s)''',
-                (return_number, sale['id'], customer_id, authorizing_employee['id'],
-                 return_date, reason, total_returned, status)
-            )
-            return_id = cursor.lastrowid
-            returns_data.append({
-                'id': return_id,
-                'number': return_number,
-                'sale_id': sale['id']
-            })
-
-            # Remove the sale from available sales to avoid duplicate returns
-            completed_sales.remove(sale)
-
-        conn.commit()
-        print(f"Inserted {len(returns_data)} returns\n")
-
-        # 20. Populate return details
-        return_details_data = []
-        print("Inserting return details...")
-        product_conditions = ['new', 'used', 'damaged']
-
-        for return_record in returns_data:
-            # Each return has 1-3 products returned
-            num_products = random.randint(1, 3)
-            return_products = random.sample([p for p in products_data if p['status'] == 'active'], num_products)
-
-            for product in return_products:
-                quantity_returned = random.randint(1, 5)
-                unit_price = round(product['sale_price'] * random.uniform(0.9, 1.1), 2)  # DECIMAL(10,2)
-                subtotal_returned = round(unit_price * quantity_returned, 2)  # DECIMAL(12,2)
-                product_condition = random.choice(product_conditions)
-
-                cursor.execute(
-                    '''INSERT INTO return_details (return_id, product_id, quantity_returned, unit_price,
-                                                  subtotal_returned, product_condition)
-                       VALUES (%s, %s, %s, %s, %s, %s)''',
-                    (return_record['id'], product['id'], quantity_returned, unit_price,
-                     subtotal_returned, product_condition)
-                )
-
-                return_details_data.append({
-                    'id': cursor.lastrowid,
-                    'return_id': return_record['id'],
-                    'product_id': product['id']
-                })
-
-        conn.commit()
-        print(f"Inserted {len(return_details_data)} return details\n")
+        # Workers share the value pools through a cache directory so each provider is generated once
+        with tempfile.TemporaryDirectory(prefix='faker_values_') as cache_dir:
+            if args.workers > 1 and not args.value_cache:
+                args.value_cache = cache_dir
+            results = run_stages(STAGES, partial(plan_stage, args, allocator, checkpoint, blocks_conn), run_stage,
+                                 args.workers, init_worker, (args,),
+                                 collect=partial(finish_task, benchmark, checkpoint, blocks_conn), merge=merge_results)
+
+        key_seconds = None
+        if keys:
+            print("Adding back indexes and foreign keys...")
+            key_seconds = restore_keys(conn, keys, args.defer_keys)
+            print(f"Keys added in {sum(key_seconds.values()):.1f}s, no rows with missing references\n")
+
+        summaries = None
+        if args.summaries:
+            print("Refreshing daily summaries...")
+            summaries = refresh_summaries(conn)
+            print()
 
         print("=== DATABASE POPULATION COMPLETED SUCCESSFULLY ===")
         print(f"Summary:")
-        print(f"- Countries: {len(countries_data)}")
-        print(f"- Regions: {len(regions_data)}")
-        print(f"- Cities: {len(cities_data)}")
-        print(f"- Users: {len(users_data)}")
-        print(f"- Employees: {len(employees_data)}")
-        print(f"- Customers: {len(customers_data)}")
-        print(f"- Suppliers: {len(suppliers_data)}")
-        print(f"- Categories: {len(categories_data)}")
-        print(f"- Products: {len(products_data)}")
-        print(f"- Warehouses: {len(warehouses_data)}")
-        print(f"- Warehouse Inventory: {len(warehouse_inventory_data)}")
-        print(f"- Purchase Orders: {len(purchase_orders_data)}")
-        print(f"- Sales: {len(sales_data)}")
-        print(f"- Inventory Movements: {len(inventory_movements_data)}")
-        print(f"- Accounts Receivable: {len(accounts_receivable_data)}")
-        print(f"- Payments Received: {len(payments_received_data)}")
-        print(f"- Returns: {len(returns_data)}")
-        print(f"- Return Details: {len(return_details_data)}")
+        print(f"- Countries: {len(results['countries'])}")
+        print(f"- Regions: {len(results['regions'])}")
+        print(f"- Cities: {len(results['cities'])}")
+        print(f"- Users: {len(results['users'])}")
+        print(f"- Employees: {len(results['employees'])}")
+        print(f"- Customers: {len(results['customers'])}")
+        print(f"- Suppliers: {len(results['suppliers'])}")
+        print(f"- Categories: {len(results['categories'])}")
+        print(f"- Products: {len(results['products'])}")
+        print(f"- Warehouses: {len(results['warehouses'])}")
+        print(f"- Warehouse Inventory: {results['stock']['warehouse_inventory']}")
+        print(f"- Stock Snapshots: {results['stock']['stock_snapshots']}")
+        print(f"- Purchase Orders: {results['purchase_orders']['purchase_orders']}")
+        print(f"- Purchase Order Details: {results['purchase_orders']['purchase_order_details']}")
+        print(f"- Sales: {results['sales']['sales']}")
+        print(f"- Sale Details: {results['sales']['sale_details']}")
+        movement_stages = ('purchase_orders', 'sales', 'inventory_movements', 'stock')
+        print(f"- Inventory Movements: {sum(results[name]['inventory_movements'] for name in movement_stages)}")
+        print(f"- Accounts Receivable: {results['sales']['accounts_receivable']}")
+        print(f"- Payments Received: {results['sales']['payments_received']}")
+        print(f"- Returns: {results['sales']['returns']}")
+        print(f"- Return Details: {results['sales']['return_details']}")
+
+        if args.report:
+            benchmark.write(args.report, script='faker_ventas', scale_factor=args.scale_factor, mode=args.mode,
+                            batch_size=args.batch_size, workers=args.workers, shard_size=args.shard_size,
+                            seed=args.seed, key_seconds=key_seconds, summaries=summaries)
 
     except mysql.connector.Error as err:
         print(f"MySQL Error: {err}")
-        if conn:
-            conn.rollback()
     except Exception as e:
         print(f"Error: {e}")
-        if conn:
-            conn.rollback()
     finally:
-        if conn and conn.is_connected():
-            if cursor:
-                cursor.close()
-            conn.close()
+        # Without a checkpoint a failed load is never resumed, so its blocks must not hold the summaries back
+        if blocks_conn and not args.checkpoint and blocks_conn.is_connected():
+            try:
+                closed = close_run_blocks(blocks_conn)
+                if closed:
+                    print(f"Closed {closed} id blocks of the unfinished load")
+            except mysql.connector.Error as err:
+                print(f"Could not close the id blocks of the load ({err}); "
+                      f"remove them with refresh_summaries.py --clear-stale-blocks")
+        for open_conn in (connection, conn):
+            if open_conn and open_conn.is_connected():
+                open_conn.close()
+        if conn:
             print("\nDatabase connection closed.")
 
 
 if __name__ == "__main__":
-    main()
+    main(parse_args())
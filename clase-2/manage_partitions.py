@@ -0,0 +1,68 @@
+# Maintenance of the monthly partitions of sales and inventory_movements
+# Lists the partitions, adds the coming months and drops or archives the old ones
+import argparse
+from datetime import date
+
+import mysql.connector
+
+from faker_ventas import DB_CONFIG
+from seed_bench import add_connection_arguments, connection_config
+from ventas_partitions import PARTITIONED_TABLES, add_months, add_partitions, drop_partitions, list_partitions, month_start
+
+# Months created ahead of the current one by the add command
+MONTHS_AHEAD = 3
+
+
+def parse_args():
+    """Reads the command and options of the maintenance tool"""
+    parser = argparse.ArgumentParser(description='Maintains the monthly partitions of the sales_system time series')
+    parser.add_argument('--table', choices=list(PARTITIONED_TABLES), action='append', default=None,
+                        help='table to maintain, can be repeated (default: all partitioned tables)')
+    add_connection_arguments(parser, DB_CONFIG)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help='show the partitions with their bound and estimated rows')
+
+    add = commands.add_parser('add', help='add the partitions of the coming months')
+    add.add_argument('--months', type=int, default=MONTHS_AHEAD,
+                     help='months after the current one that must have a partition')
+    add.add_argument('--from', dest='first', type=date.fromisoformat, default=None,
+                     help='also add every month since this date, e.g. 2024-01-01 (default: current month)')
+
+    drop = commands.add_parser('drop', help='drop the partitions older than a date')
+    drop.add_argument('--before', type=date.fromisoformat, required=True,
+                      help='drop the partitions whose rows are all older than this date, e.g. 2024-01-01')
+    drop.add_argument('--archive', action='store_true',
+                      help='keep each partition as a table named <table>_<partition> instead of deleting its rows')
+    return parser.parse_args()
+
+
+def main(args):
+    conn = None
+    try:
+        conn = mysql.connector.connect(**connection_config(args, DB_CONFIG))
+        for table in args.table or PARTITIONED_TABLES:
+            if args.command == 'add':
+                current = month_start(date.today())
+                added = add_partitions(conn, table, args.first or current, add_months(current, args.months))
+                print(f"{table}: added {', '.join(added) if added else 'no partitions'}")
+            elif args.command == 'drop':
+                dropped = drop_partitions(conn, table, args.before, args.archive)
+                action = 'archived' if args.archive else 'dropped'
+                print(f"{table}: {action} {', '.join(dropped) if dropped else 'no partitions'}")
+
+            print(f"\n{table}")
+            for name, bound, rows in list_partitions(conn, table):
+                print(f"  {name:<10} < {bound or 'MAXVALUE'!s:<10} {rows:>12} rows")
+
+    except mysql.connector.Error as err:
+        print(f"MySQL Error: {err}")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
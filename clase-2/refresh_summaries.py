@@ -0,0 +1,55 @@
+# Incremental refresh job of the daily summary tables (ventas_summaries.sql)
+# Each run only aggregates the facts loaded since the previous one; schedule it after every load
+import argparse
+import json
+
+import mysql.connector
+
+from faker_ventas import DB_CONFIG
+from seed_bench import add_connection_arguments, connection_config
+from ventas_summaries import SUMMARIES, clear_stale_blocks, refresh_summaries
+
+
+def parse_args():
+    """Reads the command line options of the refresh job"""
+    parser = argparse.ArgumentParser(description='Refreshes the daily summary tables of sales_system')
+    parser.add_argument('--summary', choices=list(SUMMARIES), action='append', default=None,
+                        help='summary table to refresh, can be repeated (default: all)')
+    parser.add_argument('--full', action='store_true',
+                        help='empty the summaries and aggregate every fact again, e.g. after facts were updated')
+    parser.add_argument('--clear-stale-blocks', action='store_true',
+                        help='list and remove the open id blocks of loads whose connection is gone before '
+                             'refreshing; keep them instead if the load will be resumed')
+    parser.add_argument('--report', default=None,
+                        help='JSON file where the rows and time per summary are written')
+    add_connection_arguments(parser, DB_CONFIG)
+    return parser.parse_args()
+
+
+def main(args):
+    conn = None
+    try:
+        conn = mysql.connector.connect(**connection_config(args, DB_CONFIG))
+        if args.clear_stale_blocks:
+            blocks = clear_stale_blocks(conn)
+            for table, first_id, last_id, connection_id, opened_at in blocks:
+                print(f"Removed stale block {table} {first_id}-{last_id} "
+                      f"(connection {connection_id}, opened {opened_at})")
+            print(f"{len(blocks)} stale blocks removed\n")
+        results = refresh_summaries(conn, args.full, args.summary)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as report_file:
+                json.dump(results, report_file, indent=2)
+            print(f"Report written to {args.report}")
+
+    except mysql.connector.Error as err:
+        print(f"MySQL Error: {err}")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,180 @@
+# Scale factor, connection options and benchmark report shared by the seed scripts
+# --scale-factor multiplies every NUM_* constant; --report writes rows/s, MB/s and time split per table as JSON
+import json
+import math
+import re
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage
+    resource = None
+
+
+def scale_counts(namespace, factor, fixed=()):
+    """Sets the NUM_* constants of a script to their default times factor, keeping at least one row per table
+
+    The defaults are saved in the namespace on the first call, so scaling
+    again (for example in a worker that already scaled) does not compound.
+    """
+    base = namespace.setdefault('_BASE_COUNTS', {
+        name: value for name, value in namespace.items() if name.startswith('NUM_') and isinstance(value, int)
+    })
+    for name, value in base.items():
+        namespace[name] = value if name in fixed else max(1, round(value * factor))
+
+
+def add_scale_arguments(parser):
+    """Adds --scale-factor and --report to a seed script parser"""
+    parser.add_argument('--scale-factor', type=float, default=1.0,
+                        help='multiplies the number of rows of every table (1 = default sizes)')
+    parser.add_argument('--report', default=None,
+                        help='JSON file where the benchmark report of the run is written')
+
+
+def add_connection_arguments(parser, config):
+    """Adds one option per key of a connection config, for example --port or --auth-source"""
+    group = parser.add_argument_group('connection')
+    for key, value in config.items():
+        option = '--' + re.sub(r'(?<!^)([A-Z])', r'-\1', key).lower().replace('_', '-')
+        group.add_argument(option, dest=f'db_{key}', metavar=key.upper(), type=type(value), default=value,
+                           help=f'default: {value}')
+
+
+def connection_config(args, config):
+    """Returns the connection config with the values given on the command line"""
+    return {key: getattr(args, f'db_{key}') for key in config}
+
+
+def statement_bytes(cursor):
+    """Size of the last statement sent by a cursor, used as the payload size of INSERT batches"""
+    statement = getattr(cursor, 'statement', None)
+    return len(statement) if statement else 0
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process and of its largest finished child, in MB"""
+    if resource is None:
+        return None, None
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    unit = 1 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2**20
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit / 2**20
+    return round(own, 1), round(children, 1)
+
+
+class Benchmark:
+    """Rows, bytes and time per table of a seeding run
+
+    seconds is the wall time spent on a table and db_seconds the part of it
+    waiting on the database; the rest is counted as generation time. Stats
+    gathered in worker processes are added with merge(). Scripts that time
+    each batch add it with batch() to get latency percentiles per table.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.tables = {}
+        self.batches = {}
+
+    def stats(self, table):
+        """Counters of a table, created on first use"""
+        return self.tables.setdefault(table, {'rows': 0, 'bytes': 0, 'seconds': 0.0, 'db_seconds': 0.0})
+
+    def record(self, table, rows=0, nbytes=0, seconds=0.0, db_seconds=0.0):
+        """Adds the counters of a table"""
+        stats = self.stats(table)
+        stats['rows'] += rows
+        stats['bytes'] += nbytes
+        stats['seconds'] += seconds
+        stats['db_seconds'] += db_seconds
+
+    def batch(self, table, seconds):
+        """Adds the latency of one batch sent to the database"""
+        self.batches.setdefault(table, []).append(seconds)
+
+    def merge(self, tables):
+        """Adds the per-table counters collected by another Benchmark, for example in a worker"""
+        for table, stats in tables.items():
+            self.record(table, stats['rows'], stats['bytes'], stats['seconds'], stats['db_seconds'])
+
+    @contextmanager
+    def table(self, table):
+        """Times the whole generation and load of a table"""
+        start = time.perf_counter()
+        try:
+            yield self.stats(table)
+        finally:
+            self.stats(table)['seconds'] += time.perf_counter() - start
+
+    @contextmanager
+    def db(self, table):
+        """Times a call to the database made while loading a table"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stats(table)['db_seconds'] += time.perf_counter() - start
+
+    def report(self, **run):
+        """Returns the report as a dict, with run describing the options of the run"""
+        tables = {}
+        for table, stats in self.tables.items():
+            seconds = stats['seconds']
+            tables[table] = {
+                'rows': stats['rows'],
+                'bytes': stats['bytes'],
+                'seconds': round(seconds, 3),
+                'generation_seconds': round(max(seconds - stats['db_seconds'], 0.0), 3),
+                'db_seconds': round(stats['db_seconds'], 3),
+                'rows_per_second': round(stats['rows'] / seconds, 1) if seconds > 0 else None,
+                'mb_per_second': round(stats['bytes'] / 2**20 / seconds, 3) if seconds > 0 else None,
+            }
+            if table in self.batches:
+                tables[table]['batch_latency_ms'] = latency_summary(self.batches[table])
+
+        elapsed = time.perf_counter() - self.started
+        rows = sum(stats['rows'] for stats in self.tables.values())
+        peak, peak_children = peak_memory_mb()
+        return {
+            'run': run,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows': rows,
+            'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else None,
+            'generation_seconds': round(sum(t['generation_seconds'] for t in tables.values()), 3),
+            'db_seconds': round(sum(t['db_seconds'] for t in tables.values()), 3),
+            'peak_memory_mb': peak,
+            'peak_worker_memory_mb': peak_children,
+            'tables': tables,
+        }
+
+    def write(self, path, **run):
+        """Writes the report to a JSON file and returns it"""
+        report = self.report(**run)
+        with open(path, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2, default=str)
+        print(f"Benchmark report written to {path}")
+        return report
+
+
+def latency_summary(latencies):
+    """Percentiles and a histogram with power-of-two millisecond buckets of a list of latencies in seconds"""
+    milliseconds = sorted(latency * 1000 for latency in latencies)
+    histogram = {}
+    for value in milliseconds:
+        bucket = 2 ** max(0, math.ceil(math.log2(value))) if value > 0 else 1
+        histogram[f'<={bucket}'] = histogram.get(f'<={bucket}', 0) + 1
+
+    def percentile(fraction):
+        return round(milliseconds[min(len(milliseconds) - 1, int(fraction * len(milliseconds)))], 2)
+
+    return {
+        'batches': len(milliseconds),
+        'p50': percentile(0.5),
+        'p90': percentile(0.9),
+        'p99': percentile(0.99),
+        'max': round(milliseconds[-1], 2),
+        'histogram': histogram,
+    }
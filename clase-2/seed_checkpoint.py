@@ -0,0 +1,107 @@
+# Checkpoints of the seed stages, so an interrupted run can resume where it stopped
+# Each finished task (a stage or one shard of it) is recorded with its id ranges, random seed and result
+import json
+import os
+import pickle
+
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+class Checkpoint:
+    """Finished tasks of a seeding run, kept in a directory
+
+    checkpoint.json holds the options that decide the generated data, the
+    first id reserved for each table, the id ranges of every task as soon as
+    it is planned and, for every finished task, the seed of its random
+    streams. A resumed run gives each task the ranges recorded for it, so a
+    task never deletes or reuses ids of another one. The result of each task is
+    pickled next to it, so later stages get the same inputs on resume.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.run = {}
+        self.start_ids = {}
+        self.ranges = {}
+        self.tasks = {}
+
+    @property
+    def file(self):
+        """Path of checkpoint.json"""
+        return os.path.join(self.path, CHECKPOINT_FILE)
+
+    def exists(self):
+        """Whether a checkpoint was started in the directory"""
+        return os.path.exists(self.file)
+
+    def start(self, run):
+        """Starts a new checkpoint for a run, forgetting the tasks of any previous one"""
+        os.makedirs(self.path, exist_ok=True)
+        for name in os.listdir(self.path):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(self.path, name))
+        self.run = run
+        self.start_ids = {}
+        self.ranges = {}
+        self.tasks = {}
+        self.save()
+
+    def load(self):
+        """Reads the checkpoint of an interrupted run"""
+        with open(self.file, encoding='utf-8') as checkpoint_file:
+            data = json.load(checkpoint_file)
+        self.run = data['run']
+        self.start_ids = data['start_ids']
+        self.ranges = data.get('ranges', {})
+        self.tasks = data['tasks']
+        return self
+
+    def save(self):
+        """Writes checkpoint.json atomically, so a crash never leaves it half written"""
+        temporary = f'{self.file}.{os.getpid()}'
+        with open(temporary, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump({'run': self.run, 'start_ids': self.start_ids, 'ranges': self.ranges, 'tasks': self.tasks},
+                      checkpoint_file, indent=2, default=str)
+        os.replace(temporary, self.file)
+
+    def reserved(self, name, shard_index, ranges):
+        """Remembers the id ranges of a planned task and the first id of each table; call save() afterwards"""
+        for table, block in ranges.items():
+            self.start_ids.setdefault(table, block.start)
+        self.ranges[task_key(name, shard_index)] = {table: [block.start, block.stop] for table, block in ranges.items()}
+
+    def task_ranges(self, name, shard_index):
+        """Id ranges recorded for a task by the interrupted run, or None when it was not planned"""
+        ranges = self.ranges.get(task_key(name, shard_index))
+        return None if ranges is None else {table: range(*block) for table, block in ranges.items()}
+
+    def result_path(self, name, shard_index):
+        """File where the result of a task is pickled"""
+        return os.path.join(self.path, task_key(name, shard_index) + '.pkl')
+
+    def record(self, name, shard_index, result, info):
+        """Saves the result of a finished task and adds it to checkpoint.json"""
+        path = self.result_path(name, shard_index)
+        with open(f'{path}.{os.getpid()}', 'wb') as result_file:
+            pickle.dump(result, result_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f'{path}.{os.getpid()}', path)
+        self.tasks[task_key(name, shard_index)] = info
+        self.save()
+
+    def done(self, name, shard_index):
+        """Whether a task is recorded as finished"""
+        return task_key(name, shard_index) in self.tasks
+
+
+def task_key(name, shard_index):
+    """Name of a task in the checkpoint: the stage, followed by the shard number for sharded stages"""
+    return name if shard_index is None else f'{name}-{shard_index}'
+
+
+def load_result(path, name, shard_index):
+    """Result of a task saved in the checkpoint directory at path, or None when it did not finish"""
+    result_path = os.path.join(path, task_key(name, shard_index) + '.pkl')
+    if not os.path.exists(result_path):
+        return None
+    with open(result_path, 'rb') as result_file:
+        return pickle.load(result_file)
@@ -0,0 +1,89 @@
+# Vectorized column generation for the seed scripts
+# Numeric, categorical and date columns are drawn as whole NumPy arrays per stage
+from datetime import datetime, timedelta
+
+import numpy as np
+
+rng = np.random.default_rng()
+
+# Moment every date range is measured from; fixed per run so all processes share it
+reference_time = None
+
+
+def seed(value):
+    """Reseeds the generator shared by every column helper"""
+    global rng
+    rng = np.random.default_rng(value)
+
+
+def uniform(n, low, high, decimals=2):
+    """Uniform values rounded like a DECIMAL column; decimals=None keeps full precision"""
+    values = rng.uniform(low, high, n)
+    return values if decimals is None else np.round(values, decimals)
+
+
+def integers(n, low, high):
+    """Integers between low and high, both inclusive; high may be an array"""
+    return rng.integers(low, np.asarray(high) + 1, n)
+
+
+def chance(n, probability):
+    """Boolean mask where each position is True with the given probability"""
+    return rng.random(n) < probability
+
+
+def categorical(n, values, weights=None):
+    """Values drawn with the given relative weights, like random.choices"""
+    p = None
+    if weights is not None:
+        p = np.asarray(weights, dtype=float)
+        p /= p.sum()
+    return rng.choice(np.asarray(values), size=n, p=p)
+
+
+def dates_between(n, start, end):
+    """Random dates between start and end, both inclusive"""
+    days = (end - start).days
+    return np.datetime64(start, 'D') + rng.integers(0, days + 1, n)
+
+
+def datetimes_between(n, start, end):
+    """Random datetimes with second precision between start and end"""
+    seconds = int((end - start).total_seconds())
+    return np.datetime64(start, 's') + rng.integers(0, seconds + 1, n)
+
+
+def set_now(moment):
+    """Fixes the moment returned by now() and today()"""
+    global reference_time
+    reference_time = moment
+
+
+def now():
+    """Reference moment of the run, or the current time when none was set"""
+    return reference_time or datetime.now().replace(microsecond=0)
+
+
+def today():
+    """Date of the reference moment"""
+    return now().date()
+
+
+def days_ago(days):
+    """Date a number of days before today, used for the column ranges"""
+    return today() - timedelta(days=days)
+
+
+def moments_ago(days):
+    """Datetime a number of days before now"""
+    return now() - timedelta(days=days)
+
+
+def nullable(values, mask):
+    """Python list with None wherever mask is False"""
+    return [value if keep else None for value, keep in zip(values.tolist(), mask.tolist())]
+
+
+def rows(*columns):
+    """Zips NumPy columns into row tuples of plain Python values for the driver"""
+    return zip(*(column.tolist() if isinstance(column, np.ndarray) else column for column in columns))
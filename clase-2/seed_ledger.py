@@ -0,0 +1,89 @@
+# Stock ledger of the sales seed: balances derived from the generated inventory movements
+# Movements are summed per product, warehouse and month, so balances and snapshots come from one vectorized pass
+import numpy as np
+
+LEDGER_COLUMNS = ('product_id', 'warehouse_id', 'month', 'units_in', 'units_out')
+
+
+def month_index(moments):
+    """Months since 1970-01 of NumPy dates or datetimes"""
+    return np.asarray(moments).astype('datetime64[M]').astype(np.int64)
+
+
+def month_end(months):
+    """Last day of each month index, as NumPy dates"""
+    return (np.asarray(months) + 1).astype('datetime64[M]').astype('datetime64[D]') - 1
+
+
+def aggregate(product_ids, warehouse_ids, months, units_in, units_out):
+    """Adds up the units per product, warehouse and month, sorted by those keys"""
+    product_ids, warehouse_ids, months = (np.asarray(column, dtype=np.int64)
+                                          for column in (product_ids, warehouse_ids, months))
+    if not len(product_ids):
+        return {name: np.empty(0, dtype=np.int64) for name in LEDGER_COLUMNS}
+    order = np.lexsort((months, warehouse_ids, product_ids))
+    product_ids, warehouse_ids, months = product_ids[order], warehouse_ids[order], months[order]
+    changed = np.ones(len(order), dtype=bool)
+    changed[1:] = ((product_ids[1:] != product_ids[:-1]) | (warehouse_ids[1:] != warehouse_ids[:-1])
+                   | (months[1:] != months[:-1]))
+    starts = np.flatnonzero(changed)
+    return {
+        'product_id': product_ids[starts],
+        'warehouse_id': warehouse_ids[starts],
+        'month': months[starts],
+        'units_in': np.add.reduceat(np.asarray(units_in, dtype=np.int64)[order], starts),
+        'units_out': np.add.reduceat(np.asarray(units_out, dtype=np.int64)[order], starts),
+    }
+
+
+def ledger(product_ids, warehouse_ids, moments, quantities, inbound):
+    """Monthly ledger of a set of movements; inbound marks the ones that add stock"""
+    quantities = np.asarray(quantities, dtype=np.int64)
+    inbound = np.asarray(inbound, dtype=bool)
+    return aggregate(product_ids, warehouse_ids, month_index(moments),
+                     np.where(inbound, quantities, 0), np.where(inbound, 0, quantities))
+
+
+def merge_ledgers(parts):
+    """Joins the monthly ledgers of several shards or stages into one"""
+    return aggregate(*(np.concatenate([part[name] for part in parts]) for name in LEDGER_COLUMNS))
+
+
+def balances(merged):
+    """Opening stock, final balance and month-end balances of every product and warehouse pair
+
+    Without knowing the order of the movements inside a month, the stock of
+    a pair can be as low as its balance before the month minus everything
+    taken out during it, so the opening stock is the smallest amount that
+    keeps that lower bound from going negative in every month. Returns the
+    pairs with their opening and final balance, and the balance at the end
+    of each month with movements (the opening stock included).
+    """
+    product_ids, warehouse_ids = merged['product_id'], merged['warehouse_id']
+    net = merged['units_in'] - merged['units_out']
+    if not len(net):
+        empty = np.empty(0, dtype=np.int64)
+        return ({'product_id': empty, 'warehouse_id': empty, 'opening': empty, 'balance': empty},
+                {'product_id': empty, 'warehouse_id': empty, 'month': empty, 'balance': empty})
+
+    first = np.ones(len(net), dtype=bool)
+    first[1:] = (product_ids[1:] != product_ids[:-1]) | (warehouse_ids[1:] != warehouse_ids[:-1])
+    starts = np.flatnonzero(first)
+    pair = np.cumsum(first) - 1
+
+    # Running net of each pair up to the end of every month
+    total = np.cumsum(net)
+    running = total - (total - net)[starts][pair]
+    before = running - net
+    opening = np.maximum(np.maximum.reduceat(merged['units_out'] - before, starts), 0)
+    month_balance = opening[pair] + running
+
+    ends = np.append(starts[1:], len(net)) - 1
+    pairs = {
+        'product_id': product_ids[starts],
+        'warehouse_id': warehouse_ids[starts],
+        'opening': opening,
+        'balance': month_balance[ends],
+    }
+    return pairs, {'product_id': product_ids, 'warehouse_id': warehouse_ids, 'month': merged['month'],
+                   'balance': month_balance}
@@ -0,0 +1,382 @@
+# Helpers for bulk loading the MySQL seed databases
+# Used by faker_ventas.py to avoid one round trip per inserted row
+import json
+import os
+import re
+import tempfile
+import time
+
+import mysql.connector
+
+from seed_bench import statement_bytes
+
+BATCH_SIZE = 1000
+
+# Error numbers returned when LOCAL INFILE is disabled on the client or the server
+LOCAL_INFILE_ERRORS = {1148, 2068, 3948}
+
+# Set after the first rejection so the remaining tables go straight to INSERT
+local_infile_rejected = False
+
+
+class IdAllocator:
+    """Reserves contiguous id blocks per table so rows can carry explicit ids
+
+    The first id of each table comes from its AUTO_INCREMENT counter
+    ('auto_increment') or from SELECT MAX(id) ('max'). Only one allocator
+    should hand out ids for a table while the seeder runs; worker processes
+    get blocks reserved by that allocator through ranges and cannot go past them.
+    """
+
+    def __init__(self, conn, source='auto_increment', ranges=None):
+        self.conn = conn
+        self.source = source
+        self.next_ids = {}
+        self.limits = {}
+
+        for table, block in (ranges or {}).items():
+            self.next_ids[table] = block.start
+            self.limits[table] = block.stop
+
+    def start_id(self, table):
+        """Reads the first free id of a table from the server"""
+        cursor = self.conn.cursor()
+        if self.source == 'max':
+            cursor.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {table}')
+        else:
+            # information_schema caches AUTO_INCREMENT unless the expiry is disabled
+            cursor.execute('SET SESSION information_schema_stats_expiry = 0')
+            cursor.execute(
+                """SELECT AUTO_INCREMENT FROM information_schema.TABLES
+                   WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s""",
+                (table,)
+            )
+        row = cursor.fetchone()
+        cursor.close()
+        return row[0] if row and row[0] else 1
+
+    def reserve(self, table, count):
+        """Returns a range with the next count ids of the table"""
+        if table not in self.next_ids:
+            self.next_ids[table] = self.start_id(table)
+        first = self.next_ids[table]
+        if table in self.limits and first + count > self.limits[table]:
+            raise ValueError(f"The id block reserved for {table} ends at {self.limits[table] - 1}")
+        self.next_ids[table] = first + count
+        return range(first, first + count)
+
+    def claim(self, table, block):
+        """Marks a block reserved earlier, for example by an interrupted run, so later blocks start after it"""
+        if table not in self.next_ids:
+            self.next_ids[table] = self.start_id(table)
+        self.next_ids[table] = max(self.next_ids[table], block.stop)
+
+    def next_id(self, table):
+        """Reserves a single id, for stages whose row count is not known in advance"""
+        return self.reserve(table, 1)[0]
+
+
+class BulkInserter:
+    """Buffers rows and writes them with multi-row INSERT statements
+
+    With a Benchmark, the rows, bytes sent and time of the table are
+    recorded in it when the inserter is closed.
+    """
+
+    def __init__(self, conn, table, columns, batch_size=BATCH_SIZE, benchmark=None):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.table = table
+        self.columns = columns
+        self.batch_size = batch_size
+        self.rows = []
+        self.total_rows = 0
+        self.total_bytes = 0
+        self.db_time = 0.0
+        self.benchmark = benchmark
+        self.started = time.perf_counter()
+        self.finished = None
+
+        self.row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        self.statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+
+    def add(self, row):
+        """Queues a row, writing the batch once it is full"""
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the queued rows in a single INSERT"""
+        if not self.rows:
+            return
+
+        start = time.perf_counter()
+        sql = self.statement + ', '.join([self.row_placeholder] * len(self.rows))
+        self.cursor.execute(sql, [value for row in self.rows for value in row])
+        self.db_time += time.perf_counter() - start
+        self.total_bytes += statement_bytes(self.cursor)
+
+        self.total_rows += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        """Writes pending rows and returns the number of rows inserted"""
+        self.flush()
+        self.cursor.close()
+        self.finished = time.perf_counter()
+        if self.benchmark is not None:
+            self.benchmark.record(self.table, self.total_rows, self.total_bytes,
+                                  self.finished - self.started, self.db_time)
+        return self.total_rows
+
+    def rows_per_second(self):
+        """Throughput of the table, from creation of the inserter until close()"""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return self.total_rows / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        """Short throughput summary printed after each table"""
+        return f"{self.rows_per_second():,.0f} rows/s, {self.db_time:.2f}s in MySQL"
+
+
+class InfileLoader(BulkInserter):
+    """Writes rows to a TSV file and loads it with LOAD DATA LOCAL INFILE
+
+    Rows carry the ids reserved with IdAllocator, so they can be referenced
+    by later stages before the file is loaded.
+    """
+
+    def __init__(self, conn, table, columns, batch_size=BATCH_SIZE, benchmark=None):
+        super().__init__(conn, table, columns, batch_size, benchmark)
+        self.file = None
+        self.pending = 0
+
+    def add(self, row):
+        """Appends a row to the data file"""
+        if self.file is None:
+            self.file = tempfile.NamedTemporaryFile(
+                'w', suffix='.tsv', prefix=f'{self.table}_', delete=False, encoding='utf-8', newline=''
+            )
+        self.file.write('\t'.join(tsv_value(value) for value in row) + '\n')
+        self.pending += 1
+
+    def flush(self):
+        """Loads the rows written so far and starts a new data file"""
+        global local_infile_rejected
+
+        if self.file is None:
+            return
+
+        self.file.close()
+        path = self.file.name
+        self.file = None
+
+        try:
+            if local_infile_rejected:
+                self.insert_file(path)
+            else:
+                start = time.perf_counter()
+                try:
+                    self.cursor.execute(
+                        f'''LOAD DATA LOCAL INFILE %s INTO TABLE {self.table}
+                            CHARACTER SET utf8mb4
+                            FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+                            LINES TERMINATED BY '\\n'
+                            ({', '.join(self.columns)})''',
+                        (path,)
+                    )
+                    self.db_time += time.perf_counter() - start
+                    self.total_bytes += os.path.getsize(path)
+                    if self.cursor.rowcount != self.pending:
+                        print(f"Warning: {self.table} loaded {self.cursor.rowcount} of {self.pending} rows")
+                    self.total_rows += self.pending
+                except mysql.connector.Error as err:
+                    if err.errno not in LOCAL_INFILE_ERRORS:
+                        raise
+                    print(f"LOCAL INFILE rejected ({err.msg}), falling back to batched INSERT")
+                    local_infile_rejected = True
+                    self.insert_file(path)
+        finally:
+            os.remove(path)
+            self.pending = 0
+
+    def insert_file(self, path):
+        """Inserts the rows of a data file with multi-row INSERT statements"""
+        with open(path, encoding='utf-8', newline='') as data_file:
+            for line in data_file:
+                self.rows.append([tsv_parse(field) for field in line.rstrip('\n').split('\t')])
+                if len(self.rows) >= self.batch_size:
+                    BulkInserter.flush(self)
+        BulkInserter.flush(self)
+
+
+def tsv_value(value):
+    """Formats a value for LOAD DATA using the default escape rules"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    text = str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def tsv_parse(field):
+    """Reverses tsv_value, used when the file has to be inserted instead"""
+    if field == '\\N':
+        return None
+    return re.sub(r'\\(.)', lambda m: {'t': '\t', 'n': '\n', 'r': '\r'}.get(m.group(1), m.group(1)), field)
+
+
+def open_loader(conn, table, columns, mode='insert', batch_size=BATCH_SIZE, benchmark=None):
+    """Returns the loader for a table: 'insert' for multi-row INSERT, 'infile' for LOAD DATA"""
+    if mode == 'infile' and not local_infile_rejected:
+        return InfileLoader(conn, table, columns, batch_size, benchmark)
+    return BulkInserter(conn, table, columns, batch_size, benchmark)
+
+
+def bulk_update(conn, table, column, values_by_id, batch_size=BATCH_SIZE):
+    """Sets column for many rows using UPDATE ... CASE id statements in batches"""
+    cursor = conn.cursor()
+    items = list(values_by_id.items())
+
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        cases = ' '.join(['WHEN %s THEN %s'] * len(batch))
+        ids = ', '.join(['%s'] * len(batch))
+        params = [value for pair in batch for value in pair] + [row_id for row_id, _ in batch]
+        cursor.execute(
+            f'UPDATE {table} SET {column} = CASE id {cases} END WHERE id IN ({ids})',
+            params
+        )
+
+    cursor.close()
+    return len(items)
+
+
+def read_keys(conn):
+    """Secondary indexes and foreign keys of the current database, as definitions that can be added back"""
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME, SUB_PART
+           FROM information_schema.STATISTICS
+           WHERE TABLE_SCHEMA = DATABASE() AND INDEX_NAME <> 'PRIMARY'
+           ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX"""
+    )
+    indexes = {}
+    for table, index, non_unique, column, sub_part in cursor.fetchall():
+        definition = indexes.setdefault(table, {}).setdefault(index, {'unique': not int(non_unique), 'columns': []})
+        definition['columns'].append(f'`{column}`' if sub_part is None else f'`{column}`({sub_part})')
+
+    cursor.execute(
+        """SELECT k.TABLE_NAME, k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME,
+                  k.REFERENCED_COLUMN_NAME, r.DELETE_RULE, r.UPDATE_RULE
+           FROM information_schema.KEY_COLUMN_USAGE k
+           JOIN information_schema.REFERENTIAL_CONSTRAINTS r
+             ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.TABLE_NAME = k.TABLE_NAME
+            AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+           WHERE k.TABLE_SCHEMA = DATABASE() AND k.REFERENCED_TABLE_NAME IS NOT NULL
+           ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION"""
+    )
+    foreign_keys = {}
+    for table, name, column, referenced_table, referenced_column, on_delete, on_update in cursor.fetchall():
+        definition = foreign_keys.setdefault(table, {}).setdefault(name, {
+            'columns': [], 'referenced_table': referenced_table, 'referenced_columns': [],
+            'on_delete': on_delete, 'on_update': on_update
+        })
+        definition['columns'].append(column)
+        definition['referenced_columns'].append(referenced_column)
+
+    cursor.close()
+    return {'indexes': indexes, 'foreign_keys': foreign_keys}
+
+
+def drop_keys(conn, keys):
+    """Drops the given foreign keys and then the secondary indexes, leaving the tables with their primary key"""
+    cursor = conn.cursor()
+    for table, constraints in keys['foreign_keys'].items():
+        cursor.execute(f"ALTER TABLE {table} " + ', '.join(f'DROP FOREIGN KEY `{name}`' for name in constraints))
+    for table, indexes in keys['indexes'].items():
+        cursor.execute(f"ALTER TABLE {table} " + ', '.join(f'DROP INDEX `{name}`' for name in indexes))
+    cursor.close()
+
+
+def add_keys(conn, keys):
+    """Adds the indexes and foreign keys of each table back in a single ALTER TABLE and returns the seconds per table
+
+    With foreign_key_checks off the foreign keys are added without checking
+    the existing rows, so check_foreign_keys() should run afterwards.
+    """
+    cursor = conn.cursor()
+    timings = {}
+    for table in sorted(set(keys['indexes']) | set(keys['foreign_keys'])):
+        clauses = [
+            f"ADD {'UNIQUE ' if index['unique'] else ''}INDEX `{name}` ({', '.join(index['columns'])})"
+            for name, index in keys['indexes'].get(table, {}).items()
+        ]
+        clauses += [
+            f"ADD CONSTRAINT `{name}` FOREIGN KEY ({', '.join(f'`{c}`' for c in fk['columns'])}) "
+            f"REFERENCES {fk['referenced_table']} ({', '.join(f'`{c}`' for c in fk['referenced_columns'])}) "
+            f"ON DELETE {fk['on_delete']} ON UPDATE {fk['on_update']}"
+            for name, fk in keys['foreign_keys'].get(table, {}).items()
+        ]
+        start = time.perf_counter()
+        cursor.execute(f"ALTER TABLE {table} " + ', '.join(clauses))
+        timings[table] = time.perf_counter() - start
+    cursor.close()
+    return timings
+
+
+def check_foreign_keys(conn, keys):
+    """Counts the rows whose foreign key points to a missing row, per table.constraint"""
+    cursor = conn.cursor()
+    orphans = {}
+    for table, constraints in keys['foreign_keys'].items():
+        for name, fk in constraints.items():
+            joined = ' AND '.join(f'p.`{parent}` = c.`{child}`'
+                                  for child, parent in zip(fk['columns'], fk['referenced_columns']))
+            cursor.execute(
+                f"""SELECT COUNT(*) FROM {table} c LEFT JOIN {fk['referenced_table']} p ON {joined}
+                    WHERE c.`{fk['columns'][0]}` IS NOT NULL AND p.`{fk['referenced_columns'][0]}` IS NULL"""
+            )
+            orphans[f'{table}.{name}'] = cursor.fetchone()[0]
+    cursor.close()
+    return orphans
+
+
+def defer_keys(conn, path):
+    """Saves the secondary indexes and foreign keys to path and drops them before a bulk load
+
+    When path already exists, an earlier load was interrupted before the keys
+    were added back, so its definitions are kept and only what is left is dropped.
+    """
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as keys_file:
+            keys = json.load(keys_file)
+    else:
+        keys = read_keys(conn)
+        with open(f'{path}.{os.getpid()}', 'w', encoding='utf-8') as keys_file:
+            json.dump(keys, keys_file, indent=2)
+        os.replace(f'{path}.{os.getpid()}', path)
+    drop_keys(conn, read_keys(conn))
+    return keys
+
+
+def restore_keys(conn, keys, path):
+    """Adds back the keys saved by defer_keys(), checks referential integrity and forgets the saved file
+
+    Raises ValueError when some foreign key points to missing rows.
+    """
+    timings = add_keys(conn, keys)
+    os.remove(path)
+    orphans = {name: count for name, count in check_foreign_keys(conn, keys).items() if count}
+    if orphans:
+        raise ValueError(f"Rows with missing references: {orphans}")
+    return timings
+
+
+def session_checks(conn, enabled):
+    """Turns foreign_key_checks and unique_checks on or off for a connection"""
+    cursor = conn.cursor()
+    cursor.execute(f"SET SESSION foreign_key_checks = {int(enabled)}, unique_checks = {int(enabled)}")
+    cursor.close()
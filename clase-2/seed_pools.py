@@ -0,0 +1,268 @@
+# Sampling pools shared by the seed scripts
+# Filtered subsets are built once per entity instead of on every generated row
+import json
+import math
+import os
+import random
+
+import numpy as np
+
+# Values generated per Faker provider before sampling starts
+VALUE_POOL_SIZE = 10000
+
+# Faker text() is pooled once at this length and cut to the max_nb_chars of each column
+TEXT_POOL_CHARS = 500
+
+
+class EntityColumns:
+    """Key columns of an entity held in NumPy arrays and partitioned once for fast random sampling
+
+    Child tables only read the id and one or two attributes of the parent
+    they pick, so stages keep those columns instead of one dict per row.
+    The group_by column is stored as small integer codes over its distinct
+    values and gets one partition per value; partitions adds named ones from
+    vectorized predicates over the columns. Sampling returns row positions,
+    which index every column.
+    """
+
+    def __init__(self, columns, group_by=None, partitions=None):
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        self.size = len(next(iter(self.columns.values()))) if self.columns else 0
+        self.labels = {}
+        self.partitions = {}
+
+        if group_by:
+            labels, codes = np.unique(self.columns[group_by], return_inverse=True)
+            self.labels[group_by] = labels
+            self.columns[group_by] = codes.astype(np.int8 if len(labels) <= 127 else np.int32)
+            for code, label in enumerate(labels.tolist()):
+                self.partitions[label] = np.flatnonzero(self.columns[group_by] == code)
+
+        for name, predicate in (partitions or {}).items():
+            self.partitions[name] = np.flatnonzero(predicate(self))
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        """Returns a column, decoding the group_by codes back to their values"""
+        column = self.columns[name]
+        return self.labels[name][column] if name in self.labels else column
+
+    def positions(self, partition=None):
+        """Returns the row positions of a partition, or of every row when partition is None"""
+        if partition is None:
+            return np.arange(self.size)
+        return self.partitions.get(partition, np.empty(0, dtype=np.int64))
+
+    def row(self, position):
+        """Returns one row as a dict of plain Python values"""
+        return {name: self[name][position].item() for name in self.columns}
+
+    def choice(self, partition=None):
+        """Picks the position of a random row of the partition"""
+        if partition is None:
+            return random.randrange(self.size)
+        positions = self.partitions.get(partition, ())
+        return int(positions[random.randrange(len(positions))])
+
+    def sample(self, k, partition=None):
+        """Picks the positions of up to k distinct rows of the partition"""
+        positions = self.positions(partition)
+        return positions[random.sample(range(len(positions)), min(k, len(positions)))]
+
+    def draw(self, rng, n, partition=None):
+        """Positions of n rows of the partition drawn with replacement from a NumPy generator"""
+        positions = self.positions(partition)
+        return positions[rng.integers(0, len(positions), n)]
+
+
+class FakerValues:
+    """Faker provider values generated once and sampled per row
+
+    The first request for a provider (with its arguments) calls Faker size
+    times, or as many times as rows[provider] when the run draws fewer rows
+    from it, and keeps the distinct results; later draws only index into
+    them. Every max_nb_chars of text() shares one pool of TEXT_POOL_CHARS
+    texts, cut per column.
+    With cache_dir the values are stored as JSON and reused by later runs,
+    so only text-returning providers should go through the pool. seed makes
+    both the generated values and the draws reproducible; each pool is
+    generated from its own seed, so the values do not depend on the order
+    in which providers are first requested.
+    """
+
+    def __init__(self, fake, size=VALUE_POOL_SIZE, cache_dir=None, seed=None, rows=None):
+        self.fake = fake
+        self.size = size
+        self.rows = rows or {}
+        self.cache_dir = cache_dir
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.pools = {}
+
+    def reseed(self, seed):
+        """Restarts the draws from a new seed, keeping the generated pools"""
+        self.rng = np.random.default_rng(seed)
+
+    def pool(self, provider, **kwargs):
+        """Returns the array of values of a provider, generating it on first use"""
+        key = (provider, tuple(sorted(kwargs.items())))
+        if key not in self.pools:
+            max_chars = kwargs.get('max_nb_chars', 200)
+            if provider == 'text' and set(kwargs) <= {'max_nb_chars'} and max_chars < TEXT_POOL_CHARS:
+                texts = self.pool('text', max_nb_chars=TEXT_POOL_CHARS)
+                self.pools[key] = np.array([shorten(text, max_chars) for text in texts], dtype=object)
+            else:
+                self.pools[key] = np.array(self.load(provider, kwargs), dtype=object)
+        return self.pools[key]
+
+    def pool_size(self, provider):
+        """Faker calls for a provider: the pool size, or fewer when the run draws fewer rows from it"""
+        return max(1, min(self.size, self.rows.get(provider, self.size)))
+
+    def load(self, provider, kwargs):
+        """Reads the values from the cache directory or generates them with Faker"""
+        path = self.cache_path(provider, kwargs)
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as cache_file:
+                return json.load(cache_file)
+
+        if self.seed is not None:
+            self.fake.seed_instance(f'{self.seed}:{provider}:{sorted(kwargs.items())}')
+        generate = getattr(self.fake, provider)
+        values = list(dict.fromkeys(generate(**kwargs) for _ in range(self.pool_size(provider))))
+
+        if path:
+            # Written under a temporary name so processes sharing the directory never read a partial file
+            os.makedirs(self.cache_dir, exist_ok=True)
+            partial_path = f'{path}.{os.getpid()}'
+            with open(partial_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(values, cache_file, ensure_ascii=False)
+            os.replace(partial_path, path)
+        return values
+
+    def cache_path(self, provider, kwargs):
+        """File holding the values of a provider for this locale, seed and pool size
+
+        Values generated with a seed are only reused by runs with the same
+        seed; unseeded values go to files without one, shared by unseeded runs.
+        """
+        if not self.cache_dir:
+            return None
+        arguments = ''.join(f'_{name}-{value}' for name, value in sorted(kwargs.items()))
+        locale = '-'.join(self.fake.locales)
+        seed = '' if self.seed is None else f'_seed-{self.seed}'
+        return os.path.join(self.cache_dir, f'{locale}_{provider}{arguments}{seed}_{self.pool_size(provider)}.json')
+
+    def sample(self, provider, n, **kwargs):
+        """Draws n values of a provider at once"""
+        values = self.pool(provider, **kwargs)
+        return values[self.rng.integers(0, len(values), n)].tolist()
+
+    def choice(self, provider, **kwargs):
+        """Draws a single value, for fields that are only filled on some rows"""
+        values = self.pool(provider, **kwargs)
+        return values[self.rng.integers(len(values))]
+
+
+def shorten(text, max_chars):
+    """Cuts a text to max_chars at the end of its last whole sentence, or of a word when none fits"""
+    if len(text) <= max_chars:
+        return text
+    end = text.rfind('. ', 0, max_chars)
+    if end > 0:
+        return text[:end + 1]
+    return text[:max_chars - 1].rsplit(' ', 1)[0] + '.'
+
+
+class UniqueEmails:
+    """Unique emails from a pooled user name and a counter suffix
+
+    Trailing digits are stripped from the user name, so name + counter can
+    only be produced by one counter value and no set of used emails is
+    needed. Memory stays constant however many emails are generated; start
+    lets a run continue after the emails already stored in the table.
+    """
+
+    def __init__(self, values, start=0, max_length=None):
+        self.values = values
+        self.start = start
+        self.counter = start
+        self.max_length = max_length
+
+    def __len__(self):
+        return self.counter - self.start
+
+    def next(self):
+        """Returns the next email, shortening the user name to fit max_length"""
+        suffix = str(self.counter)
+        self.counter += 1
+        domain = self.values.choice('domain_name')
+        name = self.values.choice('user_name').rstrip('0123456789') or 'user'
+        if self.max_length:
+            name = name[:max(1, self.max_length - len(suffix) - len(domain) - 1)]
+        return f"{name}{suffix}@{domain}"
+
+    def take(self, n):
+        """Returns the next n emails"""
+        return [self.next() for _ in range(n)]
+
+
+class UniqueCodes:
+    """Unique codes made of a prefix and a scrambled counter
+
+    Counter n is mapped through an affine permutation of the numbers with
+    length digits, so codes look random but never repeat. Past the end of
+    that range codes continue with length + 1 digits.
+    """
+
+    def __init__(self, prefix, length=8, start=0):
+        self.prefix = prefix
+        self.low = 10 ** (length - 1)
+        self.space = 9 * self.low
+        self.counter = start
+
+        # Any multiplier coprime with the range size gives a permutation
+        self.multiplier = int(self.space * 0.6180339887) + 1
+        while math.gcd(self.multiplier, self.space) != 1:
+            self.multiplier += 1
+
+    def next(self):
+        """Returns the next code"""
+        n = self.counter
+        self.counter += 1
+        if n < self.space:
+            return f"{self.prefix}{self.low + (n * self.multiplier) % self.space}"
+        return f"{self.prefix}{10 * self.low + n - self.space}"
+
+    def take(self, n):
+        """Returns the next n codes"""
+        return [self.next() for _ in range(n)]
+
+
+def distinct_pairs(rng, rows, columns, count, chunk=2**20):
+    """Row and column positions of count distinct pairs, drawn without keeping a set of used pairs
+
+    The number of pairs of each row comes from a multivariate hypergeometric
+    draw, which is how a uniform sample of distinct pairs spreads over the
+    rows, and each row then takes that many columns of its own random
+    permutation. count is capped at rows * columns, so the target is always
+    reached in one pass; pairs come out ordered by row. Rows with pairs are
+    permuted chunk cells at a time to bound memory.
+    """
+    count = min(count, rows * columns)
+    if count <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    per_row = rng.multivariate_hypergeometric(np.full(rows, columns, dtype=np.int64), count)
+
+    row_positions, column_positions = [], []
+    active = np.flatnonzero(per_row)
+    step = max(1, chunk // columns)
+    for start in range(0, len(active), step):
+        block = active[start:start + step]
+        permutations = rng.random((len(block), columns)).argsort(axis=1)
+        chosen, slots = np.nonzero(np.arange(columns) < per_row[block][:, None])
+        row_positions.append(block[chosen])
+        column_positions.append(permutations[chosen, slots])
+    return np.concatenate(row_positions), np.concatenate(column_positions)
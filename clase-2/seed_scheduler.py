@@ -0,0 +1,146 @@
+# Dependency-graph scheduler for the seed stages
+# A stage starts as soon as the stages it depends on are finished, in a process pool when workers > 1
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# function(ctx, *dependency results) -> result, dependencies: stage names,
+# ids: {table: function(results, shard) -> number of ids to reserve for the stage or shard},
+# rows: function(results) -> rows to split in shards (None runs the stage as one task)
+Stage = namedtuple('Stage', ['function', 'dependencies', 'ids', 'rows'], defaults=(None,))
+
+
+def ready_stages(stages, results, running):
+    """Names of the stages whose dependencies are finished and that were not started yet
+
+    A stage that reserves ids in a table also waits until every stage listed
+    before it reserving that table was planned, so each table hands out its
+    blocks in the order of stages whatever order the stages finish in and the
+    same seed gives the same ids with any number of workers.
+    """
+    ready = []
+    planned = set(results) | set(running)
+    for position, (name, stage) in enumerate(stages.items()):
+        if name in planned or not all(dependency in results for dependency in stage.dependencies):
+            continue
+        earlier = list(stages.items())[:position]
+        if all(other in planned for other, other_stage in earlier if set(other_stage.ids) & set(stage.ids)):
+            ready.append(name)
+    return ready
+
+
+def shard_ranges(rows, shard_size):
+    """Splits rows positions in consecutive ranges of shard_size"""
+    return [range(start, min(start + shard_size, rows)) for start in range(0, rows, shard_size)] or [range(0)]
+
+
+def merge_shards(parts):
+    """Joins the results of the shards of a stage
+
+    Counts are added, consecutive id ranges joined, lists concatenated and
+    dicts merged key by key. Ranges are joined from the lowest start to the
+    highest stop, so shards can be merged in the order they finish.
+    """
+    if all(isinstance(part, dict) for part in parts):
+        return {key: merge_shards([part[key] for part in parts]) for key in parts[0]}
+    if all(isinstance(part, int) for part in parts):
+        return sum(parts)
+    if all(isinstance(part, range) for part in parts):
+        filled = [part for part in parts if part]
+        return range(min(part.start for part in filled), max(part.stop for part in filled)) if filled else range(0)
+    return [item for part in parts for item in part]
+
+
+def shard_progress(name, done, total, merged):
+    """Progress line printed by the parent as shards finish, from the merged result of the finished ones"""
+    if isinstance(merged, dict):
+        rows = ', '.join(f"{count} {table}" for table, count in merged.items() if isinstance(count, int))
+    else:
+        rows = f"{merged if isinstance(merged, int) else len(merged)} rows"
+    return f"{name}: {done}/{total} shards loaded, {rows}"
+
+
+def finish_running(running, unpack):
+    """After a failed task, cancels the queued tasks and collects the ones already running
+
+    Their rows are loaded anyway, so passing them to collect lets a
+    checkpoint record them instead of loading them again on resume.
+    """
+    for future in list(running):
+        future.cancel()
+    for future, name in running.items():
+        if not future.cancelled() and future.exception() is None:
+            unpack(name, future.result())
+
+
+def run_stages(stages, plan, execute, workers=1, initializer=None, initargs=(), collect=None, merge=merge_shards):
+    """Runs every stage once its dependencies are done and returns their results by name
+
+    plan(name, results) runs in the parent and returns the argument tuples of
+    the tasks of a stage, one per shard, each passed to execute(name, *arguments)
+    in a worker process. Workers are started with spawn so they never share
+    the parent's database connection. With collect, execute returns a
+    (result, extra) pair and collect(name, result, extra) is called in the
+    parent as each task finishes, for example to gather its statistics or
+    checkpoint it. Each finished shard is folded at once with merge(parts) into
+    the running result of its stage, so the parent never holds the results of
+    every shard.
+    """
+    results = {}
+
+    def unpack(name, returned):
+        if collect is None:
+            return returned
+        result, extra = returned
+        collect(name, result, extra)
+        return result
+
+    if workers <= 1:
+        if initializer:
+            initializer(*initargs)
+        while len(results) < len(stages):
+            ready = ready_stages(stages, results, ())
+            if not ready:
+                raise ValueError(f"Stages with unmet dependencies: {sorted(set(stages) - set(results))}")
+            name = ready[0]
+            tasks = plan(name, results)
+            merged = None
+            for done, task in enumerate(tasks, 1):
+                part = unpack(name, execute(name, *task))
+                merged = part if done == 1 else merge([merged, part])
+                if len(tasks) > 1:
+                    print(shard_progress(name, done, len(tasks), merged))
+            results[name] = merged
+        return results
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=initializer, initargs=initargs) as pool:
+        running = {}
+        merged = {}
+        completed = {}
+        while len(results) < len(stages):
+            for name in ready_stages(stages, results, completed):
+                tasks = plan(name, results)
+                completed[name] = [0, len(tasks)]
+                for task in tasks:
+                    running[pool.submit(execute, name, *task)] = name
+            if not running:
+                raise ValueError(f"Stages with unmet dependencies: {sorted(set(stages) - set(results))}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                if future.exception() is not None:
+                    finish_running(running, unpack)
+                    raise future.exception()
+                part = unpack(name, future.result())
+                merged[name] = merge([merged[name], part]) if name in merged else part
+                completed[name][0] += 1
+                finished, total = completed[name]
+                if total > 1:
+                    print(shard_progress(name, finished, total, merged[name]))
+                if finished == total:
+                    results[name] = merged.pop(name)
+                    del completed[name]
+
+    return results
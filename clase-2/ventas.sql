@@ -205,6 +205,9 @@ CREATE TABLE sales (
     status ENUM('pending', 'completed', 'cancelled', 'returned') DEFAULT 'completed',
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Own index for the foreign key, so the indexes of ventas_indexes.sql that start with
+    -- customer_id never become the index of the constraint and can be dropped
+    KEY idx_sales_customer (customer_id),
     FOREIGN KEY (customer_id) REFERENCES customers(id),
     FOREIGN KEY (salesperson_employee_id) REFERENCES employees(id)
 );
@@ -219,6 +222,7 @@ CREATE TABLE sale_details (
     unit_discount DECIMAL(10,2) DEFAULT 0.00,
     subtotal DECIMAL(12,2) NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_sale_details_product_id (product_id),
     FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE,
     FOREIGN KEY (product_id) REFERENCES products(id)
 );
@@ -235,6 +239,7 @@ CREATE TABLE inventory_movements (
     employee_id INT NOT NULL,
     notes TEXT,
     movement_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_movements_product (product_id),
     FOREIGN KEY (product_id) REFERENCES products(id),
     FOREIGN KEY (warehouse_id) REFERENCES warehouses(id),
     FOREIGN KEY (employee_id) REFERENCES employees(id)
@@ -301,3 +306,16 @@ CREATE TABLE return_details (
     FOREIGN KEY (return_id) REFERENCES returns(id) ON DELETE CASCADE,
     FOREIGN KEY (product_id) REFERENCES products(id)
 );
+
+-- Table 21: Stock snapshots
+-- Balance of a product in a warehouse at the end of a month; the balance at any moment is the
+-- latest snapshot before it plus the inventory movements since then
+CREATE TABLE stock_snapshots (
+    product_id INT NOT NULL,
+    warehouse_id INT NOT NULL,
+    snapshot_date DATE NOT NULL,
+    quantity INT NOT NULL,
+    PRIMARY KEY (product_id, warehouse_id, snapshot_date),
+    FOREIGN KEY (product_id) REFERENCES products(id),
+    FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
+);
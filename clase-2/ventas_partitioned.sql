@@ -0,0 +1,64 @@
+-- Partitioned variant of the sales_system time series tables
+-- Run after ventas.sql on an empty database: sales and inventory_movements are recreated with
+-- RANGE COLUMNS partitioning by date. They start with the catch-all p_future partition only;
+-- manage_partitions.py (or faker_ventas.py --partitions) splits it into monthly partitions.
+--
+-- MySQL restrictions on partitioned tables:
+-- * They cannot have foreign keys nor be referenced by one, so the constraints from sale_details,
+--   accounts_receivable and returns to sales are dropped (their indexes stay for the joins) and
+--   the references are only enforced by the application.
+-- * Every unique key must include the partitioning column, so the primary key becomes
+--   (id, <date>) and sale_number keeps a plain index; faker_ventas.py generates it unique.
+USE sales_system;
+
+ALTER TABLE sale_details DROP FOREIGN KEY sale_details_ibfk_1;
+ALTER TABLE accounts_receivable DROP FOREIGN KEY accounts_receivable_ibfk_1;
+ALTER TABLE returns DROP FOREIGN KEY returns_ibfk_1;
+
+DROP TABLE inventory_movements;
+DROP TABLE sales;
+
+-- Table 14: Sales, partitioned by month of sale_date
+CREATE TABLE sales (
+    id INT NOT NULL AUTO_INCREMENT,
+    sale_number VARCHAR(50) NOT NULL,
+    customer_id INT NOT NULL,
+    salesperson_employee_id INT NOT NULL,
+    sale_date DATETIME NOT NULL,
+    subtotal DECIMAL(12,2) NOT NULL,
+    discount DECIMAL(12,2) DEFAULT 0.00,
+    taxes DECIMAL(12,2) NOT NULL,
+    total DECIMAL(12,2) NOT NULL,
+    payment_method ENUM('cash', 'credit_card', 'debit_card', 'transfer', 'credit') NOT NULL,
+    status ENUM('pending', 'completed', 'cancelled', 'returned') DEFAULT 'completed',
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, sale_date),
+    KEY idx_sales_number (sale_number),
+    KEY idx_sales_customer (customer_id),
+    KEY idx_sales_employee (salesperson_employee_id)
+)
+PARTITION BY RANGE COLUMNS (sale_date) (
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
+
+-- Table 16: Inventory movements, partitioned by month of movement_date
+CREATE TABLE inventory_movements (
+    id INT NOT NULL AUTO_INCREMENT,
+    product_id INT NOT NULL,
+    warehouse_id INT NOT NULL,
+    movement_type ENUM('in', 'out', 'adjustment', 'transfer') NOT NULL,
+    quantity INT NOT NULL,
+    reference_type ENUM('sale', 'purchase', 'adjustment', 'transfer') NOT NULL,
+    reference_id INT,
+    employee_id INT NOT NULL,
+    notes TEXT,
+    movement_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, movement_date),
+    KEY idx_movements_product (product_id),
+    KEY idx_movements_warehouse (warehouse_id),
+    KEY idx_movements_employee (employee_id)
+)
+PARTITION BY RANGE COLUMNS (movement_date) (
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
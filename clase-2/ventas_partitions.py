@@ -0,0 +1,115 @@
+# Monthly RANGE partitions of the sales_system time series tables
+# Used by manage_partitions.py for maintenance and by faker_ventas.py --partitions before seeding
+from datetime import date, datetime
+
+# Partitioned table -> partitioning column, as created by ventas_partitioned.sql
+PARTITIONED_TABLES = {
+    'sales': 'sale_date',
+    'inventory_movements': 'movement_date',
+}
+
+# Catch-all partition above the last month, split whenever months are added
+FUTURE_PARTITION = 'p_future'
+
+
+def month_start(moment):
+    """First day of the month of a date or datetime"""
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month, months):
+    """First day of the month a number of months after month"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Name of the partition holding a month, e.g. p202406"""
+    return f'p{month:%Y%m}'
+
+
+def list_partitions(conn, table):
+    """Partitions of a table in order, as (name, upper bound, rows)
+
+    The bound is the first day after the partition, or None for the
+    MAXVALUE partition; rows is the estimate kept by information_schema.
+    Raises ValueError when the table is not partitioned.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+           FROM information_schema.PARTITIONS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+           ORDER BY PARTITION_ORDINAL_POSITION""",
+        (table,)
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    if not rows or rows[0][0] is None:
+        raise ValueError(f"{table} is not partitioned, apply ventas_partitioned.sql first")
+    partitions = []
+    for name, description, table_rows in rows:
+        bound = None if description == 'MAXVALUE' else datetime.fromisoformat(description.strip("'")).date()
+        partitions.append((name, bound, table_rows))
+    return partitions
+
+
+def partition_clause(name, bound):
+    """PARTITION clause of a RANGE COLUMNS partition ending before bound (None for MAXVALUE)"""
+    limit = 'MAXVALUE' if bound is None else f"'{bound:%Y-%m-%d}'"
+    return f"PARTITION {name} VALUES LESS THAN ({limit})"
+
+
+def add_partitions(conn, table, first, last):
+    """Adds one partition per month from first to last (both included) that the table is missing
+
+    Each new bound falls inside an existing partition, which is split with
+    REORGANIZE PARTITION; only the rows of that partition are moved, so
+    splitting the empty catch-all partition is a metadata change. The
+    lowest partition also holds every row older than its month. Returns the
+    names of the partitions added.
+    """
+    partitions = list_partitions(conn, table)
+    existing = {bound for _, bound, _ in partitions}
+    splits = {}
+    month = month_start(first)
+    while month <= month_start(last):
+        bound = add_months(month, 1)
+        if bound not in existing:
+            # The partition that currently holds the rows just below the new bound
+            holder = next(p for p in partitions if p[1] is None or p[1] > bound)
+            splits.setdefault(holder, []).append((partition_name(month), bound))
+        month = bound
+
+    cursor = conn.cursor()
+    added = []
+    for (name, bound, _), new in splits.items():
+        clauses = [partition_clause(new_name, new_bound) for new_name, new_bound in new]
+        clauses.append(partition_clause(name, bound))
+        cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION {name} INTO ({', '.join(clauses)})")
+        added += [new_name for new_name, _ in new]
+    cursor.close()
+    return added
+
+
+def drop_partitions(conn, table, before, archive=False):
+    """Removes the month partitions whose rows are all older than before and returns their names
+
+    With archive, each partition is first swapped with EXCHANGE PARTITION
+    into a new regular table named <table>_<partition>, so the rows are kept
+    outside the table without being copied.
+    """
+    cursor = conn.cursor()
+    dropped = []
+    for name, bound, _ in list_partitions(conn, table):
+        if bound is None or bound > before:
+            continue
+        if archive:
+            archive_table = f'{table}_{name}'
+            cursor.execute(f"CREATE TABLE {archive_table} LIKE {table}")
+            cursor.execute(f"ALTER TABLE {archive_table} REMOVE PARTITIONING")
+            cursor.execute(f"ALTER TABLE {table} EXCHANGE PARTITION {name} WITH TABLE {archive_table}")
+        cursor.execute(f"ALTER TABLE {table} DROP PARTITION {name}")
+        dropped.append(name)
+    cursor.close()
+    return dropped
@@ -0,0 +1,124 @@
+# Catalog of the reporting queries run against sales_system
+# ventas_indexes.sql is derived from these queries and explain_reports.py times them with and without it
+from datetime import timedelta
+
+# name -> (description, SQL); %(...)s parameters come from report_parameters()
+REPORT_QUERIES = {
+    'daily_sales': (
+        'Completed sales and revenue per day over the last month',
+        """SELECT DATE(sale_date) AS day, COUNT(*) AS sales, SUM(total) AS revenue
+           FROM sales
+           WHERE sale_date >= %(month_start)s AND status = 'completed'
+           GROUP BY day
+           ORDER BY day"""
+    ),
+    'customer_history': (
+        'Sales of one customer over the last year, newest first',
+        """SELECT id, sale_date, total
+           FROM sales
+           WHERE customer_id = %(customer_id)s AND sale_date >= %(year_start)s
+           ORDER BY sale_date DESC"""
+    ),
+    'top_products': (
+        'Best selling products of the last quarter',
+        """SELECT sd.product_id, SUM(sd.quantity) AS units, SUM(sd.subtotal) AS revenue
+           FROM sales s
+           JOIN sale_details sd ON sd.sale_id = s.id
+           WHERE s.sale_date >= %(quarter_start)s AND s.status = 'completed'
+           GROUP BY sd.product_id
+           ORDER BY revenue DESC
+           LIMIT 20"""
+    ),
+    'product_sales': (
+        'Units and revenue of one product',
+        """SELECT COUNT(*) AS sale_lines, SUM(quantity) AS units, SUM(subtotal) AS revenue
+           FROM sale_details
+           WHERE product_id = %(product_id)s"""
+    ),
+    'stock_card': (
+        'Movements of one product in one warehouse over the last quarter',
+        """SELECT movement_date, movement_type, quantity, reference_type, reference_id
+           FROM inventory_movements
+           WHERE product_id = %(product_id)s AND warehouse_id = %(warehouse_id)s
+             AND movement_date >= %(quarter_start)s
+           ORDER BY movement_date"""
+    ),
+    'stock_at_date': (
+        'Stock of one product in one warehouse a month ago: latest snapshot plus the movements since',
+        """SELECT COALESCE(MAX(snap.quantity), 0)
+                  + COALESCE(SUM(IF(m.movement_type IN ('in', 'adjustment'), m.quantity, -m.quantity)), 0) AS quantity
+           FROM (SELECT COALESCE(MAX(snapshot_date), '1000-01-01') AS snapshot_date
+                 FROM stock_snapshots
+                 WHERE product_id = %(product_id)s AND warehouse_id = %(warehouse_id)s
+                   AND snapshot_date < DATE(%(month_start)s)) latest
+           LEFT JOIN stock_snapshots snap
+             ON snap.product_id = %(product_id)s AND snap.warehouse_id = %(warehouse_id)s
+            AND snap.snapshot_date = latest.snapshot_date
+           LEFT JOIN inventory_movements m
+             ON m.product_id = %(product_id)s AND m.warehouse_id = %(warehouse_id)s
+            AND m.movement_date >= latest.snapshot_date + INTERVAL 1 DAY AND m.movement_date <= %(month_start)s"""
+    ),
+    'available_to_promise': (
+        'Current stock of one product plus the units of its open purchase orders',
+        """SELECT p.current_stock + COALESCE((
+                      SELECT SUM(pod.quantity)
+                      FROM purchase_order_details pod
+                      JOIN purchase_orders po ON po.id = pod.purchase_order_id
+                      WHERE pod.product_id = p.id AND po.status IN ('pending', 'approved', 'shipped')
+                  ), 0) AS available_to_promise
+           FROM products p
+           WHERE p.id = %(product_id)s"""
+    ),
+    'movements_by_day': (
+        'Units moved per day and movement type over the last month',
+        """SELECT DATE(movement_date) AS day, movement_type, SUM(quantity) AS units
+           FROM inventory_movements
+           WHERE movement_date >= %(month_start)s
+           GROUP BY day, movement_type"""
+    ),
+    'receivables_aging': (
+        'Open receivables past due, per customer',
+        """SELECT customer_id, COUNT(*) AS accounts, SUM(pending_amount) AS pending
+           FROM accounts_receivable
+           WHERE status IN ('pending', 'partial', 'overdue') AND due_date < %(today)s
+           GROUP BY customer_id
+           ORDER BY pending DESC"""
+    ),
+    'daily_collections': (
+        'Payments received per day and method over the last month',
+        """SELECT DATE(payment_date) AS day, payment_method, SUM(payment_amount) AS amount
+           FROM payments_received
+           WHERE payment_date >= %(month_start)s
+           GROUP BY day, payment_method"""
+    ),
+}
+
+
+def report_parameters(conn):
+    """Parameters of the catalog queries, taken from the data so they hit rows of a seeded database
+
+    Periods end at the last sale, and the customer, product and warehouse
+    are the ones with the most rows, so the seed reference time does not matter.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(sale_date) FROM sales")
+    today = cursor.fetchone()[0]
+    if today is None:
+        raise ValueError("sales is empty, seed the database with faker_ventas.py first")
+    cursor.execute("SELECT customer_id FROM sales GROUP BY customer_id ORDER BY COUNT(*) DESC LIMIT 1")
+    customer_id = cursor.fetchone()[0]
+    cursor.execute(
+        """SELECT product_id, warehouse_id FROM inventory_movements
+           GROUP BY product_id, warehouse_id ORDER BY COUNT(*) DESC LIMIT 1"""
+    )
+    product_id, warehouse_id = cursor.fetchone()
+    cursor.close()
+    return {
+        'today': today,
+        'month_start': today - timedelta(days=30),
+        'quarter_start': today - timedelta(days=90),
+        'year_start': today - timedelta(days=365),
+        'customer_id': customer_id,
+        'product_id': product_id,
+        'warehouse_id': warehouse_id,
+    }
@@ -0,0 +1,206 @@
+# Incremental refresh of the daily summary tables of ventas_summaries.sql
+# Used by refresh_summaries.py and by faker_ventas.py --summaries after loading
+import time
+from collections import namedtuple
+
+# source: fact table aggregated, key: its column that drives the watermark, blocks: table whose id blocks
+# that column holds, sql: INSERT ... SELECT over the keys in (low, high]
+Summary = namedtuple('Summary', ['source', 'key', 'blocks', 'sql'])
+
+# Tables whose id blocks a running load lists in open_id_blocks until the rows of the block are committed
+BLOCK_TABLES = ('sales', 'inventory_movements')
+
+# Sums are additive, so new facts are added to the day rows already summarized.
+# sale_details follows the sale id: its own ids are AUTO_INCREMENT and cannot be announced before loading.
+SUMMARIES = {
+    'daily_product_sales': Summary(
+        'sale_details', 'sale_id', 'sales',
+        """INSERT INTO daily_product_sales (sale_day, product_id, sale_lines, units, revenue)
+           SELECT DATE(s.sale_date), sd.product_id, COUNT(*), SUM(sd.quantity), SUM(sd.subtotal)
+           FROM sale_details sd
+           JOIN sales s ON s.id = sd.sale_id
+           WHERE sd.sale_id > %(low)s AND sd.sale_id <= %(high)s AND s.status = 'completed'
+           GROUP BY DATE(s.sale_date), sd.product_id
+           ON DUPLICATE KEY UPDATE sale_lines = sale_lines + VALUES(sale_lines),
+                                   units = units + VALUES(units), revenue = revenue + VALUES(revenue)"""
+    ),
+    'daily_customer_sales': Summary(
+        'sales', 'id', 'sales',
+        """INSERT INTO daily_customer_sales (sale_day, customer_id, sales_count, discount, revenue)
+           SELECT DATE(sale_date), customer_id, COUNT(*), SUM(discount), SUM(total)
+           FROM sales
+           WHERE id > %(low)s AND id <= %(high)s AND status = 'completed'
+           GROUP BY DATE(sale_date), customer_id
+           ON DUPLICATE KEY UPDATE sales_count = sales_count + VALUES(sales_count),
+                                   discount = discount + VALUES(discount), revenue = revenue + VALUES(revenue)"""
+    ),
+    'daily_employee_sales': Summary(
+        'sales', 'id', 'sales',
+        """INSERT INTO daily_employee_sales (sale_day, employee_id, sales_count, revenue)
+           SELECT DATE(sale_date), salesperson_employee_id, COUNT(*), SUM(total)
+           FROM sales
+           WHERE id > %(low)s AND id <= %(high)s AND status = 'completed'
+           GROUP BY DATE(sale_date), salesperson_employee_id
+           ON DUPLICATE KEY UPDATE sales_count = sales_count + VALUES(sales_count),
+                                   revenue = revenue + VALUES(revenue)"""
+    ),
+    # in and adjustment movements add stock, out and transfer movements take it out of the warehouse
+    'daily_warehouse_stock': Summary(
+        'inventory_movements', 'id', 'inventory_movements',
+        """INSERT INTO daily_warehouse_stock (stock_day, warehouse_id, product_id, movements, units_in, units_out,
+                                              net_units)
+           SELECT DATE(movement_date), warehouse_id, product_id, COUNT(*),
+                  SUM(IF(movement_type IN ('in', 'adjustment'), quantity, 0)),
+                  SUM(IF(movement_type IN ('out', 'transfer'), quantity, 0)),
+                  SUM(IF(movement_type IN ('in', 'adjustment'), quantity, -quantity))
+           FROM inventory_movements
+           WHERE id > %(low)s AND id <= %(high)s
+           GROUP BY DATE(movement_date), warehouse_id, product_id
+           ON DUPLICATE KEY UPDATE movements = movements + VALUES(movements),
+                                   units_in = units_in + VALUES(units_in), units_out = units_out + VALUES(units_out),
+                                   net_units = net_units + VALUES(net_units)"""
+    ),
+}
+
+
+def has_open_blocks(conn):
+    """Whether the database has the open_id_blocks table of ventas_summaries.sql"""
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT COUNT(*) FROM information_schema.TABLES
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'open_id_blocks'"""
+    )
+    found = cursor.fetchone()[0]
+    cursor.close()
+    return bool(found)
+
+
+def open_blocks(conn, ranges):
+    """Lists the id blocks of a task in open_id_blocks before its rows are loaded
+
+    Each block records the connection that opened it, so the blocks of a
+    load whose connection is gone can be told apart by stale_blocks(). A
+    resumed load takes over the blocks of the interrupted one.
+    """
+    rows = [(table, block.start, block.stop - 1) for table, block in ranges.items() if table in BLOCK_TABLES and block]
+    if rows:
+        cursor = conn.cursor()
+        cursor.executemany(
+            """INSERT INTO open_id_blocks (table_name, first_id, last_id, connection_id)
+               VALUES (%s, %s, %s, CONNECTION_ID())
+               ON DUPLICATE KEY UPDATE connection_id = VALUES(connection_id)""", rows
+        )
+        cursor.close()
+        conn.commit()
+
+
+def close_blocks(conn, ranges):
+    """Takes the id blocks of a finished task out of open_id_blocks once its rows are committed"""
+    rows = [(table, block.start) for table, block in ranges.items() if table in BLOCK_TABLES and block]
+    if rows:
+        cursor = conn.cursor()
+        cursor.executemany("DELETE FROM open_id_blocks WHERE table_name = %s AND first_id = %s", rows)
+        cursor.close()
+        conn.commit()
+
+
+def close_run_blocks(conn):
+    """Takes out of open_id_blocks every block opened through this connection, for a load that will not resume"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM open_id_blocks WHERE connection_id = CONNECTION_ID()")
+    closed = cursor.rowcount
+    cursor.close()
+    conn.commit()
+    return closed
+
+
+def stale_blocks(conn):
+    """Open blocks whose connection no longer exists, left by a load that failed or was killed
+
+    Listing the connections of other users needs the PROCESS privilege.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT table_name, first_id, last_id, connection_id, opened_at FROM open_id_blocks
+           WHERE connection_id NOT IN (SELECT ID FROM information_schema.PROCESSLIST)
+           ORDER BY table_name, first_id"""
+    )
+    blocks = cursor.fetchall()
+    cursor.close()
+    return blocks
+
+
+def clear_stale_blocks(conn):
+    """Deletes the blocks returned by stale_blocks() and returns them"""
+    blocks = stale_blocks(conn)
+    if blocks:
+        cursor = conn.cursor()
+        cursor.executemany("DELETE FROM open_id_blocks WHERE table_name = %s AND first_id = %s",
+                           [(table, first_id) for table, first_id, *_ in blocks])
+        cursor.close()
+        conn.commit()
+    return blocks
+
+
+def refresh_summary(conn, summary, full=False):
+    """Aggregates the facts above the watermark of a summary table in one transaction
+
+    The upper end is the highest key when the refresh starts, kept below the
+    first block of open_id_blocks: a parallel load commits its blocks out of
+    order, and facts of a block still loading must not end up under the
+    watermark. The rows and the new watermark are committed together, so an
+    interrupted refresh is simply repeated. Facts are expected to be
+    appended and not updated: a sale changing status after it was summarized
+    is not reflected until a full rebuild. Returns (fact rows aggregated,
+    affected summary rows, seconds, first id of the open block that held
+    the watermark back or None).
+    """
+    source, key, blocks, sql = SUMMARIES[summary]
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        if full:
+            cursor.execute(f"DELETE FROM {summary}")
+            cursor.execute("DELETE FROM summary_watermarks WHERE summary_table = %s", (summary,))
+        cursor.execute("SELECT last_id FROM summary_watermarks WHERE summary_table = %s FOR UPDATE", (summary,))
+        row = cursor.fetchone()
+        low = row[0] if row else 0
+        cursor.execute("SELECT MIN(first_id) FROM open_id_blocks WHERE table_name = %s AND last_id > %s",
+                       (blocks, low))
+        first_open = cursor.fetchone()[0]
+        if first_open is None:
+            cursor.execute(f"SELECT MAX({key}), COUNT(*) FROM {source} WHERE {key} > %s", (low,))
+        else:
+            cursor.execute(f"SELECT MAX({key}), COUNT(*) FROM {source} WHERE {key} > %s AND {key} < %s",
+                           (low, first_open))
+        high, facts = cursor.fetchone()
+        written = 0
+        if high is not None:
+            cursor.execute(sql, {'low': low, 'high': high})
+            written = cursor.rowcount
+            cursor.execute(
+                """INSERT INTO summary_watermarks (summary_table, source_table, last_id) VALUES (%s, %s, %s)
+                   ON DUPLICATE KEY UPDATE last_id = VALUES(last_id)""",
+                (summary, source, high)
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return facts, written, time.perf_counter() - start, first_open
+
+
+def refresh_summaries(conn, full=False, summaries=None):
+    """Refreshes the summary tables and prints what each one aggregated and which open block held it back"""
+    results = {}
+    for summary in summaries or SUMMARIES:
+        facts, written, seconds, first_open = refresh_summary(conn, summary, full)
+        results[summary] = {'facts': facts, 'affected_rows': written, 'seconds': round(seconds, 3),
+                            'held_below': first_open}
+        print(f"{summary}: {facts} new {SUMMARIES[summary].source} rows aggregated in {seconds:.2f}s")
+        if first_open is not None:
+            print(f"  Warning: held below the open {SUMMARIES[summary].blocks} block starting at id {first_open}; "
+                  f"if no load is running, remove it with refresh_summaries.py --clear-stale-blocks")
+    return results
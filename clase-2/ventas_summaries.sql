@@ -0,0 +1,71 @@
+-- Daily summary tables of sales_system
+-- Pre-aggregated per day so dashboards read a few rows per day instead of the fact tables.
+-- Filled and kept up to date by refresh_summaries.py (or faker_ventas.py --summaries), which only
+-- aggregates the fact rows with an id above the watermark stored in summary_watermarks and below
+-- the id blocks that a running load lists in open_id_blocks.
+USE sales_system;
+
+-- Completed sales per day and product, from sale_details
+CREATE TABLE IF NOT EXISTS daily_product_sales (
+    sale_day DATE NOT NULL,
+    product_id INT NOT NULL,
+    sale_lines INT NOT NULL,
+    units INT NOT NULL,
+    revenue DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (sale_day, product_id),
+    KEY idx_daily_product (product_id, sale_day)
+);
+
+-- Completed sales per day and customer
+CREATE TABLE IF NOT EXISTS daily_customer_sales (
+    sale_day DATE NOT NULL,
+    customer_id INT NOT NULL,
+    sales_count INT NOT NULL,
+    discount DECIMAL(14,2) NOT NULL,
+    revenue DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (sale_day, customer_id),
+    KEY idx_daily_customer (customer_id, sale_day)
+);
+
+-- Completed sales per day and salesperson
+CREATE TABLE IF NOT EXISTS daily_employee_sales (
+    sale_day DATE NOT NULL,
+    employee_id INT NOT NULL,
+    sales_count INT NOT NULL,
+    revenue DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (sale_day, employee_id),
+    KEY idx_daily_employee (employee_id, sale_day)
+);
+
+-- Units moved in and out per day, warehouse and product; the running sum of net_units is the stock level change
+CREATE TABLE IF NOT EXISTS daily_warehouse_stock (
+    stock_day DATE NOT NULL,
+    warehouse_id INT NOT NULL,
+    product_id INT NOT NULL,
+    movements INT NOT NULL,
+    units_in INT NOT NULL,
+    units_out INT NOT NULL,
+    net_units INT NOT NULL,
+    PRIMARY KEY (stock_day, warehouse_id, product_id),
+    KEY idx_daily_warehouse (warehouse_id, product_id, stock_day)
+);
+
+-- Last fact id aggregated into each summary table (the sale id for daily_product_sales)
+CREATE TABLE IF NOT EXISTS summary_watermarks (
+    summary_table VARCHAR(64) PRIMARY KEY,
+    source_table VARCHAR(64) NOT NULL,
+    last_id INT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Id blocks of sales and inventory_movements reserved by a running faker_ventas.py load whose rows
+-- are not all committed yet; the watermark of a summary never goes past the first open block.
+-- connection_id is the connection of the load, so blocks of a dead load can be found and cleared
+CREATE TABLE IF NOT EXISTS open_id_blocks (
+    table_name VARCHAR(64) NOT NULL,
+    first_id INT NOT NULL,
+    last_id INT NOT NULL,
+    connection_id BIGINT UNSIGNED NOT NULL,
+    opened_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (table_name, first_id)
+);
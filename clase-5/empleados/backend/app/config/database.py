@@ -1,46 +1,167 @@
 import os
 import logging
-from pymongo import MongoClient
+import threading
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from pymongo.errors import ConnectionFailure
 
 # Configuración del logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("mongodb")
 
-# Cliente de MongoDB
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Cuenta las conexiones del pool y el tiempo que esperan las peticiones por una conexión.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # El checkout empieza y termina en el mismo hilo, así que el inicio se guarda por hilo
+        self._checkout_started = threading.local()
+        self.open = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _waited(self):
+        started = getattr(self._checkout_started, "value", None)
+        self._checkout_started.value = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._checkout_started.value = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = self._waited()
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def connection_check_out_failed(self, event):
+        waited = self._waited()
+        with self._lock:
+            self.checkout_failures += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self):
+        """
+        Retorna las métricas acumuladas del pool.
+        """
+        with self._lock:
+            waits = self.checkouts + self.checkout_failures
+            return {
+                "open_connections": self.open,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_wait_ms": round(self.wait_seconds / waits * 1000, 3) if waits else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+# Cliente de MongoDB compartido por toda la aplicación, creado en el lifespan de FastAPI
 client = None
+pool_monitor = PoolMonitor()
+
 
-def connect_to_mongo():
+def pool_options():
     """
-    Establece la conexión con la base de datos MongoDB.
+    Lee el tamaño del pool y el tiempo máximo de espera por una conexión de las variables de entorno.
     """
+    options = {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+    }
+    wait_queue_timeout = os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS")
+    if wait_queue_timeout:
+        options["waitQueueTimeoutMS"] = int(wait_queue_timeout)
+    return options
+
+
+async def connect_to_mongo():
+    """
+    Crea el cliente asíncrono de MongoDB de la aplicación y verifica la conexión.
+    """
+    global client
+    if client is not None:
+        return client
     try:
-        global client
         mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/userdb")
+        options = pool_options()
 
-        logger.info("Intentando conectar a MongoDB...")
-        client = MongoClient(mongo_uri)
+        logger.info(f"Intentando conectar a MongoDB con {options}...")
+        client = AsyncIOMotorClient(mongo_uri, event_listeners=[pool_monitor], **options)
 
         # Verificar la conexión
-        client.admin.command('ping')
+        await client.admin.command('ping')
 
         logger.info("Conectado a MongoDB exitosamente")
         return client
     except ConnectionFailure as e:
         logger.error(f"Error al conectar a MongoDB: {str(e)}")
+        close_mongo_connection()
         raise
 
-def\
-        get_database():
+
+def close_mongo_connection():
+    """
+    Cierra el cliente de MongoDB y sus conexiones.
+    """
+    global client
+    if client is not None:
+        client.close()
+        client = None
+        logger.info("Conexión a MongoDB cerrada")
+
+
+def get_database():
     """
     Retorna la instancia de la base de datos.
     """
     if client is None:
-        connect_to_mongo()
+        raise RuntimeError("MongoDB no está conectado: connect_to_mongo() se ejecuta al iniciar la aplicación")
 
     db_name = os.getenv("MONGODB_DATABASE", "userdb")
     return client[db_name]
 
+
 def get_collection(collection_name):
     """
     Retorna una colección específica de la base de datos.
@@ -48,5 +169,9 @@ def get_collection(collection_name):
     db = get_database()
     return db[collection_name]
 
-# Establecer la conexión al importar el módulo
-connect_to_mongo()
+
+def pool_metrics():
+    """
+    Retorna la configuración y las métricas del pool de conexiones.
+    """
+    return {"options": pool_options(), **pool_monitor.snapshot()}
@@ -1,19 +1,19 @@
 import logging
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from app.config.database import get_collection
 
 # Configuración del logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("user_model")
 
 class UserModel:
-    def __init__(self):
-        # Utilizamos motor.motor_asyncio para operaciones asíncronas
-        mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/userdb")
-        self.client = AsyncIOMotorClient(mongo_uri)
-        db_name = os.getenv("MONGODB_DATABASE", "userdb")
-        self.db = self.client[db_name]
-        self.collection = self.db["users"]
+    @property
+    def collection(self):
+        """
+        Colección de usuarios del cliente de Motor compartido por la aplicación
+        """
+        # Se resuelve en cada uso: los controladores se crean al importar las rutas,
+        # antes de que el lifespan de FastAPI abra la conexión
+        return get_collection("users")
 
     async def create_user(self, user_data: dict):
         """
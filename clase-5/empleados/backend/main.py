@@ -1,16 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
-from app.config.database import connect_to_mongo
+from app.config.database import close_mongo_connection, connect_to_mongo, pool_metrics
 from app.routes.user_router import router as user_router
 from app.routes.login_router import router as login_router
 
 # Cargar variables de entorno
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Abre un único cliente de MongoDB por proceso al iniciar y lo cierra al apagar
+    """
+    try:
+        await connect_to_mongo()
+        yield
+    finally:
+        # También si el arranque o el apagado fallan, para no dejar abiertos el cliente ni su monitor del pool
+        close_mongo_connection()
+
 # Crear aplicación FastAPI
-app = FastAPI(title="API Usuarios", description="API para gestión de usuarios")
+app = FastAPI(title="API Usuarios", description="API para gestión de usuarios", lifespan=lifespan)
 
 # Configurar CORS
 app.add_middleware(
@@ -21,14 +35,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Conectar a MongoDB
-connect_to_mongo()
-
 # Rutas
 @app.get("/")
 async def root():
     return {"message": "ok!"}
 
+@app.get("/metrics/pool")
+async def mongo_pool_metrics():
+    """
+    Métricas del pool de conexiones a MongoDB de este proceso
+    """
+    return pool_metrics()
+
 app.include_router(user_router, prefix="/api", tags=["usuarios"])
 app.include_router(login_router, prefix="/api", tags=["autenticación"])
 